@@ -0,0 +1,107 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+from dotenv import load_dotenv
+from metrics import record_cache
+
+load_dotenv()
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92"))
+ANSWER_CACHE_TTL_SECONDS = int(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "5000"))
+ANSWER_CACHE_MAX_PER_RESUME = int(os.getenv("ANSWER_CACHE_MAX_PER_RESUME", "50"))
+
+
+def normalize(embedding) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SemanticAnswerCache:
+    """Answers to earlier /ask-query calls, reused for paraphrased questions about the same resume.
+
+    Entries are grouped by resume fingerprint, so an answer is only ever served
+    for the resume it was generated from. A lookup compares the query embedding
+    with the resume's cached queries and returns the best answer whose cosine
+    similarity reaches `threshold`. Entries expire after `ttl_seconds`; resumes
+    are evicted least recently used once `max_entries` answers are held.
+    """
+
+    def __init__(self, threshold=ANSWER_CACHE_THRESHOLD, ttl_seconds=ANSWER_CACHE_TTL_SECONDS,
+                 max_entries=ANSWER_CACHE_MAX_ENTRIES, max_per_resume=ANSWER_CACHE_MAX_PER_RESUME):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_per_resume = max_per_resume
+        self.hits = 0
+        self.misses = 0
+        self._resumes = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def lookup(self, resume_hash, embedding):
+        """Returns the cached answer for the closest similar query, or None."""
+        query = normalize(embedding)
+        now = time.monotonic()
+        answer = None
+        with self._lock:
+            entries = self._resumes.get(resume_hash)
+            if entries:
+                live = [entry for entry in entries if entry[0] >= now]
+                self._size -= len(entries) - len(live)
+                if live:
+                    self._resumes[resume_hash] = live
+                    self._resumes.move_to_end(resume_hash)
+                    similarities = np.stack([vector for _, vector, _ in live]) @ query
+                    best = int(np.argmax(similarities))
+                    if similarities[best] >= self.threshold:
+                        answer = live[best][2]
+                else:
+                    del self._resumes[resume_hash]
+            if answer is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        record_cache("semantic_answer", answer is not None)
+        return answer
+
+    def store(self, resume_hash, embedding, answer):
+        with self._lock:
+            entries = self._resumes.setdefault(resume_hash, [])
+            entries.append((time.monotonic() + self.ttl_seconds, normalize(embedding), answer))
+            self._size += 1
+            if len(entries) > self.max_per_resume:
+                del entries[0]
+                self._size -= 1
+            self._resumes.move_to_end(resume_hash)
+            while self._size > self.max_entries and len(self._resumes) > 1:
+                _, evicted = self._resumes.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._resumes.clear()
+            self._size = 0
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": self._size,
+            "resumes": len(self._resumes),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "threshold": self.threshold,
+        }
+
+    def __len__(self):
+        return self._size
+
+
+def create_answer_cache():
+    """Builds the answer cache unless ANSWER_CACHE_ENABLED is false."""
+    return SemanticAnswerCache() if ANSWER_CACHE_ENABLED else None
@@ -1,38 +1,29 @@
 from fastapi import APIRouter, HTTPException, Depends
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
-from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from pydantic import BaseModel
 from typing import Union
 from dotenv import load_dotenv
-from db import get_collection
+import user_repository
+from password_hashing import password_hasher, HashingPoolBusy
+from refresh_tokens import refresh_tokens
 import os
 
 load_dotenv()
 
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 5
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "5"))
 
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-# Usage example
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
-
 # Pydantic models
 class User(BaseModel):
     username: str
     email: str
 
-class UserInDB(User):
-    hashed_password: str
-
 class UserCreate(BaseModel):
     username: str
     email: str
@@ -42,8 +33,8 @@ class Token(BaseModel):
     access_token: str
     token_type: str
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 def create_access_token(data: dict, expires_delta: Union[timedelta, None] = None):
     to_encode = data.copy()
@@ -55,61 +46,76 @@ def create_access_token(data: dict, expires_delta: Union[timedelta, None] = None
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(token: str):
-    credentials_exception = HTTPException(
-        status_code=401, detail="Could not validate credentials"
-    )
+def get_current_admin(token: str = Depends(oauth2_scheme)) -> str:
+    """Dependency for admin-only routes: checks the access token's signature, expiry and admin role, no DB lookup."""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-        return email
     except JWTError:
-        raise credentials_exception
-
-
-def get_user(email: str):
-    users_collection = get_collection("users")
-    user = users_collection.find_one({"email": email})
-    if user:
-        return UserInDB(
-            username=user["name"],  
-            email=user["email"],
-            hashed_password=user["password"]  
-        )
-    return None
-
-def get_adminuser(email: str):
-    admin_collection = get_collection("admins")
-    admin = admin_collection.find_one({"email": email})
-    if admin:
-        return UserInDB(
-            username=admin["name"],  
-            email=admin["email"],
-            hashed_password=admin["password"]  
-        )
-    return None
-
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+        raise HTTPException(status_code=401, detail="Could not validate credentials")
+    if payload.get("sub") is None:
+        raise HTTPException(status_code=401, detail="Could not validate credentials")
+    if payload.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return payload["sub"]
+
+async def issue_tokens(subject: str, role: str = "user") -> dict:
+    """Short-lived access token plus a rotating refresh token, returned by every login."""
+    return {
+        "access_token": create_access_token(data={"sub": subject, "role": role}),
+        "refresh_token": await refresh_tokens.issue(subject, role),
+        "token_type": "bearer",
+    }
+
+async def authenticate(repository, email: str, password: str):
+    """Returns the stored user record if the password matches, else None.
+
+    Verification runs on the hashing pool. When the stored hash uses deprecated
+    settings (e.g. an older bcrypt cost) it is replaced with a fresh hash.
+    Raises 503 when the hashing pool is saturated.
+    """
+    record = await repository.find_by_email(email)
+    if not record:
+        return None
+    try:
+        valid, new_hash = await password_hasher.verify_and_update(password, record["password"])
+    except HashingPoolBusy:
+        raise HTTPException(status_code=503, detail="Server busy, please retry.", headers={"Retry-After": "1"})
+    if not valid:
+        return None
+    if new_hash:
+        await repository.update_fields(email, {"password": new_hash})
+    return record
 
 @router.post("/token")
-def login(form_data: OAuth2PasswordRequestForm = Depends()):
-    user = get_user(form_data.username)
-    if not user or not verify_password(form_data.password, user.hashed_password):
+async def login(form_data: OAuth2PasswordRequestForm = Depends()):
+    user = await authenticate(user_repository.users, form_data.username, form_data.password)
+    if not user:
         raise HTTPException(status_code=400, detail="Incorrect username or password")
     
-    access_token = create_access_token(data={"sub": user.username})
-    return {"access_token": access_token, "token_type": "bearer"}
+    return await issue_tokens(user["name"], "user")
 
 @router.post("/admin_token")
-def login(form_data: OAuth2PasswordRequestForm = Depends()):
-    admin = get_adminuser(form_data.username)
-    if not admin or not verify_password(form_data.password, admin.hashed_password):
+async def login(form_data: OAuth2PasswordRequestForm = Depends()):
+    admin = await authenticate(user_repository.admins, form_data.username, form_data.password)
+    if not admin:
         raise HTTPException(status_code=400, detail="Incorrect username or password")
     
-    access_token = create_access_token(data={"sub": admin.username})
-    return {"access_token": access_token, "token_type": "bearer"}
+    return await issue_tokens(admin["name"], "admin")
+
+@router.post("/token/refresh")
+async def refresh(request: RefreshRequest):
+    """Exchanges a refresh token for a new access/refresh pair without re-checking the password."""
+    rotated = await refresh_tokens.rotate(request.refresh_token)
+    if rotated is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired refresh token")
+
+    subject, role, new_refresh_token = rotated
+    access_token = create_access_token(data={"sub": subject, "role": role})
+    return {"access_token": access_token, "refresh_token": new_refresh_token, "token_type": "bearer"}
+
+@router.post("/token/revoke")
+async def revoke(request: RefreshRequest):
+    """Logs out by revoking the refresh token and every token rotated from it."""
+    await refresh_tokens.revoke(request.refresh_token)
+    return {"message": "Refresh token revoked"}
 
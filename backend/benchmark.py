@@ -0,0 +1,358 @@
+"""Offline end-to-end benchmark for the FastAPI app in main.py.
+
+Boots `main.app` in-process with deterministic stand-ins (fake LLM, hash
+embedder, mongomock) and drives realistic scenarios at a configurable
+concurrency. Reports p50/p95/p99 latency and requests/s per endpoint and
+writes them to JSON so runs can be compared between commits:
+
+    pip install -r ../requirements-dev.txt
+    python benchmark.py --users 20 --iterations 5 --output before.json
+    python benchmark.py --users 20 --iterations 5 --output after.json --compare before.json
+
+Pass --base-url to drive an already running server (e.g. several uvicorn
+workers started with LLM_BACKEND=fake EMBEDDING_BACKEND=hash) instead.
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import contextlib
+import tempfile
+import subprocess
+from collections import defaultdict
+from datetime import datetime, timezone
+
+SCENARIOS = ("query", "adaptive", "bulk", "auth", "careerfair")
+
+# Rewordings of the same question, as candidates type them at a career fair
+PARAPHRASES = [
+    "How can I improve my resume for {topic} roles?",
+    "how can i improve my resume for {topic} roles",
+    "Please, how can I improve my resume for {topic} roles?",
+    "How can I improve my resume for {topic} roles??",
+]
+
+# Share of adaptive test answers the simulated candidate gets right
+ANSWER_ACCURACY = 0.6
+JOB_DESCRIPTION = "Backend engineer with Python, Kubernetes and SQL experience."
+SKILLS = ["Python", "Kubernetes", "React", "SQL", "Docker", "AWS", "Machine Learning", "Go", "Java", "Terraform"]
+
+
+def make_pdf(text: str) -> bytes:
+    """Builds a minimal single-page PDF whose text PyPDF2 can extract."""
+    lines = [line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") for line in text.split("\n")]
+    stream = "BT /F1 11 Tf 50 760 Td 14 TL " + " ".join(f"({line}) '" for line in lines) + " ET"
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+        "/Resources << /Font << /F1 5 0 R >> >> >>",
+        f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out = "%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n"
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n"
+    return out.encode("latin-1")
+
+
+def make_resume(seed: int) -> bytes:
+    rng = random.Random(seed)
+    skills = rng.sample(SKILLS, 4)
+    lines = [
+        f"Candidate {seed}",
+        f"Software Engineer with {rng.randint(1, 12)} years of experience",
+        "Skills: " + ", ".join(skills),
+    ]
+    for job in range(3):
+        lines.append(f"Company {rng.randint(1, 500)}: built services using {rng.choice(skills)} and {rng.choice(skills)}")
+    lines.append(f"Education: B.Sc. Computer Science, University {rng.randint(1, 50)}")
+    return make_pdf("\n".join(lines))
+
+
+class Recorder:
+    """Collects per-endpoint latencies for one scenario."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def call(self, client, method, path, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, path, **kwargs)
+        except Exception:
+            self.errors[path] += 1
+            self.latencies[path].append(time.perf_counter() - started)
+            return None
+        self.latencies[path].append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            self.errors[path] += 1
+            return None
+        return response
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(recorder, wall_seconds):
+    endpoints = {}
+    for path, values in sorted(recorder.latencies.items()):
+        values = sorted(values)
+        endpoints[path] = {
+            "count": len(values),
+            "errors": recorder.errors[path],
+            "rps": round(len(values) / wall_seconds, 2) if wall_seconds else 0.0,
+            "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(values, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(values, 0.99) * 1000, 2),
+            "max_ms": round(values[-1] * 1000, 2),
+        }
+    return {"wall_seconds": round(wall_seconds, 3), "endpoints": endpoints}
+
+
+async def query_user(client, recorder, user, args):
+    """upload_resume -> N x ask-query."""
+    pdf = make_resume(user)
+    response = await recorder.call(client, "POST", "/upload_resume", files={"file": (f"resume_{user}.pdf", pdf, "application/pdf")})
+    if response is None:
+        return
+    resume_id = response.json()["resume_id"]
+    for question in range(args.steps):
+        await think(args)
+        await recorder.call(client, "POST", "/ask-query", json={
+            "user_query": f"How can I improve my resume for {SKILLS[(user + question) % len(SKILLS)]} roles?",
+            "resume_id": resume_id,
+        })
+
+
+async def careerfair_user(client, recorder, user, args):
+    """upload_resume -> N x ask-query/stream (as the UI calls it) cycling through rewordings of two questions.
+
+    Exercises the semantic answer cache: after the first wording of each
+    question, the rest should be served without retrieval or an LLM call.
+    Resumes are distinct from the query scenario so its answers are not reused.
+    """
+    pdf = make_resume(100000 + user)
+    response = await recorder.call(client, "POST", "/upload_resume", files={"file": (f"resume_{user}.pdf", pdf, "application/pdf")})
+    if response is None:
+        return
+    resume_id = response.json()["resume_id"]
+    topics = [SKILLS[user % len(SKILLS)], SKILLS[(user + 1) % len(SKILLS)]]
+    for question in range(args.steps):
+        await think(args)
+        template = PARAPHRASES[(question // len(topics)) % len(PARAPHRASES)]
+        await recorder.call(client, "POST", "/ask-query/stream", json={
+            "user_query": template.format(topic=topics[question % len(topics)]),
+            "resume_id": resume_id,
+        })
+
+
+async def adaptive_user(client, recorder, user, args):
+    """upload_resume -> start -> N x submit -> feedback."""
+    pdf = make_resume(user)
+    response = await recorder.call(client, "POST", "/upload_resume", files={"file": (f"resume_{user}.pdf", pdf, "application/pdf")})
+    if response is None:
+        return
+    resume_id = response.json()["resume_id"]
+    response = await recorder.call(client, "POST", "/adaptive_test/start", json={"resume_id": resume_id})
+    if response is None:
+        return
+    data = response.json()
+    session_id = data.get("session_id")
+    options = data.get("options", [])
+    answers = {}
+    rng = random.Random(user)
+    for _ in range(args.steps):
+        if not options:
+            break
+        await think(args)
+        # /submit returns options without the answer, so the candidate is right with ANSWER_ACCURACY
+        # and the key is built to match, letting difficulty move both ways
+        texts = [opt["answer"] if isinstance(opt, dict) else opt for opt in options]
+        correct = next((opt["answer"] for opt in options if isinstance(opt, dict) and opt.get("isCorrect")), texts[0])
+        wrong = [text for text in texts if text != correct] or [correct + " (wrong)"]
+        choice = correct if rng.random() < ANSWER_ACCURACY else rng.choice(wrong)
+        response = await recorder.call(client, "POST", "/adaptive_test/submit", json={
+            "user_answer": choice,
+            "correct_answer": correct,
+            "session_id": session_id,
+        })
+        if response is None:
+            break
+        data = response.json()
+        answers[data.get("next_question", f"q{len(answers)}")] = choice
+        options = data.get("options", [])
+    await recorder.call(client, "POST", "/adaptive_test/feedback", json={
+        "user_answers": answers,
+        "resume_id": resume_id,
+        "session_id": session_id,
+    })
+
+
+async def bulk_user(client, recorder, user, args):
+    """One /upload-resumes/ call with a batch of PDFs."""
+    files = [
+        ("files", (f"bulk_{user}_{index}.pdf", make_resume(user * 1000 + index), "application/pdf"))
+        for index in range(args.bulk_files)
+    ]
+    await recorder.call(client, "POST", "/upload-resumes/", files=files, data={"job_description": JOB_DESCRIPTION})
+
+
+async def auth_user(client, recorder, user, args):
+    """signup -> N x login, while the same user runs the query flow alongside.
+
+    Compare /ask-query here with the plain query scenario to see how much
+    password hashing slows unrelated requests.
+    """
+    email = f"bench{user}-{random.getrandbits(32)}@example.com"
+    credentials = {"email": email, "password": f"secret-{user}"}
+    response = await recorder.call(client, "POST", "/signup", json={"name": f"User {user}", **credentials})
+    if response is None:
+        return
+
+    async def logins():
+        for _ in range(args.steps):
+            await think(args)
+            await recorder.call(client, "POST", "/login", json=credentials)
+
+    await asyncio.gather(logins(), query_user(client, recorder, user, args))
+
+
+async def think(args):
+    """Simulates the candidate reading the previous answer or question."""
+    if args.think_ms:
+        await asyncio.sleep(args.think_ms / 1000)
+
+
+USER_FLOWS = {"query": query_user, "adaptive": adaptive_user, "bulk": bulk_user, "auth": auth_user, "careerfair": careerfair_user}
+
+
+async def run_scenario(client, scenario, args):
+    recorder = Recorder()
+    semaphore = asyncio.Semaphore(args.users)
+
+    async def one(user):
+        async with semaphore:
+            await USER_FLOWS[scenario](client, recorder, user, args)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(user) for user in range(args.users * args.iterations)))
+    return summarize(recorder, time.perf_counter() - started)
+
+
+def configure_offline_environment(args):
+    """Points every external dependency at a local stand-in before main.py is imported."""
+    workdir = tempfile.mkdtemp(prefix="resume-bench-")
+    os.environ.setdefault("LLM_BACKEND", "fake")
+    os.environ.setdefault("FAKE_LLM_LATENCY_MS", str(args.llm_latency_ms))
+    os.environ.setdefault("EMBEDDING_BACKEND", "hash")
+    os.environ.setdefault("CHROMA_PERSIST_DIR", os.path.join(workdir, "chromadb_store"))
+    os.environ.setdefault("RESUME_CHROMA_DIR", os.path.join(workdir, "chroma_resumes"))
+    os.environ.setdefault("GEMINI_API_KEY", "offline")
+    os.environ.setdefault("SECRET_KEY", "offline")
+
+    if args.mongo_uri:
+        os.environ["MONGO_URI"] = args.mongo_uri
+    else:
+        import mongomock
+        import pymongo
+        pymongo.MongoClient = mongomock.MongoClient
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).strip()
+    except Exception:
+        return None
+
+
+def print_report(results, baseline=None):
+    for scenario, summary in results["scenarios"].items():
+        print(f"\n== {scenario} ({summary['wall_seconds']}s) ==")
+        print(f"{'endpoint':32} {'count':>6} {'err':>4} {'rps':>8} {'p50':>9} {'p95':>9} {'p99':>9}")
+        for path, stats in summary["endpoints"].items():
+            line = (f"{path:32} {stats['count']:>6} {stats['errors']:>4} {stats['rps']:>8} "
+                    f"{stats['p50_ms']:>9} {stats['p95_ms']:>9} {stats['p99_ms']:>9}")
+            old = (baseline or {}).get("scenarios", {}).get(scenario, {}).get("endpoints", {}).get(path)
+            if old and old["p95_ms"]:
+                line += f"   p95 {100 * (stats['p95_ms'] - old['p95_ms']) / old['p95_ms']:+.1f}%"
+            print(line)
+
+
+async def run(args):
+    import httpx
+
+    app = None
+    lifespan = contextlib.nullcontext()
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout)
+    else:
+        configure_offline_environment(args)
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        from main import app
+        lifespan = app.router.lifespan_context(app)
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=args.timeout)
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "scenarios": {},
+    }
+    async with lifespan, client:
+        # Like a deployed worker, take traffic only once /readyz would pass
+        if app is not None and getattr(app.state, "warmup_task", None) is not None:
+            await app.state.warmup_task
+        for scenario in args.scenarios:
+            results["scenarios"][scenario] = await run_scenario(client, scenario, args)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline latency/throughput benchmark for the resume feedback API.")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--users", type=int, default=10, help="concurrent virtual users")
+    parser.add_argument("--iterations", type=int, default=3, help="scenario runs per virtual user")
+    parser.add_argument("--steps", type=int, default=5, help="queries or submits per scenario run")
+    parser.add_argument("--think-ms", type=float, default=0, help="pause between a user's requests")
+    parser.add_argument("--bulk-files", type=int, default=20, help="PDFs per /upload-resumes/ call")
+    parser.add_argument("--llm-latency-ms", type=float, default=500, help="latency injected by the fake LLM")
+    parser.add_argument("--mongo-uri", help="use a real mongod instead of mongomock")
+    parser.add_argument("--base-url", help="benchmark a running server instead of booting main.app")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="previous results JSON to diff p95 against")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
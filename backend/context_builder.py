@@ -0,0 +1,157 @@
+import os
+import logging
+from dataclasses import dataclass
+from dotenv import load_dotenv
+from resume_search import BM25Index
+from metrics import context_tokens_saved
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_RESUME_TOKEN_BUDGET = int(os.getenv("CONTEXT_RESUME_TOKEN_BUDGET", "1200"))
+CONTEXT_FEEDBACK_TOKEN_BUDGET = int(os.getenv("CONTEXT_FEEDBACK_TOKEN_BUDGET", "600"))
+CONTEXT_MAX_SECTION_TOKENS = int(os.getenv("CONTEXT_MAX_SECTION_TOKENS", "250"))
+CHARS_PER_TOKEN = 4
+
+SECTION_HEADINGS = {
+    "summary", "professional summary", "profile", "objective", "about", "about me",
+    "experience", "work experience", "professional experience", "employment", "work history",
+    "education", "skills", "technical skills", "core skills", "key skills", "technologies",
+    "projects", "personal projects", "certifications", "certificates", "awards", "achievements",
+    "publications", "languages", "interests", "activities", "volunteering", "leadership",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Local token estimate: about 4 characters per token, never fewer than the word count."""
+    if not text:
+        return 0
+    return max(len(text) // CHARS_PER_TOKEN, len(text.split()))
+
+
+def is_heading(line: str) -> bool:
+    """Recognizes resume section headings such as "EXPERIENCE", "Skills:" or "Skills: Python, Go"."""
+    stripped = line.strip()
+    if not stripped:
+        return False
+    label = stripped.split(":", 1)[0].strip().lower()
+    if label in SECTION_HEADINGS:
+        return True
+    words = stripped.split()
+    return len(words) <= 4 and stripped.isupper() and len(stripped) > 3
+
+
+def split_sections(resume_text: str, max_section_tokens: int = CONTEXT_MAX_SECTION_TOKENS) -> list:
+    """Splits a resume at its headings, then cuts oversized sections into windows.
+
+    Text extracted without line breaks is cut into word windows instead, so a
+    single-line resume still yields sections of at most `max_section_tokens`.
+    """
+    sections, current = [], []
+    for line in resume_text.splitlines():
+        if is_heading(line) and current:
+            sections.append(current)
+            current = []
+        if line.strip():
+            current.extend(_wrap(line, max_section_tokens))
+    if current:
+        sections.append(current)
+
+    pieces = []
+    for lines in sections:
+        heading = lines[0] if is_heading(lines[0]) else None
+        window, window_tokens, fresh = [], 0, True
+        for line in lines:
+            cost = estimate_tokens(line)
+            if not fresh and window_tokens + cost > max_section_tokens:
+                pieces.append("\n".join(window))
+                # Repeat the heading on every window so the model knows what it is reading
+                window, window_tokens = ([heading], estimate_tokens(heading)) if heading else ([], 0)
+            window.append(line)
+            window_tokens += cost
+            fresh = False
+        pieces.append("\n".join(window))
+    return pieces
+
+
+def _wrap(line: str, max_tokens: int) -> list:
+    if estimate_tokens(line) <= max_tokens:
+        return [line]
+    words = line.split()
+    step = max(1, max_tokens * CHARS_PER_TOKEN // 8)
+    return [" ".join(words[i:i + step]) for i in range(0, len(words), step)]
+
+
+@dataclass
+class AssembledContext:
+    text: str
+    tokens_used: int
+    tokens_total: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_total - self.tokens_used
+
+
+class ContextAssembler:
+    """Packs the parts of a resume most relevant to a focus query into a token budget.
+
+    The resume is split into sections, each scored against the focus (the user
+    query, the skills under test, ...) with BM25. The opening section (name,
+    headline, contact) is always kept; the rest are taken best-first until the
+    budget is spent and emitted in their original order. Resumes that already
+    fit are passed through untouched.
+    """
+
+    def __init__(self, resume_budget=CONTEXT_RESUME_TOKEN_BUDGET, feedback_budget=CONTEXT_FEEDBACK_TOKEN_BUDGET):
+        self.resume_budget = resume_budget
+        self.feedback_budget = feedback_budget
+
+    def resume(self, resume_text: str, focus: str, prompt: str = "resume") -> AssembledContext:
+        total = estimate_tokens(resume_text)
+        if total <= self.resume_budget:
+            return self._report(AssembledContext(resume_text, total, total), prompt)
+
+        sections = split_sections(resume_text)
+        costs = [estimate_tokens(section) for section in sections]
+        index = BM25Index()
+        for position, section in enumerate(sections):
+            index.add(position, section)
+        scores = dict(index.search(focus or ""))
+
+        chosen = {0}
+        used = costs[0]
+        # Best match first; unmatched sections keep their document order as a tie-break
+        for position in sorted(range(1, len(sections)), key=lambda p: (-scores.get(p, 0.0), p)):
+            if used + costs[position] <= self.resume_budget:
+                chosen.add(position)
+                used += costs[position]
+
+        text = "\n".join(sections[position] for position in sorted(chosen))
+        return self._report(AssembledContext(text, used, total), prompt)
+
+    def feedback(self, feedback_text: str, prompt: str = "feedback") -> AssembledContext:
+        """Keeps retrieved feedback chunks in retrieval order until the feedback budget is spent."""
+        total = estimate_tokens(feedback_text)
+        if total <= self.feedback_budget:
+            return self._report(AssembledContext(feedback_text, total, total), prompt)
+
+        kept, used = [], 0
+        for chunk in feedback_text.split("\n\n"):
+            cost = estimate_tokens(chunk)
+            if used + cost > self.feedback_budget:
+                if not kept:
+                    kept.append(chunk[:self.feedback_budget * CHARS_PER_TOKEN])
+                    used = self.feedback_budget
+                break
+            kept.append(chunk)
+            used += cost
+        return self._report(AssembledContext("\n\n".join(kept), used, total), prompt)
+
+    @staticmethod
+    def _report(context: AssembledContext, prompt: str) -> AssembledContext:
+        context_tokens_saved.observe(context.tokens_saved, prompt=prompt)
+        if context.tokens_saved:
+            logger.info(f"{prompt} context: {context.tokens_used}/{context.tokens_total} tokens, saved {context.tokens_saved}")
+        return context
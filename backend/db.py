@@ -1,10 +1,48 @@
 from pymongo import MongoClient
 from dotenv import load_dotenv
+import threading
 import os
 
 load_dotenv()
 
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "resume_analyzer")
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_PROBE_TIMEOUT_MS = int(os.getenv("MONGO_PROBE_TIMEOUT_MS", "2000"))
+
+_client = None
+_probe_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """Returns the process-wide MongoClient, creating it (and its pool) on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = MongoClient(
+                    MONGO_URI,
+                    maxPoolSize=MONGO_MAX_POOL_SIZE,
+                    minPoolSize=MONGO_MIN_POOL_SIZE,
+                )
+    return _client
+
 def get_collection(collection_name: str):
-    client = MongoClient(os.getenv("MONGO_URI", "mongodb://localhost:27017"))
-    db = client["resume_analyzer"]
+    db = get_client()[MONGO_DB_NAME]
     return db[collection_name]
+
+def ping():
+    """Pings Mongo on a small client with short timeouts, so a readiness probe never waits on the default 30 s server selection."""
+    global _probe_client
+    if _probe_client is None:
+        with _client_lock:
+            if _probe_client is None:
+                _probe_client = MongoClient(
+                    MONGO_URI,
+                    maxPoolSize=1,
+                    serverSelectionTimeoutMS=MONGO_PROBE_TIMEOUT_MS,
+                    connectTimeoutMS=MONGO_PROBE_TIMEOUT_MS,
+                    socketTimeoutMS=MONGO_PROBE_TIMEOUT_MS,
+                )
+    _probe_client.admin.command("ping")
@@ -0,0 +1,221 @@
+import os
+import re
+import math
+import time
+import queue
+import hashlib
+import logging
+import threading
+from typing import List
+from concurrent.futures import Future
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+from chromadb import EmbeddingFunction
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "nomic")
+HASH_EMBEDDING_DIMENSIONS = int(os.getenv("HASH_EMBEDDING_DIMENSIONS", "256"))
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "nomic-ai/nomic-embed-text-v1.5")
+LOCAL_EMBEDDING_DEVICE = os.getenv("LOCAL_EMBEDDING_DEVICE", "cpu")
+LOCAL_EMBEDDING_BATCH_SIZE = int(os.getenv("LOCAL_EMBEDDING_BATCH_SIZE", "32"))
+LOCAL_EMBEDDING_MAX_WAIT_MS = float(os.getenv("LOCAL_EMBEDDING_MAX_WAIT_MS", "5"))
+LOCAL_EMBEDDING_THREADS = int(os.getenv("LOCAL_EMBEDDING_THREADS", str(max(1, (os.cpu_count() or 2) // 2))))
+
+
+class HashEmbeddings(Embeddings):
+    """Deterministic hashing-trick embedder for offline runs and benchmarks.
+
+    Each token is hashed into one of `dimensions` buckets and the vector is L2
+    normalized, so texts sharing words get a positive cosine similarity. No
+    model download or network call is involved.
+    """
+
+    def __init__(self, dimensions=HASH_EMBEDDING_DIMENSIONS):
+        self.dimensions = dimensions
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimensions
+        for token in re.findall(r"[a-z0-9+#]+", text.lower()):
+            digest = hashlib.md5(token.encode()).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dimensions
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+
+class LocalEmbeddings(Embeddings):
+    """Runs a sentence-transformers model on the local CPU instead of a remote API.
+
+    The default is the open-weights nomic-embed-text-v1.5, the same model the
+    "nomic" backend calls remotely, with its search_document/search_query
+    prefixes. Documents are encoded in batches of `batch_size` (sentence-
+    transformers sorts them by length to limit padding). Concurrent
+    embed_query calls are coalesced by one inference thread into a single
+    batch, waiting at most `max_wait_ms` for more queries to arrive. torch is
+    limited to `threads` intra-op threads so inference leaves CPU for the API.
+    """
+
+    def __init__(self, model_name=LOCAL_EMBEDDING_MODEL, device=LOCAL_EMBEDDING_DEVICE,
+                 batch_size=LOCAL_EMBEDDING_BATCH_SIZE, max_wait_ms=LOCAL_EMBEDDING_MAX_WAIT_MS,
+                 threads=LOCAL_EMBEDDING_THREADS):
+        self.model_name = model_name
+        self.device = device
+        self.batch_size = batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.threads = threads
+        is_nomic = "nomic" in model_name
+        self.document_prefix = "search_document: " if is_nomic else ""
+        self.query_prefix = "search_query: " if is_nomic else ""
+        self.stats = {"query_batches": 0, "queries": 0}
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._queries = queue.Queue()
+        self._worker = None
+
+    def _get_model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    import torch
+                    from sentence_transformers import SentenceTransformer
+
+                    torch.set_num_threads(self.threads)
+                    started = time.perf_counter()
+                    self._model = SentenceTransformer(self.model_name, device=self.device, trust_remote_code=True)
+                    logger.info(f"Loaded {self.model_name} on {self.device} with {self.threads} threads "
+                                f"in {time.perf_counter() - started:.1f}s")
+        return self._model
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        vectors = self._get_model().encode(
+            texts, batch_size=self.batch_size, normalize_embeddings=True, convert_to_numpy=True, show_progress_bar=False
+        )
+        return vectors.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return self._encode([self.document_prefix + text for text in texts])
+
+    def embed_query(self, text: str) -> List[float]:
+        future = Future()
+        self._ensure_worker()
+        self._queries.put((self.query_prefix + text, future))
+        return future.result()
+
+    def warmup(self):
+        """Loads the model and runs one inference so the first request does not pay for it."""
+        self.embed_query("warm up")
+
+    def _ensure_worker(self):
+        if self._worker is None:
+            with self._model_lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._serve_queries, name="embedding-batcher", daemon=True)
+                    self._worker.start()
+
+    def _serve_queries(self):
+        while True:
+            batch = [self._queries.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queries.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                vectors = self._encode([text for text, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.stats["query_batches"] += 1
+            self.stats["queries"] += len(batch)
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
+
+
+def embedding_model(embeddings):
+    """Names the model behind an embeddings object, so stored vectors can be matched to it."""
+    if isinstance(embeddings, HashEmbeddings):
+        return f"hash-{embeddings.dimensions}"
+    return getattr(embeddings, "model_name", None) or getattr(embeddings, "model", None) or type(embeddings).__name__
+
+
+class ChromaEmbeddingAdapter(EmbeddingFunction):
+    """Exposes a LangChain embeddings object through Chroma's EmbeddingFunction protocol.
+
+    Chroma registers embedding functions by the class-level name(), so the
+    backend and model that produced a collection's vectors are recorded in
+    get_config() instead; ResumeProcessor compares it with the persisted one.
+    Instances rebuilt from a persisted config create their embeddings lazily,
+    so opening a collection never loads the model it was built with.
+    """
+
+    def __init__(self, embeddings: Embeddings = None, backend: str = EMBEDDING_BACKEND, model: str = None):
+        self._embeddings = embeddings
+        self.backend = backend
+        self.model = model or (embedding_model(embeddings) if embeddings is not None else None)
+
+    @property
+    def embeddings(self):
+        if self._embeddings is None:
+            self._embeddings = create_embeddings(self.backend)
+        return self._embeddings
+
+    def __call__(self, input):
+        return self.embeddings.embed_documents(list(input))
+
+    def embed_query(self, input):
+        # Chroma calls this for query_texts, so query-side prefixes and batching apply
+        return [self.embeddings.embed_query(text) for text in input]
+
+    @staticmethod
+    def name() -> str:
+        return "resume_feedback_embeddings"
+
+    def get_config(self):
+        return {"backend": self.backend, "model": self.model}
+
+    @staticmethod
+    def build_from_config(config):
+        return ChromaEmbeddingAdapter(backend=config.get("backend"), model=config.get("model"))
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def create_embeddings(backend=None):
+    """Returns the process-wide embeddings for EMBEDDING_BACKEND ("nomic", "local" or "hash").
+
+    One instance per backend is shared by store_main and process, so a local
+    model is loaded once and both collections are embedded the same way.
+    """
+    backend = backend or EMBEDDING_BACKEND
+    with _shared_lock:
+        if backend not in _shared:
+            if backend == "hash":
+                _shared[backend] = HashEmbeddings()
+            elif backend == "local":
+                _shared[backend] = LocalEmbeddings()
+            elif backend == "nomic":
+                from langchain_nomic import NomicEmbeddings
+                _shared[backend] = NomicEmbeddings(model="nomic-embed-text-v1.5")
+            else:
+                raise ValueError(f"Unknown EMBEDDING_BACKEND {backend!r}; expected 'nomic', 'local' or 'hash'.")
+        return _shared[backend]
+
+
+def create_chroma_embedding_function():
+    """The shared embeddings wrapped for raw Chroma collections."""
+    return ChromaEmbeddingAdapter(create_embeddings())
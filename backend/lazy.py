@@ -0,0 +1,37 @@
+import time
+import logging
+import threading
+from metrics import stage_seconds
+
+logger = logging.getLogger(__name__)
+
+
+class LazyService:
+    """Builds an expensive object on first use and hands out the same instance afterwards.
+
+    Instances are callable without arguments, so they work directly as FastAPI
+    dependencies (`Depends(resume_processor)`); FastAPI runs them in its thread
+    pool, so a first-time build does not block the event loop. Build time is
+    recorded under stage_duration_seconds{stage="init_<name>"}.
+    """
+
+    def __init__(self, name, factory):
+        self.name = name
+        self.factory = factory
+        self._instance = None
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    started = time.perf_counter()
+                    self._instance = self.factory()
+                    elapsed = time.perf_counter() - started
+                    stage_seconds.observe(elapsed, stage=f"init_{self.name}")
+                    logger.info(f"Initialized {self.name} in {elapsed:.2f}s")
+        return self._instance
+
+    @property
+    def initialized(self):
+        return self._instance is not None
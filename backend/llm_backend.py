@@ -0,0 +1,254 @@
+import os
+import re
+import json
+import asyncio
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from metrics import timed, llm_calls, llm_tokens
+
+load_dotenv()
+
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+LLM_MODEL_NAME = os.getenv("LLM_MODEL_NAME", "gemini-2.0-flash")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "0"))
+
+_semaphore = None
+_executor = None
+
+
+def _get_semaphore():
+    """Process-wide cap on in-flight LLM calls, shared by every backend."""
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+    return _semaphore
+
+
+def _get_executor():
+    """Bounded thread pool for backends without a native async client."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=LLM_MAX_CONCURRENCY, thread_name_prefix="llm")
+    return _executor
+
+
+class LLMBackend:
+    """Base class for text generation backends.
+
+    Subclasses implement `_generate` (async) and/or `_generate_sync`. Callers use
+    `generate`, which applies the global concurrency limit and the per-call timeout.
+    """
+
+    def __init__(self, timeout=LLM_TIMEOUT_SECONDS):
+        self.timeout = timeout
+
+    @property
+    def is_configured(self):
+        """False when the backend is missing credentials; reported by /readyz."""
+        return True
+
+    async def generate(self, prompt, timeout=None):
+        """Returns the generated text for a prompt, or None if the model returned nothing."""
+        timeout = timeout or self.timeout
+        async with _get_semaphore():
+            with timed("llm_call"):
+                try:
+                    text = await asyncio.wait_for(self._generate(prompt), timeout=timeout)
+                except asyncio.TimeoutError:
+                    llm_calls.inc(status="timeout")
+                    raise TimeoutError(f"LLM call timed out after {timeout}s")
+                except Exception:
+                    llm_calls.inc(status="error")
+                    raise
+        llm_calls.inc(status="ok")
+        return text
+
+    async def stream(self, prompt, timeout=None):
+        """Yields the response text in chunks as the model produces them.
+
+        The timeout bounds the whole stream, not each chunk.
+        """
+        timeout = timeout or self.timeout
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        async with _get_semaphore():
+            with timed("llm_call"):
+                chunks = self._stream(prompt).__aiter__()
+                while True:
+                    remaining = deadline - loop.time()
+                    try:
+                        if remaining <= 0:
+                            raise asyncio.TimeoutError
+                        chunk = await asyncio.wait_for(chunks.__anext__(), timeout=remaining)
+                    except StopAsyncIteration:
+                        break
+                    except asyncio.TimeoutError:
+                        llm_calls.inc(status="timeout")
+                        raise TimeoutError(f"LLM call timed out after {timeout}s")
+                    except Exception:
+                        llm_calls.inc(status="error")
+                        raise
+                    if chunk:
+                        yield chunk
+        llm_calls.inc(status="ok")
+
+    async def _generate(self, prompt):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), self._generate_sync, prompt)
+
+    async def _stream(self, prompt):
+        # Backends without native streaming emit the full response as one chunk
+        yield await self._generate(prompt)
+
+    def _generate_sync(self, prompt):
+        raise NotImplementedError
+
+
+class GeminiBackend(LLMBackend):
+    """Google Gemini backend using the SDK's native async client."""
+
+    def __init__(self, api_key=None, model_name=LLM_MODEL_NAME, **kwargs):
+        super().__init__(**kwargs)
+        self.api_key = api_key or os.getenv("GEMINI_API_KEY")
+        self.model_name = model_name
+        self._model = None
+
+    @property
+    def is_configured(self):
+        return bool(self.api_key)
+
+    @property
+    def model(self):
+        """The SDK is imported and configured on first use; a missing key fails the call, not the process."""
+        if self._model is None:
+            if not self.api_key:
+                raise ValueError("Missing GEMINI_API_KEY. Please set it in the environment variables.")
+            import google.generativeai as genai
+
+            genai.configure(api_key=self.api_key)
+            self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    async def _generate(self, prompt):
+        response = await self.model.generate_content_async([{"role": "user", "parts": [{"text": prompt}]}])
+        self._record_usage(response)
+        return self._response_text(response)
+
+    async def _stream(self, prompt):
+        response = await self.model.generate_content_async(
+            [{"role": "user", "parts": [{"text": prompt}]}], stream=True
+        )
+        async for chunk in response:
+            text = self._response_text(chunk, strip=False)
+            if text:
+                yield text
+        self._record_usage(response)
+
+    def _generate_sync(self, prompt):
+        response = self.model.generate_content([{"role": "user", "parts": [{"text": prompt}]}])
+        self._record_usage(response)
+        return self._response_text(response)
+
+    @staticmethod
+    def _record_usage(response):
+        usage = getattr(response, "usage_metadata", None)
+        if usage:
+            llm_tokens.inc(getattr(usage, "prompt_token_count", 0) or 0, direction="prompt")
+            llm_tokens.inc(getattr(usage, "candidates_token_count", 0) or 0, direction="completion")
+
+    @staticmethod
+    def _response_text(response, strip=True):
+        try:
+            if not response or not response.text:
+                return None
+            return response.text.strip() if strip else response.text
+        except ValueError:
+            # Raised by the SDK when the candidate was blocked and has no text parts
+            return None
+
+
+class FakeBackend(LLMBackend):
+    """Deterministic offline backend for load tests and local development.
+
+    Answers are derived from a hash of the prompt, so the same prompt always gets
+    the same response. `latency_ms` simulates model round-trip time without
+    blocking the event loop.
+    """
+
+    def __init__(self, latency_ms=FAKE_LLM_LATENCY_MS, **kwargs):
+        super().__init__(**kwargs)
+        self.latency_ms = latency_ms
+        self.calls = 0
+
+    async def _generate(self, prompt):
+        self.calls += 1
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        return self.respond(prompt)
+
+    async def _stream(self, prompt):
+        self.calls += 1
+        words = self.respond(prompt).split(" ")
+        for i, word in enumerate(words):
+            if self.latency_ms:
+                await asyncio.sleep(self.latency_ms / 1000 / len(words))
+            yield word if i == 0 else " " + word
+
+    def _generate_sync(self, prompt):
+        self.calls += 1
+        return self.respond(prompt)
+
+    def respond(self, prompt):
+        """Builds a canned response shaped like the one the prompt asks for."""
+        response = self._respond(prompt)
+        # Rough 4-characters-per-token estimate, in place of the provider's usage metadata
+        llm_tokens.inc(len(prompt) // 4, direction="prompt")
+        llm_tokens.inc(len(response) // 4, direction="completion")
+        return response
+
+    def _respond(self, prompt):
+        seed = hashlib.sha256(prompt.encode()).hexdigest()[:8]
+
+        if '"feedback_summary"' in prompt:
+            return json.dumps({
+                "feedback_summary": f"Offline feedback {seed}.",
+                "skill_levels": [{"skill": "Python", "level": "Intermediate", "evidence": "Fake evidence."}],
+                "strengths": ["Consistent answers"],
+                "areas_for_improvement": ["More practice at higher levels"],
+                "suggested_improvements": ["Review core concepts"]
+            })
+
+        if '"questions"' in prompt:
+            level_counts = re.search(r"\(level: count\):\*\* ([\d:, ]+)", prompt).group(1)
+            questions = []
+            for level, count in re.findall(r"(\d+): (\d+)", level_counts):
+                level = int(level)
+                for index in range(int(count)):
+                    options = [f"Option {letter} ({seed}-{level}-{index})" for letter in "ABCD"]
+                    questions.append({
+                        "question": f"Offline question {seed} at level {level}, variant {chr(97 + index)}?",
+                        "options": options,
+                        "answer": options[(int(seed, 16) + index) % 4],
+                        "difficulty_level": level
+                    })
+            return json.dumps({"questions": questions})
+
+        if '"question"' in prompt and '"options"' in prompt:
+            options = [f"Option {letter} ({seed})" for letter in "ABCD"]
+            return json.dumps({
+                "question": f"Offline question {seed}?",
+                "options": options,
+                "answer": options[int(seed, 16) % 4]
+            })
+
+        return f"Offline response {seed}: focus on measurable impact and relevant skills."
+
+
+def create_llm_backend(api_key=None):
+    """Builds the backend selected by LLM_BACKEND ("gemini" or "fake")."""
+    if LLM_BACKEND == "fake":
+        return FakeBackend()
+    return GeminiBackend(api_key=api_key)
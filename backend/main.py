@@ -1,40 +1,52 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+import time
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Depends
 from fastapi.security import OAuth2PasswordBearer
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from PyPDF2 import PdfReader
-from pydantic import BaseModel
-from typing import List
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
+from pydantic import BaseModel, Field
+from typing import List, Optional
 import os
-import tempfile
-from query_engine import QueryEngine
+import json
+import asyncio
+from query_engine import QueryEngine, AdaptiveDifficultyEngine
 from dotenv import load_dotenv
-from typing import List,Dict
+from typing import List, Dict, Any
 from auth import router as auth_router
 from db import get_collection
-from pymongo import MongoClient
-from passlib.context import CryptContext
 from schemas import UserCreate
-from auth import get_password_hash,create_access_token
+from auth import authenticate, issue_tokens, get_current_admin
+from password_hashing import password_hasher, HashingPoolBusy
+from session_store import create_session_store
+from llm_backend import create_llm_backend
+from prefetch import QuestionPrefetcher
+from question_bank import QuestionBank, resume_fingerprint
+from resume_cache import ResumeCache
+from answer_cache import create_answer_cache
+from pdf_extraction import PdfExtractionEngine
+from screening_config import SCREENING_SHORTLIST_SIZE
+from metrics import timed, render_metrics
+from user_repository import DuplicateEmailError
+import user_repository
+from refresh_tokens import refresh_tokens
+from lazy import LazyService
+from db import ping as ping_mongo
+from metrics import stage_seconds
+import logging
 
 load_dotenv()
 
-# Connect to MongoDB
-uri = os.getenv("MONGO_URI", "mongodb://localhost:27017")
-client = MongoClient(uri)
-db = client["resume_analyzer"]
-users_collection = db["users"]
-admin_collection = db["admins"]
-users_collection = get_collection("users")
-admin_collection = get_collection("admins")
+logger = logging.getLogger(__name__)
 
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = "HS256"
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true"
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", "3"))
 
 app = FastAPI()
 app.include_router(auth_router)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # CORS middleware for React frontend
 app.add_middleware(
@@ -48,15 +60,133 @@ app.add_middleware(
 # Retrieve API Key for Gemini
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
+# Shared LLM backend (LLM_BACKEND=fake for offline runs)
+llm = create_llm_backend(GEMINI_API_KEY)
+
 # Initialize QueryEngine
-query_engine = QueryEngine(gemini_api_key=GEMINI_API_KEY)
+# Answers reused for similar questions about the same resume (ANSWER_CACHE_ENABLED=false to disable)
+answer_cache = create_answer_cache()
+question_bank = QuestionBank(get_collection("question_bank"))
+query_engine = QueryEngine(llm=llm, question_bank=question_bank, answer_cache=answer_cache)
+
+# One adaptive difficulty state per test session
+session_store = create_session_store()
+
+# Background generation of the next question at level +1 / -1
+prefetcher = QuestionPrefetcher(query_engine)
+
+# Extracted resume text keyed by SHA-256 of the uploaded PDF
+resume_cache = ResumeCache(get_collection("resumes"))
+
+# Process pool for CPU-bound PDF parsing
+pdf_extractor = PdfExtractionEngine()
+
+def build_resume_processor():
+    from process import ResumeProcessor
+    return ResumeProcessor(llm=llm)
+
+def build_resume_search():
+    from resume_search import HybridResumeSearch
+    return HybridResumeSearch(resume_processor())
+
+# Chroma-backed services are built on first use (or by warm-up), not at import
+resume_processor = LazyService("resume_processor", build_resume_processor)
+resume_search_service = LazyService("resume_search", build_resume_search)
+
+# Startup timings and warm-up state, reported by /readyz
+startup_state = {"boot_seconds": None, "warmup_seconds": None, "warmup": "pending", "mongo_indexes": "pending", "errors": {}}
+
+def warm_up():
+    """Opens both Chroma stores and runs one embedding through each embedder."""
+    with timed("warmup_feedback_store"):
+        query_engine.db_manager.embed_query("warm up")
+    with timed("warmup_resume_store"):
+        processor = resume_processor()
+        processor.collection.count()
+        processor.embedding_function(["warm up"])
+    resume_search_service()
+
+async def ensure_mongo_indexes():
+    """Creates the Mongo indexes the app relies on for correctness.
+
+    The unique email index is what rejects duplicate signups, and the TTL
+    indexes expire refresh tokens, persisted test sessions and cached
+    resumes. Each step runs even if another fails. Failures are logged and
+    reported by /readyz, which retries them, so a worker that cannot reach
+    Mongo still boots.
+    """
+    steps = {
+        "users": user_repository.ensure_indexes,
+        "refresh_tokens": refresh_tokens.ensure_indexes,
+        "question_bank": lambda: asyncio.to_thread(question_bank.ensure_indexes),
+        "test_sessions": session_store.ensure_indexes,
+        "resumes": resume_cache.ensure_indexes,
+    }
+    failed = False
+    for name, call in steps.items():
+        try:
+            await call()
+            startup_state["errors"].pop(f"mongo_indexes.{name}", None)
+        except Exception as e:
+            logger.exception(f"Creating {name} indexes failed")
+            startup_state["errors"][f"mongo_indexes.{name}"] = str(e)
+            failed = True
+    startup_state["mongo_indexes"] = "failed" if failed else "done"
+
+def start_mongo_indexes():
+    """Runs ensure_mongo_indexes in the background unless it is already running."""
+    task = getattr(app.state, "mongo_indexes_task", None)
+    if task is None or task.done():
+        startup_state["mongo_indexes"] = "pending"
+        app.state.mongo_indexes_task = asyncio.create_task(ensure_mongo_indexes())
+
+async def run_warmup():
+    started = time.perf_counter()
+    try:
+        await asyncio.to_thread(warm_up)
+        startup_state["warmup"] = "done"
+    except Exception as e:
+        logger.exception("Warm-up of the vector stores failed")
+        startup_state["errors"]["vector_stores"] = str(e)
+        startup_state["warmup"] = "failed"
+    startup_state["warmup_seconds"] = round(time.perf_counter() - started, 3)
+    stage_seconds.observe(startup_state["warmup_seconds"], stage="warmup")
+    logger.info(f"Warm-up {startup_state['warmup']} in {startup_state['warmup_seconds']}s")
+
+@app.on_event("startup")
+async def start_warmup():
+    boot_seconds = time.perf_counter() - _import_started
+    startup_state["boot_seconds"] = round(boot_seconds, 3)
+    stage_seconds.observe(boot_seconds, stage="startup")
+    if boot_seconds > STARTUP_BUDGET_SECONDS:
+        logger.warning(f"Startup took {boot_seconds:.2f}s, over the {STARTUP_BUDGET_SECONDS}s budget")
+
+    # Required before taking traffic: /readyz stays 503 until the indexes exist
+    start_mongo_indexes()
+
+    # Warm up in the background; /healthz answers immediately and /readyz waits for this
+    if WARMUP_ON_STARTUP:
+        app.state.warmup_task = asyncio.create_task(run_warmup())
+    else:
+        startup_state["warmup"] = "skipped"
+
+@app.on_event("shutdown")
+def shutdown_worker_pools():
+    password_hasher.shutdown()
+    pdf_extractor.shutdown()
 
 class QueryRequest(BaseModel):
     user_query: str
-    resume_text: str
+    resume_text: Optional[str] = None
+    resume_id: Optional[str] = None
 
 class ResumeRequest(BaseModel):
-    resume_text: str
+    resume_text: Optional[str] = None
+    resume_id: Optional[str] = None
+    session_id: Optional[str] = None
+
+class SessionRequest(BaseModel):
+    session_id: Optional[str] = None
 
 class Question(BaseModel):
     question: str
@@ -84,10 +214,20 @@ class UserQueryRequest(BaseModel):
 class UserAnswerRequest(BaseModel):
     user_answer: str
     correct_answer: str
+    session_id: Optional[str] = None
 
 class UserAnswersRequest(BaseModel):
     user_answers: dict
-    resume_text: str
+    resume_text: Optional[str] = None
+    resume_id: Optional[str] = None
+    session_id: Optional[str] = None
+
+class ResumeSearchRequest(BaseModel):
+    query: str
+    limit: int = Field(10, ge=1, le=100)
+    offset: int = Field(0, ge=0)
+    filters: Optional[Dict[str, Any]] = None
+    lexical_weight: float = Field(0.5, ge=0.0, le=1.0)
 
 class UserLogin(BaseModel):
     email: str
@@ -95,33 +235,128 @@ class UserLogin(BaseModel):
 
 class TestResultsRequest(BaseModel):
     questions: List[dict]
-    resume_text: str
+    resume_text: Optional[str] = None
+    resume_id: Optional[str] = None
+    session_id: Optional[str] = None
 
 class AnswerRequest(BaseModel):
     selected_answer: str
     current_question: dict
+    session_id: Optional[str] = None
+
+async def resolve_resume_text(resume_text, resume_id):
+    """Returns the resume text sent in the request, or the cached text for a resume_id."""
+    if resume_id:
+        text = await asyncio.to_thread(resume_cache.get, resume_id)
+        if text is None:
+            raise HTTPException(status_code=404, detail="Unknown resume_id. Please upload the resume again.")
+        if not text.strip():
+            # Cached before uploads without a text layer were rejected
+            raise HTTPException(status_code=422, detail="No text could be extracted from this resume.")
+        return text
+
+    if not resume_text or not resume_text.strip():
+        raise HTTPException(status_code=400, detail="Resume text cannot be empty")
+    return resume_text
+
+async def remember_resume(resume_text, resume_id):
+    """Returns a resume_id a session can resolve later; pasted text is cached under its fingerprint."""
+    if resume_id:
+        return resume_id
+    resume_id = resume_fingerprint(resume_text)
+    await asyncio.to_thread(resume_cache.put, resume_id, resume_text)
+    return resume_id
+
+async def session_resume_text(difficulty_engine):
+    """The text of the resume the session was started with."""
+    if not difficulty_engine.resume_id:
+        raise HTTPException(status_code=409, detail="This test session has no resume. Please start the test again.")
+    return await resolve_resume_text(None, difficulty_engine.resume_id)
+
+async def load_session(session_id):
+    """Returns the engine of an existing adaptive test session; 404 if it is unknown or expired."""
+    difficulty_engine = await session_store.get(session_id)
+    if difficulty_engine is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired test session")
+    return difficulty_engine
+
+async def next_question(session_id, resume_text, difficulty_engine):
+    """Serves a prefetched or pooled question, then prefetches for neighbouring levels the pool does not cover.
+
+    The first question is generated on its own; the question ladder is built in the background after it.
+    """
+    level = difficulty_engine.get_current_difficulty()
+    prefetcher.merge_ladder(session_id, difficulty_engine)
+    prefetched = await prefetcher.take(session_id, level, difficulty_engine)
+    if prefetched:
+        question_data, error = prefetched
+    else:
+        # While the ladder is still being generated it will refill the pool, so no refill batch is started
+        question_data, error = await query_engine.generate_next_question(
+            resume_text, difficulty_engine, refill=not prefetcher.ladder_pending(session_id)
+        )
+
+    if not error:
+        difficulty_engine.mark_seen(question_data.get("question_hash"))
+        prefetcher.schedule_ladder(session_id, resume_text, difficulty_engine)
+        await session_store.save(session_id, difficulty_engine)
+        prefetcher.schedule(session_id, resume_text, difficulty_engine)
+    return question_data, error
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and serving the event loop."""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: warm-up finished, Mongo answers with its indexes in place and the LLM backend has credentials."""
+    checks = {"warmup": startup_state["warmup"] in ("done", "skipped"), "llm": llm.is_configured}
+    try:
+        await asyncio.to_thread(ping_mongo)
+        checks["mongo"] = True
+    except Exception:
+        checks["mongo"] = False
+    checks["mongo_indexes"] = startup_state["mongo_indexes"] == "done"
+    if checks["mongo"] and startup_state["mongo_indexes"] == "failed":
+        # Mongo is back; try the indexes again without holding up this probe
+        start_mongo_indexes()
+
+    body = {
+        "status": "ready" if all(checks.values()) else "not ready",
+        "checks": checks,
+        "startup": {**startup_state, "budget_seconds": STARTUP_BUDGET_SECONDS},
+    }
+    return JSONResponse(status_code=200 if all(checks.values()) else 503, content=body)
+
+@app.get("/metrics")
+def metrics():
+    """Stage latency histograms and counters in Prometheus text format."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
 
-def extract_text_from_pdf(file_path):
-    with open(file_path, "rb") as f:
-        reader = PdfReader(f)
-        text = "\n".join([page.extract_text() for page in reader.pages if page.extract_text()])
-    return text
+@app.get("/admin/answer-cache")
+async def answer_cache_stats(admin: str = Depends(get_current_admin)):
+    """Semantic answer cache size and hit ratio for /ask-query."""
+    if answer_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **answer_cache.stats()}
 
 # Resume Upload Endpoint
 @app.post("/upload_resume")
 async def upload_resume(file: UploadFile = File(...)):
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-            tmp.write(await file.read())
-            temp_path = tmp.name
-
-        with open(temp_path, "rb") as f:
-            reader = PdfReader(f)
-            resume_text = "\n".join([page.extract_text() for page in reader.pages if page.extract_text()])
-
-        os.remove(temp_path)
-
-        return {"resume_text": resume_text}
+        content = await file.read()
+        resume_id = resume_cache.resume_id(content)
+        resume_text = await asyncio.to_thread(resume_cache.get, resume_id)
+        if resume_text is None:
+            with timed("pdf_parse"):
+                resume_text = await pdf_extractor.extract(content)
+            if not resume_text.strip():
+                # Unreadable or scanned PDFs are not cached, so later steps never run on an empty resume
+                return JSONResponse(status_code=422, content={"detail": "No text could be extracted from the PDF."})
+            await asyncio.to_thread(resume_cache.put, resume_id, resume_text)
+
+        return {"resume_text": resume_text, "resume_id": resume_id}
     except Exception as e:
         return JSONResponse(status_code=500, content={"detail": str(e)})
     
@@ -133,21 +368,43 @@ async def ask_query(request: QueryRequest):
     if not request.user_query.strip():
         raise HTTPException(status_code=400, detail="Query cannot be empty")
     
-    if not request.resume_text.strip():
-        raise HTTPException(status_code=400, detail="Resume text cannot be empty")
+    resume_text = await resolve_resume_text(request.resume_text, request.resume_id)
     
     # Process the query using the QueryEngine (replace with your actual logic)
-    response = query_engine.query(request.user_query, request.resume_text)
+    response = await query_engine.query(request.user_query, resume_text)
     
     return JSONResponse({"response": response}, status_code=200)
 
+# Streaming Query Handler Endpoint (Server-Sent Events)
+@app.post("/ask-query/stream")
+async def ask_query_stream(request: QueryRequest):
+    """Streams the response to the user's query as SSE `data:` events, ending with `event: done`."""
+    if not request.user_query.strip():
+        raise HTTPException(status_code=400, detail="Query cannot be empty")
+    
+    resume_text = await resolve_resume_text(request.resume_text, request.resume_id)
+
+    async def event_stream():
+        async for chunk in query_engine.query_stream(request.user_query, resume_text):
+            yield f"data: {json.dumps({'chunk': chunk})}\n\n"
+        yield "event: done\ndata: {}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app.post("/adaptive_test/start")
-def start_adaptive_test(request: ResumeRequest):
-    resume_text = request.resume_text
-    question_data, error = query_engine.generate_next_question(resume_text)
+async def start_adaptive_test(request: ResumeRequest):
+    resume_text = await resolve_resume_text(request.resume_text, request.resume_id)
+    session_id, difficulty_engine = await session_store.get_or_create(request.session_id)
+    # Later submits resolve the resume from the session instead of trusting the request
+    difficulty_engine.resume_id = await remember_resume(resume_text, request.resume_id)
+    question_data, error = await next_question(session_id, resume_text, difficulty_engine)
     
     if error:
-        return {"error": error}
+        return {"error": error, "session_id": session_id}
     
     formatted_options = [
         {"answer": opt, "isCorrect": opt.strip() == question_data["answer"].strip()}
@@ -157,7 +414,8 @@ def start_adaptive_test(request: ResumeRequest):
     return {
         "question": question_data["question"],
         "options": formatted_options,
-        "difficulty_level": question_data["difficulty_level"]
+        "difficulty_level": question_data["difficulty_level"],
+        "session_id": session_id
     }
 
 @app.post("/adaptive_test/submit")
@@ -166,13 +424,19 @@ async def submit_answer(user_answer_request: UserAnswerRequest):
         user_answer = user_answer_request.user_answer
         correct_answer = user_answer_request.correct_answer
         
+        session_id = user_answer_request.session_id
+        difficulty_engine = await load_session(session_id)
+        # The next question is for the resume the session was started with
+        resume_text = await session_resume_text(difficulty_engine)
+
         # Update difficulty based on user's answer
-        result = query_engine.update_difficulty(user_answer, correct_answer)
+        result = query_engine.update_difficulty(user_answer, correct_answer, difficulty_engine)
+        await session_store.save(session_id, difficulty_engine)
         
         # Generate next question
-        question_data, error = query_engine.generate_next_question(user_answer_request.correct_answer)
+        question_data, error = await next_question(session_id, resume_text, difficulty_engine)
         
-        print(f"Next Question: {question_data}")  # Debugging log
+        logger.debug(f"Next Question: {question_data}")
         
         if error:
             raise HTTPException(status_code=500, detail=error)
@@ -181,8 +445,11 @@ async def submit_answer(user_answer_request: UserAnswerRequest):
             "is_correct": result["is_correct"],
             "new_difficulty": result["new_difficulty"],
             "next_question": question_data["question"],
-            "options": question_data["options"]
+            "options": question_data["options"],
+            "session_id": session_id
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -191,23 +458,27 @@ async def provide_feedback(user_answers_request: UserAnswersRequest):
     """
     Analyzes the user's answers and provides detailed feedback.
     """
+    resume_text = await resolve_resume_text(user_answers_request.resume_text, user_answers_request.resume_id)
     try:
         user_answers = user_answers_request.user_answers
-        resume_text = user_answers_request.resume_text
         
-        feedback = query_engine.analyze_user_answers(user_answers, resume_text)
+        # Read only: an unknown session is analysed without response history
+        difficulty_engine = await session_store.get(user_answers_request.session_id) or AdaptiveDifficultyEngine()
+        feedback = await query_engine.analyze_user_answers(user_answers, resume_text, difficulty_engine)
         
         return {"feedback": feedback}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/reset_difficulty")
-async def reset_difficulty():
+async def reset_difficulty(request: Optional[SessionRequest] = None):
     """
-    Resets the difficulty engine to the initial state.
+    Resets the session's difficulty engine to the initial state.
     """
     try:
-        query_engine.difficulty_engine.reset()
+        if request and request.session_id:
+            prefetcher.discard(request.session_id)
+            await session_store.delete(request.session_id)
         return {"message": "Difficulty reset to the initial state."}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -215,7 +486,7 @@ async def reset_difficulty():
 
 
 @app.post("/adaptive_test/answer")
-def process_answer(request: AnswerRequest):
+async def process_answer(request: AnswerRequest):
     """Processes the user's answer and returns feedback."""
     try:
         selected_answer = request.selected_answer
@@ -235,40 +506,53 @@ def process_answer(request: AnswerRequest):
         is_correct = selected_answer.strip() == correct_answer.strip()
         
         # Update difficulty based on the answer
-        query_engine.difficulty_engine.record_response(is_correct)
+        session_id = request.session_id
+        difficulty_engine = await load_session(session_id)
+        difficulty_engine.record_response(is_correct)
+        await session_store.save(session_id, difficulty_engine)
+
+        # Drop the prefetched branch the candidate did not take
+        prefetcher.resolve(session_id, difficulty_engine.get_current_difficulty())
         
         return {
             "correct": is_correct,
             "correct_answer": correct_answer,
-            "new_difficulty": query_engine.difficulty_engine.get_current_difficulty()
+            "new_difficulty": difficulty_engine.get_current_difficulty(),
+            "session_id": session_id
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/adaptive_test/results")
-def get_test_results(request: TestResultsRequest):
+async def get_test_results(request: TestResultsRequest):
     """Analyzes the complete test results and provides detailed feedback."""
+    resume_text = await resolve_resume_text(request.resume_text, request.resume_id)
     try:
         questions = request.questions
-        resume_text = request.resume_text
         
         # Format question history for analysis
         question_answers = {item["question"]: item["user_answer"] for item in questions}
         
         # Generate feedback analysis
-        feedback = query_engine.analyze_user_answers(question_answers, resume_text)
+        # Read only: an unknown session is analysed without response history
+        difficulty_engine = await session_store.get(request.session_id) or AdaptiveDifficultyEngine()
+        feedback = await query_engine.analyze_user_answers(question_answers, resume_text, difficulty_engine)
         
         return {"feedback": feedback}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/adaptive_test/reset")
-def reset_test():
-    """Resets the adaptive test difficulty engine."""
+async def reset_test(request: Optional[SessionRequest] = None):
+    """Resets the adaptive test difficulty engine for a session."""
     try:
-        query_engine.difficulty_engine.reset()
-        return {"message": "Test reset successfully", "new_difficulty": query_engine.difficulty_engine.get_current_difficulty()}
+        if request and request.session_id:
+            prefetcher.discard(request.session_id)
+            await session_store.delete(request.session_id)
+        return {"message": "Test reset successfully", "new_difficulty": AdaptiveDifficultyEngine().get_current_difficulty()}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -276,102 +560,130 @@ def reset_test():
 @app.post("/signup")
 async def signup(user: UserCreate):
     try:
-        if users_collection.find_one({"email": user.email}):
-            raise HTTPException(status_code=400, detail="Email already registered.")
-
         user_dict = user.dict()
-        user_dict["password"] = get_password_hash(user_dict["password"])
+        user_dict["password"] = await password_hasher.hash(user_dict["password"])
 
-        # Insert user into MongoDB
-        result = users_collection.insert_one(user_dict)
+        # The unique email index rejects duplicates in the same round trip
+        inserted_id = await user_repository.users.create(user_dict)
 
-        if result.inserted_id:
+        if inserted_id:
             return {"message": "Signup successful!"}
         else:
             raise HTTPException(status_code=500, detail="Signup failed.")
 
+    except DuplicateEmailError:
+        raise HTTPException(status_code=400, detail="Email already registered.")
+    except HashingPoolBusy:
+        raise HTTPException(status_code=503, detail="Server busy, please retry.", headers={"Retry-After": "1"})
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
 @app.post("/adminsignup")
 async def signup(user: UserCreate):
     try:
-        if admin_collection.find_one({"email": user.email}):
-            raise HTTPException(status_code=400, detail="Email already registered.")
-
         user_dict = user.dict()
-        user_dict["password"] = get_password_hash(user_dict["password"])
+        user_dict["password"] = await password_hasher.hash(user_dict["password"])
 
-        result = admin_collection.insert_one(user_dict)
+        inserted_id = await user_repository.admins.create(user_dict)
 
-        if result.inserted_id:
+        if inserted_id:
             return {"message": "Signup successful!"}
         else:
             raise HTTPException(status_code=500, detail="Signup failed.")
 
+    except DuplicateEmailError:
+        raise HTTPException(status_code=400, detail="Email already registered.")
+    except HashingPoolBusy:
+        raise HTTPException(status_code=503, detail="Server busy, please retry.", headers={"Retry-After": "1"})
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/login")
 async def login(user: UserLogin):
     try:
-        # Find user by email
-        user_record = users_collection.find_one({"email": user.email})
+        # Verify password on the hashing pool, upgrading deprecated hashes
+        user_record = await authenticate(user_repository.users, user.email, user.password)
         if not user_record:
             raise HTTPException(status_code=401, detail="Invalid email or password.")
 
-        # Verify password
-        if not pwd_context.verify(user.password, user_record["password"]):
-            raise HTTPException(status_code=401, detail="Invalid email or password.")
-
-        # Generate JWT token
-        access_token = create_access_token(data={"sub": user.email})
-        
-        return {"access_token": access_token, "token_type": "bearer"}
+        # Generate JWT access token and a rotating refresh token
+        return await issue_tokens(user.email, "user")
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
 @app.post("/adminlogin")
 async def login(user: UserLogin):
     try:
-        # Find user by email
-        user_record = admin_collection.find_one({"email": user.email})
+        # Verify password on the hashing pool, upgrading deprecated hashes
+        user_record = await authenticate(user_repository.admins, user.email, user.password)
         if not user_record:
             raise HTTPException(status_code=401, detail="Invalid email or password.")
 
-        # Verify password
-        if not pwd_context.verify(user.password, user_record["password"]):
-            raise HTTPException(status_code=401, detail="Invalid email or password.")
-
-        # Generate JWT token
-        access_token = create_access_token(data={"sub": user.email})
-        
-        return {"access_token": access_token, "token_type": "bearer"}
+        # Generate JWT access token and a rotating refresh token
+        return await issue_tokens(user.email, "admin")
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
-from process import ResumeProcessor
-
-processor = ResumeProcessor(gemini_api_key=os.getenv("GEMINI_API_KEY"))
-
 @app.post("/upload-resumes/")
 async def upload_resumes(
     files: List[UploadFile] = File(...),
+    job_description: Optional[str] = Form(None),
+    processor=Depends(resume_processor),
 ):
-    resumes_text = []
-    filenames = []
+    contents = [await file.read() for file in files]
+    filenames = [file.filename for file in files]
+
+    # Parse all files in parallel on the process pool, results in upload order
+    with timed("pdf_parse"):
+        resumes_text = await pdf_extractor.extract_many(contents)
+
+    # Files that failed to parse or have no text layer are reported, not stored or ranked as empty resumes
+    unreadable = [name for name, text in zip(filenames, resumes_text) if not text.strip()]
+    filenames = [name for name, text in zip(filenames, resumes_text) if text.strip()]
+    resumes_text = [text for text in resumes_text if text.strip()]
+    if not resumes_text:
+        raise HTTPException(status_code=422, detail="No text could be extracted from the uploaded PDFs.")
+    if not (job_description and job_description.strip()) and len(resumes_text) > SCREENING_SHORTLIST_SIZE:
+        # Without a job description nothing decides which resumes make the shortlist
+        raise HTTPException(
+            status_code=400,
+            detail=f"A job_description is required to screen more than {SCREENING_SHORTLIST_SIZE} resumes.",
+        )
+
+    doc_ids = await asyncio.to_thread(processor.store_in_vector_db, resumes_text, filenames)
+
+    # Embedding pre-rank over all uploads; only the shortlist reaches the LLM
+    top_result = await processor.generate_top_resume(resumes_text, filenames, job_description, doc_ids)
 
-    for file in files:
-        content = await file.read()
-        text = processor.extract_text_from_pdf(content)
-        resumes_text.append(text)
-        filenames.append(file.filename)
+    top_result_names = top_result.split("\n")  
+    return {"top_result": top_result_names, "unreadable_files": unreadable}
 
-    processor.store_in_vector_db(resumes_text, filenames)
 
-    top_result = processor.generate_top_resume(resumes_text, filenames)
+@app.post("/resumes/search")
+async def search_resumes(
+    request: ResumeSearchRequest,
+    admin: str = Depends(get_current_admin),
+    resume_search=Depends(resume_search_service),
+):
+    """Hybrid BM25 + vector search over every stored resume, no LLM call. Admins only.
 
-    top_result_names = top_result.split("\n")  
-    return {"top_result": top_result_names}
+    `filters` uses Chroma metadata syntax, e.g. {"uploaded_at": {"$gte": 1700000000}}.
+    `candidates` in the response counts the fused candidate set, not every matching resume.
+    """
+    try:
+        return await asyncio.to_thread(
+            resume_search.search, request.query, request.limit, request.offset,
+            request.filters, request.lexical_weight,
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,75 @@
+import os
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from passlib.context import CryptContext
+from dotenv import load_dotenv
+from metrics import timed, rejected_requests
+
+load_dotenv()
+
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+
+# Password hashing context
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+class HashingPoolBusy(Exception):
+    """Raised when the hashing queue is full; endpoints answer 503 so clients retry later."""
+
+
+class PasswordHasher:
+    """Runs bcrypt hashing and verification on a small dedicated thread pool.
+
+    bcrypt releases the GIL while hashing, so threads give real parallelism and
+    keep the ~250 ms of CPU per call off the event loop. At most `max_queue`
+    jobs may wait behind the `max_workers` running ones; beyond that new work
+    is rejected immediately instead of piling up latency for everyone.
+    """
+
+    def __init__(self, context=pwd_context, max_workers=PASSWORD_HASH_WORKERS, max_queue=PASSWORD_HASH_MAX_QUEUE):
+        self.context = context
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def _run(self, func, *args):
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                rejected_requests.inc(pool="password_hash")
+                raise HashingPoolBusy()
+            self._pending += 1
+        try:
+            with timed("password_hash"):
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str):
+        """Returns (valid, new_hash); new_hash is set when the stored hash uses deprecated settings."""
+        return await self._run(self.context.verify_and_update, password, hashed_password)
+
+    @property
+    def pending(self):
+        return self._pending
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,91 @@
+import os
+import time
+import asyncio
+import logging
+from io import BytesIO
+from typing import List
+from concurrent.futures import ProcessPoolExecutor
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "20"))
+PDF_EXTRACT_TIMEOUT_SECONDS = float(os.getenv("PDF_EXTRACT_TIMEOUT_SECONDS", "10"))
+
+
+def extract_pdf_text(file_bytes: bytes, max_pages: int = PDF_MAX_PAGES,
+                     time_limit: float = PDF_EXTRACT_TIMEOUT_SECONDS, separator: str = "\n") -> str:
+    """Extracts text from an in-memory PDF, calling extract_text() once per page.
+
+    Stops after `max_pages` pages or once `time_limit` seconds have been spent,
+    returning whatever was extracted so far.
+    """
+    from PyPDF2 import PdfReader
+
+    started = time.monotonic()
+    reader = PdfReader(BytesIO(file_bytes))
+    texts = []
+    for page_number, page in enumerate(reader.pages):
+        if page_number >= max_pages:
+            logger.warning(f"PDF truncated at {max_pages} pages.")
+            break
+        if time.monotonic() - started > time_limit:
+            logger.warning(f"PDF extraction stopped after {time_limit}s at page {page_number}.")
+            break
+        text = page.extract_text()
+        if text:
+            texts.append(text)
+    return separator.join(texts)
+
+
+class PdfExtractionEngine:
+    """Extracts text from PDFs on a process pool, keeping the event loop free.
+
+    PyPDF2 is pure Python and CPU bound, so threads would serialize on the GIL.
+    Results come back in input order; a file that fails yields an empty string.
+    The time limit is enforced inside the worker (checked between pages), so
+    time spent queued behind other files never counts against a file.
+    """
+
+    def __init__(self, max_workers=PDF_EXTRACT_WORKERS, max_pages=PDF_MAX_PAGES,
+                 timeout=PDF_EXTRACT_TIMEOUT_SECONDS, separator="\n"):
+        self.max_workers = max_workers
+        self.max_pages = max_pages
+        self.timeout = timeout
+        self.separator = separator
+        self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    async def extract(self, file_bytes: bytes) -> str:
+        """Extracts the text of a single PDF."""
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(
+            self._get_executor(), extract_pdf_text, file_bytes, self.max_pages, self.timeout, self.separator
+        )
+        # No outer wait_for: it would count queue time, and cancelling it would not stop the worker anyway
+        return await future
+
+    async def extract_many(self, files: List[bytes]) -> List[str]:
+        """Extracts many PDFs in parallel and returns their texts in input order."""
+        results = await asyncio.gather(*(self.extract(file_bytes) for file_bytes in files), return_exceptions=True)
+
+        texts = []
+        for index, result in enumerate(results):
+            if isinstance(result, BaseException):
+                logger.error(f"Failed to extract PDF #{index}: {result!r}")
+                texts.append("")
+            else:
+                texts.append(result)
+        return texts
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,191 @@
+import os
+import asyncio
+from collections import OrderedDict
+from dotenv import load_dotenv
+from metrics import record_cache
+
+load_dotenv()
+
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "true").lower() == "true"
+PREFETCH_MAX_INFLIGHT = int(os.getenv("PREFETCH_MAX_INFLIGHT", "16"))
+PREFETCH_MAX_SESSIONS = int(os.getenv("PREFETCH_MAX_SESSIONS", "1000"))
+
+
+class QuestionPrefetcher:
+    """Speculatively generates the next adaptive test question.
+
+    After a question at level N is served, questions at N+1 and N-1 are generated
+    in the background while the candidate reads. When the answer is recorded the
+    branch that was not taken is cancelled, and the next request picks up the
+    surviving one. Prefetch is best effort: when the in-flight budget is spent
+    nothing is scheduled and the caller generates on the critical path as before.
+    Levels that still have questions in the session's pool are not prefetched;
+    for a level that has run dry the prefetch performs the pool refill, and the
+    refilled questions are merged into the session when the branch is taken.
+
+    The session's first question comes from a single-question call; the full
+    question ladder is then generated in the background (schedule_ladder) and
+    merged into the pool by the first request after it finishes. Until then
+    pool misses, including prefetches, are served by single-question calls
+    rather than a refill batch. Ladders are not speculative, so
+    they run even when prefetch is disabled. Both live in this process only; a
+    request that lands on another worker falls back to generating itself.
+    """
+
+    def __init__(self, query_engine, max_inflight=PREFETCH_MAX_INFLIGHT, max_sessions=PREFETCH_MAX_SESSIONS, enabled=PREFETCH_ENABLED):
+        self.query_engine = query_engine
+        self.max_inflight = max_inflight
+        self.max_sessions = max_sessions
+        self.enabled = enabled
+        self._pending = OrderedDict()
+        self._ladders = OrderedDict()
+        self._inflight = 0
+        self.stats = {"scheduled": 0, "hits": 0, "misses": 0, "cancelled": 0, "skipped": 0}
+
+    def schedule(self, session_id, resume_text, difficulty_engine):
+        """Starts background generation for both neighbouring difficulty levels."""
+        if not self.enabled:
+            return
+
+        self.discard(session_id, ladder=False)
+        current = difficulty_engine.get_current_difficulty()
+        levels = {
+            min(current + 1, difficulty_engine.max_level),
+            max(current - 1, difficulty_engine.min_level),
+        }
+        levels = {level for level in levels if not difficulty_engine.pooled(level)}
+
+        tasks = {}
+        for level in levels:
+            if self._inflight >= self.max_inflight:
+                self.stats["skipped"] += 1
+                continue
+            refill = not self.ladder_pending(session_id)
+            task = asyncio.create_task(self._generate(resume_text, level, difficulty_engine, refill))
+            self._inflight += 1
+            task.add_done_callback(self._task_done)
+            tasks[level] = task
+            self.stats["scheduled"] += 1
+
+        if tasks:
+            self._pending[session_id] = tasks
+            self._evict()
+
+    def schedule_ladder(self, session_id, resume_text, difficulty_engine):
+        """Starts generating the session's question ladder once its first question has been served.
+
+        Marks the pool as filled so later requests do not ask for the ladder again.
+        """
+        if difficulty_engine.pool_filled or self.query_engine.questions_per_level <= 0:
+            return
+        level = difficulty_engine.get_current_difficulty()
+        counts = self.query_engine.batch_counts(difficulty_engine, level)
+        difficulty_engine.pool_filled = True
+
+        task = asyncio.create_task(self.query_engine.generate_question_batch(
+            resume_text, counts, seen=list(difficulty_engine.seen_questions)
+        ))
+        task.add_done_callback(self._ladder_done)
+        self._ladders[session_id] = task
+        while len(self._ladders) > self.max_sessions:
+            _, evicted = self._ladders.popitem(last=False)
+            self._cancel(evicted)
+
+    def ladder_pending(self, session_id):
+        """True while the session's background ladder is still being generated."""
+        task = self._ladders.get(session_id)
+        return task is not None and not task.done()
+
+    def merge_ladder(self, session_id, difficulty_engine):
+        """Adds the session's background ladder to its pool once it has finished; never waits for it."""
+        task = self._ladders.get(session_id)
+        if task is None or not task.done():
+            return
+        del self._ladders[session_id]
+        if task.cancelled() or task.exception() is not None:
+            return
+        ladder, error = task.result()
+        if error:
+            return
+        for level, questions in ladder.items():
+            difficulty_engine.add_to_pool(level, questions)
+
+    async def _generate(self, resume_text, level, difficulty_engine, refill=True):
+        """Generates the question for `level` on a copy of the session's engine; returns it with the copy's pool."""
+        branch = type(difficulty_engine).from_state(difficulty_engine.to_state())
+        branch.current_level = level
+        question_data, error = await self.query_engine.generate_next_question(resume_text, branch, refill=refill)
+        return question_data, error, branch
+
+    def resolve(self, session_id, level):
+        """Cancels every prefetched branch except the one for `level`."""
+        tasks = self._pending.get(session_id)
+        if not tasks:
+            return
+        for other_level, task in list(tasks.items()):
+            if other_level != level:
+                self._cancel(task)
+                del tasks[other_level]
+
+    async def take(self, session_id, level, difficulty_engine):
+        """Returns the prefetched (question_data, error) for `level`, or None if there is none.
+
+        Questions the prefetch added to its copy of the pool are merged into
+        `difficulty_engine`. Hits and misses are only counted when a prefetch
+        was scheduled for this session and level, so questions served from the
+        pool or the bank do not show up as misses.
+        """
+        tasks = self._pending.pop(session_id, None) or {}
+        task = tasks.pop(level, None)
+        for other in tasks.values():
+            self._cancel(other)
+        if task is None:
+            return None
+
+        question_data, error, branch = None, "cancelled", None
+        if not task.cancelled():
+            try:
+                question_data, error, branch = await task
+            except Exception:
+                pass
+
+        if error:
+            self.stats["misses"] += 1
+            record_cache("question_prefetch", False)
+            return None
+
+        for pooled_level, questions in branch.question_pool.items():
+            difficulty_engine.add_to_pool(pooled_level, questions)
+        difficulty_engine.pool_filled = difficulty_engine.pool_filled or branch.pool_filled
+
+        self.stats["hits"] += 1
+        record_cache("question_prefetch", True)
+        return question_data, error
+
+    def discard(self, session_id, ladder=True):
+        """Cancels all prefetch work for a session, including its ladder unless `ladder` is false."""
+        for task in self._pending.pop(session_id, {}).values():
+            self._cancel(task)
+        if ladder and session_id in self._ladders:
+            self._cancel(self._ladders.pop(session_id))
+
+    def _cancel(self, task):
+        if not task.done():
+            task.cancel()
+            self.stats["cancelled"] += 1
+
+    def _task_done(self, task):
+        self._inflight -= 1
+        # Retrieve the exception so asyncio does not log it as never retrieved
+        if not task.cancelled():
+            task.exception()
+
+    def _ladder_done(self, task):
+        if not task.cancelled():
+            task.exception()
+
+    def _evict(self):
+        while len(self._pending) > self.max_sessions:
+            _, tasks = self._pending.popitem(last=False)
+            for task in tasks.values():
+                self._cancel(task)
@@ -1,17 +1,29 @@
-import uuid
-from typing import List
-from io import BytesIO
-from PyPDF2 import PdfReader
-import chromadb
-from chromadb import PersistentClient
+import time
+import threading
+import hashlib
+import asyncio
+from typing import List, Optional
+import numpy as np
 from pydantic import BaseModel
-import google.generativeai as genai
+from llm_backend import create_llm_backend
+from pdf_extraction import extract_pdf_text
+from embeddings import create_chroma_embedding_function
+from resume_search import BM25Index
+from vector_store import create_chroma_client
+from screening_config import SCREENING_SHORTLIST_SIZE, SCREENING_TOKEN_BUDGET, CHARS_PER_TOKEN
+from chromadb.errors import NotFoundError
 import logging
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+RESUME_CHROMA_DIR = os.getenv("RESUME_CHROMA_DIR", "./chroma_resumes")
+RESUME_UPSERT_BATCH_SIZE = int(os.getenv("RESUME_UPSERT_BATCH_SIZE", "128"))
+# A re-embed whose worker has not reported progress for this long is taken over by another worker
+REEMBED_STALE_SECONDS = int(os.getenv("REEMBED_STALE_SECONDS", "300"))
+REEMBED_POLL_SECONDS = 2
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -25,35 +37,208 @@ class ResumeMetadata(BaseModel):
     }
 
 class ResumeProcessor:
-    def __init__(self, gemini_api_key: str = None, chroma_dir: str = "./chroma_resumes", collection_name: str = "resume_collection"):
-        self.gemini_api_key = gemini_api_key or os.getenv("GEMINI_API_KEY")
-        if not self.gemini_api_key:
-            raise ValueError("Missing GEMINI_API_KEY. Please set it in the environment variables.")
+    def __init__(self, gemini_api_key: str = None, chroma_dir: str = RESUME_CHROMA_DIR, collection_name: str = "resume_collection", llm=None):
+        self.llm = llm or create_llm_backend(gemini_api_key)
+
+        self.chroma_client = create_chroma_client(chroma_dir)
+        # Same embedding backend as the feedback store, also used for job descriptions
+        self.embedding_function = create_chroma_embedding_function()
+        self.collection = self._open_collection(collection_name, self.embedding_function)
+        # Keyword index kept in step with the collection for hybrid search
+        self.lexical_index = BM25Index()
+        # Concurrent uploads in this worker write one at a time
+        self._write_lock = threading.Lock()
+
+    def _open_collection(self, name, embedding_function):
+        """Opens the collection, re-embedding it once if it was built with a different embedder.
+
+        The copy is written to `<name>_reembed`, which doubles as a lock between
+        workers: whoever creates it does the copy, the others wait until it has
+        been swapped in. A copy whose worker stopped reporting progress for
+        REEMBED_STALE_SECONDS is taken over, so a crash mid-copy or mid-swap is
+        finished by the next worker that starts.
+        """
+        staging_name = f"{name}_reembed"
+        while True:
+            staging = self._find_collection(staging_name, embedding_function)
+            if staging is None:
+                collection = self._open_if_current(name, embedding_function)
+                if collection is not None:
+                    return collection
+                try:
+                    staging = self.chroma_client.create_collection(
+                        name=staging_name, embedding_function=embedding_function,
+                        metadata={"reembed_heartbeat": time.time()},
+                    )
+                except Exception:
+                    if self._find_collection(staging_name, embedding_function) is None:
+                        raise
+                    continue  # Another worker claimed the re-embed first
+                logger.warning(f"{name} was embedded with another model; re-embedding its resumes with the configured backend.")
+            elif time.time() - (staging.metadata or {}).get("reembed_heartbeat", 0) < REEMBED_STALE_SECONDS:
+                time.sleep(REEMBED_POLL_SECONDS)
+                continue
+            else:
+                logger.warning(f"Taking over an abandoned re-embed of {name}.")
+                self._heartbeat(staging)
+            return self._reembed(name, staging)
+
+    def _find_collection(self, name, embedding_function):
+        try:
+            return self.chroma_client.get_collection(name=name, embedding_function=embedding_function)
+        except NotFoundError:
+            return None
 
-        genai.configure(api_key=self.gemini_api_key)
-        self.model = genai.GenerativeModel("gemini-2.0-flash")
+    def _open_if_current(self, name, embedding_function):
+        """Returns the collection if its vectors come from `embedding_function`'s backend and model, else None."""
+        try:
+            collection = self.chroma_client.get_or_create_collection(name=name, embedding_function=embedding_function)
+        except ValueError as e:
+            if "Embedding function conflict" not in str(e):
+                raise
+            return None
+        persisted = (collection.configuration_json or {}).get("embedding_function") or {}
+        return collection if persisted.get("config") == embedding_function.get_config() else None
+
+    def _heartbeat(self, staging, **metadata):
+        staging.modify(metadata={**(staging.metadata or {}), **metadata, "reembed_heartbeat": time.time()})
 
-        self.chroma_client = PersistentClient(path=chroma_dir)
-        self.collection = self.chroma_client.get_or_create_collection(name=collection_name)
+    def _reembed(self, name, staging):
+        """Copies `name` into the staging collection, then replaces `name` with it.
+
+        Upserts are idempotent, so a taken-over copy simply runs again. The
+        original is deleted only after the copy holds at least as many records
+        and has been marked complete; until then the resumes stay where they were.
+        """
+        if not (staging.metadata or {}).get("reembed_complete"):
+            previous = self.chroma_client.get_collection(name=name)
+            total = previous.count()
+            for offset in range(0, total, RESUME_UPSERT_BATCH_SIZE):
+                page = previous.get(limit=RESUME_UPSERT_BATCH_SIZE, offset=offset, include=["documents", "metadatas"])
+                if page["ids"]:
+                    staging.upsert(ids=page["ids"], documents=page["documents"], metadatas=page["metadatas"])
+                self._heartbeat(staging)
+            copied = staging.count()
+            if copied < total:
+                raise RuntimeError(f"Re-embedding {name} copied {copied} of {total} resumes; the original was kept.")
+            self._heartbeat(staging, reembed_complete=True)
+            logger.info(f"Re-embedded {total} resumes for {name}.")
+
+        try:
+            previous = self.chroma_client.get_collection(name=name)
+            if previous.id != staging.id:
+                self.chroma_client.delete_collection(name)
+        except NotFoundError:
+            pass  # Deleted before an interrupted swap
+        staging.modify(name=name, metadata={"reembedded_at": time.time()})
+        return staging
 
     def extract_text_from_pdf(self, file_bytes: bytes) -> str:
-        reader = PdfReader(BytesIO(file_bytes))
-        text = " ".join([page.extract_text() or "" for page in reader.pages])
+        text = extract_pdf_text(file_bytes, separator=" ")
         if not text:
             logger.warning("No text extracted from PDF.")
         return text
 
-    def store_in_vector_db(self, resume_texts: List[str], filenames: List[str]) -> None:
-        for idx, text in enumerate(resume_texts):
-            doc_id = f"{filenames[idx]}-{uuid.uuid4()}"
-            self.collection.add(
-                documents=[text],
-                ids=[doc_id],
-                metadatas=[{"filename": filenames[idx]}]
-            )
-            logger.info(f"Stored document {doc_id} in vector database.")
-
-    def generate_top_resume(self, resume_texts: List[str], filenames: List[str]) -> str:
+    def store_in_vector_db(self, resume_texts: List[str], filenames: List[str],
+                           batch_size: int = RESUME_UPSERT_BATCH_SIZE) -> List[str]:
+        """Stores the resumes in batches and returns their ids in input order.
+
+        Ids are the SHA-256 of the extracted text, so re-uploading a resume maps
+        to the vector already stored. Ids that already exist are skipped before
+        embedding, and each batch is embedded and written with a single upsert().
+        """
+        doc_ids = [self.resume_id(text) for text in resume_texts]
+
+        unique = {}
+        for doc_id, text, filename in zip(doc_ids, resume_texts, filenames):
+            if text and text.strip() and doc_id not in unique:
+                unique[doc_id] = (text, filename)
+        pending = list(unique)
+
+        batch_size = min(batch_size, self.chroma_client.get_max_batch_size())
+        stored = 0
+        with self._write_lock:
+            for start in range(0, len(pending), batch_size):
+                batch_ids = pending[start:start + batch_size]
+                existing = set(self.collection.get(ids=batch_ids, include=[])["ids"])
+                new_ids = [doc_id for doc_id in batch_ids if doc_id not in existing]
+                if not new_ids:
+                    continue
+                uploaded_at = int(time.time())
+                metadatas = [{"filename": unique[doc_id][1], "uploaded_at": uploaded_at} for doc_id in new_ids]
+                # Upsert, so workers racing on the same new resume converge on one record
+                self.collection.upsert(
+                    documents=[unique[doc_id][0] for doc_id in new_ids],
+                    ids=new_ids,
+                    metadatas=metadatas,
+                )
+                for doc_id, metadata in zip(new_ids, metadatas):
+                    self.lexical_index.add(doc_id, unique[doc_id][0], metadata)
+                stored += len(new_ids)
+
+        logger.info(f"Stored {stored} new of {len(resume_texts)} uploaded resumes in vector database.")
+        return doc_ids
+
+    @staticmethod
+    def resume_id(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def rank_resumes(self, resume_texts: List[str], job_description: str, doc_ids: Optional[List[str]] = None) -> List[tuple]:
+        """Scores every resume against the job description by cosine similarity.
+
+        Reuses the vectors already stored in resume_collection when `doc_ids` is
+        given, so only the job description is embedded. Returns (index, score)
+        pairs, best first; resumes without text are left out.
+        """
+        candidates = [i for i, text in enumerate(resume_texts) if text and text.strip()]
+        if not candidates:
+            return []
+
+        if doc_ids is not None:
+            stored = self.collection.get(ids=[doc_ids[i] for i in candidates], include=["embeddings"])
+            by_id = dict(zip(stored["ids"], stored["embeddings"]))
+            vectors = np.asarray([by_id[doc_ids[i]] for i in candidates], dtype=np.float32)
+        else:
+            vectors = np.asarray(self.embedding_function([resume_texts[i] for i in candidates]), dtype=np.float32)
+        query = np.asarray(self.embedding_function.embed_query([job_description])[0], dtype=np.float32)
+
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+        query /= np.linalg.norm(query) + 1e-12
+        scores = vectors @ query
+
+        order = np.argsort(-scores)
+        return [(candidates[j], float(scores[j])) for j in order]
+
+    @staticmethod
+    def build_shortlist(ranked: List[tuple], resume_texts: List[str], top_k: int = SCREENING_SHORTLIST_SIZE,
+                        token_budget: int = SCREENING_TOKEN_BUDGET) -> List[tuple]:
+        """Takes the best `top_k` resumes, in full, until the prompt token budget is spent.
+
+        The resume that crosses the budget is cut to what remains; ranking stops there.
+        Returns (index, text) pairs.
+        """
+        shortlist = []
+        remaining = token_budget * CHARS_PER_TOKEN
+        for index, _ in ranked[:top_k]:
+            text = resume_texts[index]
+            if len(text) > remaining:
+                if shortlist and remaining < 500:
+                    break
+                text = text[:remaining]
+            shortlist.append((index, text))
+            remaining -= len(text)
+            if remaining <= 0:
+                break
+        return shortlist
+
+    async def generate_top_resume(self, resume_texts: List[str], filenames: List[str],
+                                  job_description: Optional[str] = None, doc_ids: Optional[List[str]] = None) -> str:
+        """Pre-ranks all resumes by embedding similarity, then asks the LLM to order the shortlist.
+
+        Without a job description there is nothing to rank against, so the
+        resumes keep their upload order; callers should then send no more than
+        SCREENING_SHORTLIST_SIZE of them.
+        """
         default_prompt = (
             "You are an expert recruiter. Analyze the following resumes and determine which candidate is "
             "best suited for the given role based on skills, experience, and education."
@@ -66,13 +251,25 @@ class ResumeProcessor:
 
 "Return only the full names of the top 1–3 candidates in order of suitability. Do not include any explanation — just output their names.")
 
-        for i, text in enumerate(resume_texts):
-            combined_prompt += f"Resume {i + 1} ({filenames[i]}):\n{text[:1500]}\n\n"
+        ranked = [(i, 0.0) for i, text in enumerate(resume_texts) if text]
+        if job_description and job_description.strip():
+            try:
+                ranked = await asyncio.to_thread(self.rank_resumes, resume_texts, job_description, doc_ids)
+            except Exception as e:
+                logger.error(f"Embedding pre-ranking failed, keeping upload order: {e}")
+        shortlist = self.build_shortlist(ranked, resume_texts)
+        logger.info(f"Shortlisted {len(shortlist)} of {len(resume_texts)} resumes for the LLM.")
+
+        combined_prompt += "\n\n"
+        if job_description and job_description.strip():
+            combined_prompt += f"Job description:\n{job_description}\n\n"
+        for i, (index, text) in enumerate(shortlist):
+            combined_prompt += f"Resume {i + 1} ({filenames[index]}):\n{text}\n\n"
 
         try:
-            response = self.model.generate_content(combined_prompt)
-            if hasattr(response, "text"):
-                return response.text
+            response_text = await self.llm.generate(combined_prompt)
+            if response_text:
+                return response_text
             else:
                 return "No response from Gemini."
         except Exception as e:
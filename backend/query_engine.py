@@ -1,41 +1,133 @@
 import os
-import google.generativeai as genai
-from store_main import ChromaDBManager
+import asyncio
+import threading
+from llm_backend import create_llm_backend
+from question_bank import resume_fingerprint, question_hash, is_valid_question
+from metrics import timed, record_cache
+from context_builder import ContextAssembler
+from structured_output import parse_structured, parse_structured_items, QuestionOutput, FeedbackOutput, StructuredOutputError
 from dotenv import load_dotenv
-import json
-import re
+import logging
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Focus used to pick resume sections for question generation
+QUESTION_FOCUS = "skills technical skills technologies tools frameworks languages projects experience"
+
+# Questions generated per difficulty level in one batched call; 0 generates one question per call
+QUESTIONS_PER_LEVEL = int(os.getenv("QUESTIONS_PER_LEVEL", "3"))
+# A batch asks for many questions at once, so it gets a longer limit than a single-question call
+QUESTION_BATCH_TIMEOUT_SECONDS = float(os.getenv("QUESTION_BATCH_TIMEOUT_SECONDS", "60"))
+
 class QueryEngine:
-    def __init__(self, gemini_api_key=None):
-        """Initializes the Query Engine with Gemini API."""
-        self.gemini_api_key = gemini_api_key or os.getenv("GEMINI_API_KEY")
-        if not self.gemini_api_key:
-            raise ValueError("Missing GEMINI_API_KEY. Please set it in the environment variables.")
-
-        genai.configure(api_key=self.gemini_api_key)
-        self.model = genai.GenerativeModel("gemini-2.0-flash")
-        self.db_manager = ChromaDBManager()
-        
-        # Initialize adaptive difficulty engine
-        self.difficulty_engine = AdaptiveDifficultyEngine()
+    def __init__(self, gemini_api_key=None, llm=None, question_bank=None, context_assembler=None, db_manager=None,
+                 answer_cache=None, questions_per_level=QUESTIONS_PER_LEVEL):
+        """Initializes the Query Engine with an LLM backend (Gemini by default)."""
+        self.llm = llm or create_llm_backend(gemini_api_key)
+        self.questions_per_level = questions_per_level
+        self._banking = set()
+        self.question_bank = question_bank
+        self.answer_cache = answer_cache
+        self.context_assembler = context_assembler or ContextAssembler()
+        self._db_manager = db_manager
+        self._db_manager_lock = threading.Lock()
+
+    @property
+    def db_manager(self):
+        """The feedback ChromaDBManager, opened on first use so importing this module stays cheap."""
+        if self._db_manager is None:
+            with self._db_manager_lock:
+                if self._db_manager is None:
+                    from store_main import ChromaDBManager
+                    self._db_manager = ChromaDBManager()
+        return self._db_manager
+
+    async def query(self, user_query, resume_text):
+        """Fetches relevant feedback from ChromaDB and generates a response using the LLM.
+
+        With an answer cache, a question similar enough to one already answered
+        for the same resume is served from the cache without retrieval or an LLM call.
+        """
+        resume_hash, embedding, cached = await self.lookup_answer(user_query, resume_text)
+        if cached is not None:
+            return cached
+
+        combined_context = await self.build_query_context(user_query, resume_text)
+        response, generated = await self.generate_ai_response(user_query, combined_context)
+        if generated and embedding is not None:
+            self.answer_cache.store(resume_hash, embedding, response)
+        return response
 
-    def query(self, user_query, resume_text):
-        """Fetches relevant feedback from ChromaDB and generates a response using Gemini."""
-        relevant_feedback = self.db_manager.retrieve_documents(user_query)
+    async def query_stream(self, user_query, resume_text):
+        """Like query(), but yields the response text in chunks as the model produces them.
+
+        A cached answer is yielded as a single chunk; a streamed answer is cached
+        once the stream completes without error.
+        """
+        resume_hash, embedding, cached = await self.lookup_answer(user_query, resume_text)
+        if cached is not None:
+            yield cached
+            return
+
+        combined_context = await self.build_query_context(user_query, resume_text)
+        with timed("prompt_build"):
+            prompt = self.build_response_prompt(user_query, combined_context)
+
+        chunks = []
+        try:
+            async for chunk in self.llm.stream(prompt):
+                chunks.append(chunk)
+                yield chunk
+        except Exception as e:
+            yield f"Error generating response: {str(e)}"
+            return
+
+        response = "".join(chunks)
+        if response and embedding is not None:
+            self.answer_cache.store(resume_hash, embedding, response)
+
+    async def lookup_answer(self, user_query, resume_text):
+        """Returns (resume_hash, query embedding, cached answer or None); all None without an answer cache."""
+        if self.answer_cache is None:
+            return None, None, None
+        resume_hash = resume_fingerprint(resume_text)
+        # Cached by the feedback store, so retrieval reuses this embedding
+        embedding = await asyncio.to_thread(self.db_manager.embed_query, user_query)
+        return resume_hash, embedding, self.answer_cache.lookup(resume_hash, embedding)
+
+    async def build_query_context(self, user_query, resume_text):
+        """Combines the resume with feedback retrieved for the query."""
+        relevant_feedback = await asyncio.to_thread(self.db_manager.retrieve_documents, user_query)
 
         # Ensure valid text is passed
         relevant_feedback = relevant_feedback if relevant_feedback else "No relevant feedback available."
 
-        # Combine resume and retrieved feedback as context
-        combined_context = f"Resume:\n{resume_text}\n\nRelevant Feedback:\n{relevant_feedback}"
+        # Only the resume sections and feedback that fit the token budget go into the prompt
+        resume = self.context_assembler.resume(resume_text, user_query, prompt="query")
+        feedback = self.context_assembler.feedback(relevant_feedback, prompt="query")
 
-        return self.generate_ai_response(user_query, combined_context)
+        # Combine resume and retrieved feedback as context
+        return f"Resume:\n{resume.text}\n\nRelevant Feedback:\n{feedback.text}"
         
-    def generate_ai_response(self, user_query, context):
-        """Generates a concise and insightful AI response using Google Gemini."""
-        prompt = f"""
+    async def generate_ai_response(self, user_query, context):
+        """Generates a concise and insightful AI response using the LLM backend.
+
+        Returns (text, generated); `generated` is False when the text is an error or placeholder.
+        """
+        with timed("prompt_build"):
+            prompt = self.build_response_prompt(user_query, context)
+
+        try:
+            response_text = await self.llm.generate(prompt)
+            return response_text or "No response generated.", bool(response_text)
+        except Exception as e:
+            return f"Error generating response: {str(e)}", False
+
+    def build_response_prompt(self, user_query, context):
+        """Builds the career coach prompt for a user query."""
+        return f"""
         You are a professional career coach specializing in personalized resume analysis and career growth. Your task is to analyze the user's resume and relevant feedback to provide a **tailored, actionable, and insightful** response.
 
         **User Query:** {user_query}
@@ -58,21 +150,173 @@ class QueryEngine:
 
         **Generate the response in a professional yet conversational way.**
         """
+        
+    async def generate_next_question(self, resume_text, difficulty_engine, refill=True):
+        """Returns the next MCQ at the session's current difficulty, drawing from the session's question pool.
+
+        Until the pool has been filled, questions come from the bank or a
+        single-question call; the caller builds the full ladder in the
+        background (see QuestionPrefetcher.schedule_ladder) so the first
+        question does not wait for it. When the current level runs dry, the
+        question bank is tried and then one call refills the level and its
+        neighbours (see batch_counts). If a batch fails, the single-question
+        path is used; with refill=False a dry level always takes it. The
+        engine's pool is updated in place, so the caller must save the
+        session. With questions_per_level=0 each question is generated by its
+        own call.
+        """
+        level = difficulty_engine.get_current_difficulty()
+        if self.questions_per_level <= 0:
+            return await self.generate_question(resume_text, level, seen=difficulty_engine.seen_questions)
+
+        pooled = difficulty_engine.take_from_pool(level)
+        record_cache("question_pool", pooled is not None)
+        if pooled is not None:
+            return pooled, None
+
+        banked = await self.draw_banked(resume_fingerprint(resume_text), level, difficulty_engine.seen_questions)
+        if banked:
+            return banked, None
+        if not (difficulty_engine.pool_filled and refill):
+            return await self.generate_question(resume_text, level, seen=difficulty_engine.seen_questions, use_bank=False)
+
+        ladder, error = await self.generate_question_batch(
+            resume_text, self.batch_counts(difficulty_engine, level), seen=difficulty_engine.seen_questions
+        )
+        if error:
+            logger.warning(f"Question batch failed ({error}); generating a single question")
+            return await self.generate_question(resume_text, level, seen=difficulty_engine.seen_questions, use_bank=False)
+        for lvl, questions in ladder.items():
+            difficulty_engine.add_to_pool(lvl, questions)
+        difficulty_engine.pool_filled = True
+
+        question = difficulty_engine.take_from_pool(level)
+        if question is None:
+            # The batch had nothing usable for this level
+            return await self.generate_question(resume_text, level, seen=difficulty_engine.seen_questions, use_bank=False)
+        return question, None
+
+    def batch_counts(self, difficulty_engine, level):
+        """Questions to request per level: the full ladder first, then a refill around the level that ran dry.
+
+        A level that runs dry is where the candidate is being tested, so the
+        refill asks twice the usual amount for it and tops up its neighbours.
+        """
+        if not difficulty_engine.pool_filled:
+            return {lvl: self.questions_per_level for lvl in range(difficulty_engine.min_level, difficulty_engine.max_level + 1)}
+        counts = {level: 2 * self.questions_per_level}
+        for neighbour in (level - 1, level + 1):
+            if difficulty_engine.min_level <= neighbour <= difficulty_engine.max_level:
+                missing = self.questions_per_level - difficulty_engine.pooled(neighbour)
+                if missing > 0:
+                    counts[neighbour] = missing
+        return counts
+
+    async def draw_banked(self, resume_hash, level, seen=()):
+        """Returns a banked question the session has not seen, or None."""
+        if self.question_bank is None:
+            return None
+        with timed("mongo"):
+            banked = await asyncio.to_thread(self.question_bank.draw, resume_hash, level, seen)
+        record_cache("question_bank", bool(banked))
+        return banked
+
+    async def generate_question_batch(self, resume_text, counts, seen=()):
+        """Generates MCQs for several difficulty levels in one model call; `counts` maps level to how many.
+
+        Returns ({level: [question_data]}, error). Items that fail validation,
+        target a level that was not asked for or repeat a seen question are
+        dropped; the rest are banked.
+        """
+        logger.debug(f"Generating a question batch: {counts}")
+        with timed("prompt_build"):
+            resume = self.context_assembler.resume(resume_text, QUESTION_FOCUS, prompt="question_batch")
+            prompt = self.build_question_batch_prompt(resume.text, counts, asked=len(seen))
 
         try:
-            response = self.model.generate_content([{"role": "user", "parts": [{"text": prompt}]}])
-            return response.text.strip() if hasattr(response, "text") else "No response generated."
+            response_text = await self.llm.generate(prompt, timeout=QUESTION_BATCH_TIMEOUT_SECONDS)
+
+            if not response_text:
+                return None, "No questions generated."
+
+            with timed("json_parse"):
+                items = parse_structured_items(response_text, QuestionOutput, "question_batch", "questions")
+        except StructuredOutputError as e:
+            return None, str(e)
         except Exception as e:
-            return f"Error generating response: {str(e)}"
-        
-    def generate_next_question(self, resume_text):
-        """Generates the next MCQ question based on current difficulty."""
-        current_difficulty = self.difficulty_engine.get_current_difficulty()
-        
-        # Debug print to verify difficulty level
-        print(f"Generating question at difficulty level: {current_difficulty}")
-        
-        prompt = f"""
+            return None, f"Error generating questions: {str(e)}"
+
+        ladder, hashes = {}, set(seen)
+        for question_data in items:
+            level = question_data["difficulty_level"]
+            if level not in counts or not is_valid_question(question_data):
+                continue
+            question_data["question_hash"] = question_hash(question_data["question"])
+            if question_data["question_hash"] in hashes:
+                continue
+            hashes.add(question_data["question_hash"])
+            ladder.setdefault(level, []).append(question_data)
+
+        if self.question_bank is not None:
+            # Banking a whole ladder takes a few round trips per question; keep it off the request path
+            task = asyncio.create_task(asyncio.to_thread(self._bank_all, resume_fingerprint(resume_text), ladder))
+            self._banking.add(task)
+            task.add_done_callback(self._banking.discard)
+        return ladder, None
+
+    def _bank_all(self, resume_hash, ladder):
+        with timed("mongo"):
+            for level, questions in ladder.items():
+                for question_data in questions:
+                    self.question_bank.add(resume_hash, level, question_data)
+
+    async def generate_question(self, resume_text, current_difficulty, seen=(), use_bank=True):
+        """Returns one MCQ question at the given difficulty level.
+
+        Questions are served from the question bank when it has one the session
+        has not seen; otherwise the model is asked and the result is banked.
+        Callers that already drew from the bank pass use_bank=False, so the
+        freshness roll is not made twice.
+        """
+        resume_hash = resume_fingerprint(resume_text)
+        if use_bank:
+            banked = await self.draw_banked(resume_hash, current_difficulty, seen)
+            if banked:
+                return banked, None
+
+        logger.debug(f"Generating question at difficulty level: {current_difficulty}")
+        with timed("prompt_build"):
+            resume = self.context_assembler.resume(resume_text, QUESTION_FOCUS, prompt="question")
+            prompt = self.build_question_prompt(resume.text, current_difficulty)
+
+        try:
+            response_text = await self.llm.generate(prompt)
+
+            if not response_text:
+                return None, "No question generated."
+
+            # Extract, repair and validate JSON; re-asks only for missing fields
+            with timed("json_parse"):
+                question_data = await parse_structured(response_text, QuestionOutput, "question", llm=self.llm)
+
+            # IMPORTANT: Explicitly set the difficulty level to match current difficulty
+            question_data["difficulty_level"] = current_difficulty
+            question_data["question_hash"] = question_hash(question_data["question"])
+            logger.debug(f"Question generated with difficulty level: {current_difficulty}")
+
+            if self.question_bank is not None:
+                with timed("mongo"):
+                    await asyncio.to_thread(self.question_bank.add, resume_hash, current_difficulty, question_data)
+            return question_data, None  # Successfully generated
+
+        except StructuredOutputError as e:
+            return None, str(e)
+        except Exception as e:
+            return None, f"Error generating question: {str(e)}"
+
+    def build_question_prompt(self, resume_text, current_difficulty):
+        """Builds the adaptive MCQ prompt for one difficulty level."""
+        return f"""
         You are an AI interviewer creating an **adaptive** technical test.
 
         **Candidate's Resume:**  
@@ -100,75 +344,111 @@ class QueryEngine:
                 "Executing code in a hidden environment"
             ],
             "answer": "Hiding data within a class and restricting access",
+            "skills": ["Object-Oriented Programming"],
             "difficulty_level": {current_difficulty}
         }}
         """
 
-        try:
-            response = self.model.generate_content([{"role": "user", "parts": [{"text": prompt}]}])
-            response_text = response.text.strip() if hasattr(response, "text") else None
+    def build_question_batch_prompt(self, resume_text, counts, asked=0):
+        """Builds the MCQ prompt for a ladder of questions, `counts[level]` at each difficulty level."""
+        level_counts = ", ".join(f"{level}: {count}" for level, count in sorted(counts.items()))
+        return f"""
+        You are an AI interviewer preparing an **adaptive** technical test.
 
-            if not response_text:
-                return None, "No question generated."
+        **Candidate's Resume:**  
+        {resume_text}
 
-            # Clean response & extract JSON
-            response_text = re.sub(r"```json|```", "", response_text).strip()
-            question_data = json.loads(response_text)
+        **Questions per Difficulty Level (level: count):** {level_counts} (Scale: 1 to 10)
 
-            if "question" in question_data and "options" in question_data and "answer" in question_data:
-                # IMPORTANT: Explicitly set the difficulty level to match current difficulty
-                question_data["difficulty_level"] = current_difficulty
-                print(f"Question generated with difficulty level: {current_difficulty}")
-                return question_data, None  # Successfully generated
-            else:
-                return None, "Unexpected response format."
+        **Your Task:**  
+        - Generate exactly the listed number of multiple-choice questions for EACH difficulty level above, based on the candidate's skills.  
+        - Each question must EXACTLY match its difficulty level (1 is easiest, 10 is hardest) and set "difficulty_level" to that level.
+        - Include **4 answer choices** per question (1 correct, 3 incorrect); "answer" must be one of the options.
+        - Do not repeat a question, and vary the skills tested across questions. The candidate has already answered {asked} questions in this test, so cover different topics or angles.
+        - Adjust complexity by level:
+            - Lower levels (1-3): Focus on basic concepts and definitions
+            - Medium levels (4-6): Test application of concepts and problem-solving
+            - Higher levels (7-10): Test advanced understanding, edge cases, and integration of multiple concepts
+        - Output only JSON with no explanations.
 
-        except json.JSONDecodeError:
-            return None, "AI response is not in valid JSON format."
-        except Exception as e:
-            return None, f"Error generating question: {str(e)}"
+        **Expected JSON Format:**  
+        {{
+            "questions": [
+                {{
+                    "question": "Which of the following best describes encapsulation in OOP?",
+                    "options": [
+                        "Hiding data within a class and restricting access",
+                        "Allowing all variables to be accessed globally",
+                        "Using a class only for data storage",
+                        "Executing code in a hidden environment"
+                    ],
+                    "answer": "Hiding data within a class and restricting access",
+                    "skills": ["Object-Oriented Programming"],
+                    "difficulty_level": 2
+                }}
+            ]
+        }}
+        """
 
-    def update_difficulty(self, user_answer, correct_answer):
-        """Adjusts difficulty based on user performance."""
+    def update_difficulty(self, user_answer, correct_answer, difficulty_engine):
+        """Adjusts the session's difficulty based on user performance."""
         is_correct = (user_answer == correct_answer)
         
-        # Debugging - Print before updating
-        print(f"Before update: Difficulty = {self.difficulty_engine.get_current_difficulty()}")
-        print(f"Answer correct: {is_correct}")
+        logger.debug(f"Before update: Difficulty = {difficulty_engine.get_current_difficulty()}, answer correct: {is_correct}")
         
         # Update difficulty based on answer
-        self.difficulty_engine.record_response(is_correct)
-        
-        # Debugging - Print after updating
-        print(f"After update: Difficulty = {self.difficulty_engine.get_current_difficulty()}")
-        # Remove reference to correct_at_level which no longer exists
+        difficulty_engine.record_response(is_correct)
         
         # Return feedback about the answer
         return {
             "is_correct": is_correct,
             "correct_answer": correct_answer,
-            "new_difficulty": self.difficulty_engine.get_current_difficulty()
+            "new_difficulty": difficulty_engine.get_current_difficulty()
         }
 
-    def analyze_user_answers(self, user_answers, resume_text):
+    async def analyze_user_answers(self, user_answers, resume_text, difficulty_engine):
         """Analyzes user responses to MCQs and provides detailed feedback."""
         
         # Retrieve relevant feedback for comparison
-        feedback_data = self.db_manager.retrieve_documents(resume_text)
+        feedback_data = await asyncio.to_thread(self.db_manager.retrieve_documents, resume_text)
         feedback_context = feedback_data if feedback_data else "No previous feedback available."
 
+        with timed("prompt_build"):
+            # Focus the resume on what the test actually covered
+            focus = " ".join(f"{question} {answer}" for question, answer in user_answers.items())
+            resume = self.context_assembler.resume(resume_text, focus, prompt="feedback")
+            feedback = self.context_assembler.feedback(feedback_context, prompt="feedback")
+            prompt = self.build_feedback_prompt(user_answers, resume.text, feedback.text, difficulty_engine)
+
+        try:
+            raw_text = await self.llm.generate(prompt)
+
+            if not raw_text:
+                return "No feedback generated. Try again."
+
+            # Extract, repair and validate JSON; re-asks only for missing fields
+            with timed("json_parse"):
+                return await parse_structured(raw_text, FeedbackOutput, "feedback", llm=self.llm)
+
+        except StructuredOutputError as e:
+            return str(e)
+        except Exception as e:
+            return f"Error generating feedback: {str(e)}"
+
+    def build_feedback_prompt(self, user_answers, resume_text, feedback_context, difficulty_engine):
+        """Builds the test feedback prompt from the answers and the session's performance."""
         # Format answers with difficulty level if available
         formatted_answers = []
         for i, (q, a) in enumerate(user_answers.items()):
-            difficulty = self.difficulty_engine.response_history[i].get("difficulty_level", "Unknown") if i < len(self.difficulty_engine.response_history) else "Unknown"
+            difficulty = difficulty_engine.response_history[i].get("difficulty_level", "Unknown") if i < len(difficulty_engine.response_history) else "Unknown"
             formatted_answers.append(f"Q: {q} (Difficulty: {difficulty}/10)\nA: {a}")
         
         formatted_answers_str = "\n".join(formatted_answers)
 
         # Get performance metrics
-        performance = self.difficulty_engine.get_performance_summary()
+        performance = difficulty_engine.get_performance_summary()
 
-        prompt = f"""
+        return f"""
         You are an expert technical interviewer and career mentor providing personalized feedback.
 
         **Candidate's Resume Summary:**  
@@ -233,43 +513,20 @@ class QueryEngine:
         - Do NOT return explanations outside of the JSON format
         """
 
-        try:
-            response = self.model.generate_content([{"role": "user", "parts": [{"text": prompt}]}])
-
-            if not response or not hasattr(response, "text") or not response.text.strip():
-                return "No feedback generated. Try again."
-
-            raw_text = response.text.strip()
-
-            # Extract JSON from response
-            json_match = re.search(r"\{.*\}", raw_text, re.DOTALL)
-            if json_match:
-                json_text = json_match.group(0)
-            else:
-                return "AI response did not contain valid JSON."
-
-            # Parse JSON response
-            feedback_dict = json.loads(json_text)
-
-            # Validate JSON structure
-            required_keys = {"feedback_summary", "skill_levels", "strengths", "areas_for_improvement", "suggested_improvements"}
-            if required_keys.issubset(feedback_dict):
-                return feedback_dict
-            else:
-                return "JSON missing required fields."
-
-        except json.JSONDecodeError:
-            return "AI response is not in valid JSON format."
-        except Exception as e:
-            return f"Error generating feedback: {str(e)}"
-
 class AdaptiveDifficultyEngine:
     def __init__(self, min_level=1, max_level=10, initial_level=3):
         """Initialize the adaptive difficulty engine with specified levels."""
         self.min_level = min_level
         self.max_level = max_level
+        self.initial_level = initial_level
         self.current_level = initial_level
         self.response_history = []
+        self.seen_questions = []
+        # resume_id of the resume under test, resolved through the resume cache on later requests
+        self.resume_id = None
+        # Pre-generated questions per difficulty level, filled by batched generation
+        self.question_pool = {}
+        self.pool_filled = False
         
     def record_response(self, is_correct):
         """Record user response and adjust difficulty with strict control."""
@@ -285,26 +542,82 @@ class AdaptiveDifficultyEngine:
             if self.current_level < self.max_level:
                 old_level = self.current_level
                 self.current_level += 1
-                print(f"CORRECT ANSWER: Increasing difficulty from {old_level} to {self.current_level}")
+                logger.debug(f"CORRECT ANSWER: Increasing difficulty from {old_level} to {self.current_level}")
         else:
             # Decrease difficulty by 1 if incorrect
             if self.current_level > self.min_level:
                 old_level = self.current_level
                 self.current_level -= 1
-                print(f"WRONG ANSWER: Decreasing difficulty from {old_level} to {self.current_level}")
-        
-        # Always log the current difficulty level for debugging
-        print(f"Current difficulty level is now: {self.current_level}")
+                logger.debug(f"WRONG ANSWER: Decreasing difficulty from {old_level} to {self.current_level}")
         
     def get_current_difficulty(self):
         """Return the current difficulty level."""
         return self.current_level
+
+    def mark_seen(self, question_hash):
+        """Remember a served question so the bank does not repeat it in this session."""
+        if question_hash and question_hash not in self.seen_questions:
+            self.seen_questions.append(question_hash)
+
+    def add_to_pool(self, level, questions):
+        """Queues generated questions for `level`, skipping ones already served or queued."""
+        pool = self.question_pool.setdefault(level, [])
+        known = set(self.seen_questions) | {question["question_hash"] for question in pool}
+        for question in questions:
+            if question["question_hash"] not in known:
+                pool.append(question)
+                known.add(question["question_hash"])
+
+    def take_from_pool(self, level):
+        """Removes and returns the next pooled question for `level`, or None when the level has run dry."""
+        pool = self.question_pool.get(level)
+        while pool:
+            question = pool.pop(0)
+            if question["question_hash"] not in self.seen_questions:
+                return question
+        return None
+
+    def pooled(self, level):
+        """Number of questions still pooled for `level`."""
+        return len(self.question_pool.get(level, []))
+
+    def to_state(self):
+        """Return a compact, JSON-serializable snapshot of the engine."""
+        return {
+            "level": self.current_level,
+            "bounds": [self.min_level, self.max_level, self.initial_level],
+            "history": [[int(resp['was_correct']), resp['difficulty_level']] for resp in self.response_history],
+            "seen": self.seen_questions,
+            "resume": self.resume_id,
+            # String keys so the snapshot can be stored as a Mongo document
+            "pool": {str(level): questions for level, questions in self.question_pool.items() if questions},
+            "pool_filled": self.pool_filled
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        """Rebuild an engine from a snapshot produced by to_state()."""
+        min_level, max_level, initial_level = state["bounds"]
+        engine = cls(min_level=min_level, max_level=max_level, initial_level=initial_level)
+        engine.current_level = state["level"]
+        engine.response_history = [
+            {'was_correct': bool(correct), 'difficulty_level': level}
+            for correct, level in state["history"]
+        ]
+        engine.seen_questions = list(state.get("seen", []))
+        engine.resume_id = state.get("resume")
+        engine.question_pool = {int(level): list(questions) for level, questions in state.get("pool", {}).items()}
+        engine.pool_filled = state.get("pool_filled", False)
+        return engine
     
     def reset(self):
         """Reset the difficulty engine to initial state."""
-        self.current_level = 3
+        self.current_level = self.initial_level
         self.response_history = []
-        print(f"Engine reset. Difficulty set to {self.current_level}")
+        self.seen_questions = []
+        self.question_pool = {}
+        self.pool_filled = False
+        logger.debug(f"Engine reset. Difficulty set to {self.current_level}")
     
     def get_performance_summary(self):
         """Return a summary of user performance."""
@@ -0,0 +1,118 @@
+import os
+import re
+import random
+import hashlib
+from datetime import datetime
+from dotenv import load_dotenv
+from pymongo.errors import DuplicateKeyError
+
+load_dotenv()
+
+QUESTION_BANK_FRESHNESS = float(os.getenv("QUESTION_BANK_FRESHNESS", "0.2"))
+QUESTION_BANK_MAX_PER_LEVEL = int(os.getenv("QUESTION_BANK_MAX_PER_LEVEL", "50"))
+QUESTION_BANK_DUP_THRESHOLD = float(os.getenv("QUESTION_BANK_DUP_THRESHOLD", "0.8"))
+
+
+def resume_fingerprint(resume_text: str) -> str:
+    """SHA-256 of the resume with whitespace normalized, so re-extracted text matches."""
+    normalized = " ".join(resume_text.split()).lower()
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+def question_tokens(question: str) -> set:
+    """Lower-cased word set used for near-duplicate detection."""
+    return set(re.findall(r"[a-z0-9+#]+", question.lower()))
+
+
+def question_hash(question: str) -> str:
+    return hashlib.sha256(" ".join(sorted(question_tokens(question))).encode()).hexdigest()
+
+
+def is_valid_question(question_data) -> bool:
+    """A bankable MCQ has a question, four distinct options, and an answer among them."""
+    if not isinstance(question_data, dict):
+        return False
+    question = question_data.get("question")
+    options = question_data.get("options")
+    answer = question_data.get("answer")
+    if not isinstance(question, str) or not question.strip():
+        return False
+    if not isinstance(options, list) or len(options) != 4 or len(set(map(str, options))) != 4:
+        return False
+    return isinstance(answer, str) and answer.strip() in [str(opt).strip() for opt in options]
+
+
+class QuestionBank:
+    """Stores validated MCQs per (resume fingerprint, difficulty level) in MongoDB.
+
+    `draw` returns a banked question the session has not seen yet, except for a
+    `freshness` fraction of calls that go to the model to keep the bank growing.
+    """
+
+    def __init__(self, collection, freshness=QUESTION_BANK_FRESHNESS, max_per_level=QUESTION_BANK_MAX_PER_LEVEL,
+                 dup_threshold=QUESTION_BANK_DUP_THRESHOLD):
+        self.collection = collection
+        self.freshness = freshness
+        self.max_per_level = max_per_level
+        self.dup_threshold = dup_threshold
+        self._indexes_ready = False
+
+    def ensure_indexes(self):
+        """Creates the unique (resume, level, question) index; called on first write, not at import."""
+        if not self._indexes_ready:
+            self.collection.create_index(
+                [("resume_hash", 1), ("level", 1), ("question_hash", 1)], unique=True
+            )
+            self._indexes_ready = True
+
+    def draw(self, resume_hash, level, seen=()):
+        """Returns a stored question dict, or None when the model should be called."""
+        if random.random() < self.freshness:
+            return None
+
+        candidates = list(self.collection.find(
+            {"resume_hash": resume_hash, "level": level, "question_hash": {"$nin": list(seen)}},
+            {"_id": 0, "question": 1, "options": 1, "answer": 1, "skills": 1, "question_hash": 1},
+            limit=self.max_per_level,
+        ))
+        if not candidates:
+            return None
+
+        doc = random.choice(candidates)
+        doc["difficulty_level"] = level
+        return doc
+
+    def add(self, resume_hash, level, question_data) -> bool:
+        """Stores a validated question unless it near-duplicates one already banked."""
+        if not is_valid_question(question_data):
+            return False
+
+        self.ensure_indexes()
+
+        tokens = question_tokens(question_data["question"])
+        existing = list(self.collection.find(
+            {"resume_hash": resume_hash, "level": level}, {"_id": 0, "tokens": 1}
+        ))
+        if len(existing) >= self.max_per_level:
+            return False
+        for doc in existing:
+            other = set(doc.get("tokens", []))
+            union = tokens | other
+            if union and len(tokens & other) / len(union) >= self.dup_threshold:
+                return False
+
+        try:
+            self.collection.insert_one({
+                "resume_hash": resume_hash,
+                "level": level,
+                "question_hash": question_hash(question_data["question"]),
+                "question": question_data["question"],
+                "options": question_data["options"],
+                "answer": question_data["answer"],
+                "skills": question_data.get("skills", []),
+                "tokens": sorted(tokens),
+                "created_at": datetime.utcnow(),
+            })
+        except DuplicateKeyError:
+            return False
+        return True
@@ -0,0 +1,109 @@
+import os
+import uuid
+import asyncio
+import hashlib
+import secrets
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from dotenv import load_dotenv
+from db import get_collection
+from metrics import timed
+
+load_dotenv()
+
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+# A token presented again this soon after it was consumed is a concurrent refresh (e.g. a second tab), not a leak
+REFRESH_TOKEN_REUSE_GRACE_SECONDS = int(os.getenv("REFRESH_TOKEN_REUSE_GRACE_SECONDS", "10"))
+
+
+def hash_refresh_token(token: str) -> str:
+    """Refresh tokens are 256 random bits, so a single SHA-256 is enough; no bcrypt needed."""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class RefreshTokenStore:
+    """Rotating, revocable refresh tokens kept in Mongo by hash.
+
+    Each refresh consumes the presented token and issues a new one in the same
+    family. Presenting an already consumed token means it leaked, so the whole
+    family is revoked, unless it comes within `reuse_grace_seconds` of the
+    first use: tabs sharing one refresh token then each get a new token in the
+    family. Expired documents are removed by a TTL index.
+    """
+
+    def __init__(self, collection, ttl_days=REFRESH_TOKEN_EXPIRE_DAYS, reuse_grace_seconds=REFRESH_TOKEN_REUSE_GRACE_SECONDS):
+        self.collection = collection
+        self.ttl_days = ttl_days
+        self.reuse_grace_seconds = reuse_grace_seconds
+
+    async def issue(self, subject: str, role: str, family: str = None) -> str:
+        """Creates a refresh token for `subject` and returns its plaintext value."""
+        token = secrets.token_urlsafe(32)
+        now = datetime.utcnow()
+        doc = {
+            "_id": hash_refresh_token(token),
+            "sub": subject,
+            "role": role,
+            "family": family or uuid.uuid4().hex,
+            "used": False,
+            "revoked": False,
+            "created_at": now,
+            "expires_at": now + timedelta(days=self.ttl_days),
+        }
+        with timed("mongo"):
+            await asyncio.to_thread(self.collection.insert_one, doc)
+        return token
+
+    async def rotate(self, token: str):
+        """Consumes `token` and returns (subject, role, new_token), or None if it is not valid."""
+        token_hash = hash_refresh_token(token)
+        now = datetime.utcnow()
+        with timed("mongo"):
+            doc = await asyncio.to_thread(
+                self.collection.find_one_and_update,
+                {"_id": token_hash, "used": False, "revoked": False},
+                {"$set": {"used": True, "used_at": now}},
+                return_document=ReturnDocument.BEFORE,
+            )
+            if doc is None:
+                doc = await asyncio.to_thread(self.collection.find_one, {"_id": token_hash})
+                if not self._within_grace(doc, now):
+                    doc = None
+        if doc is None:
+            await self._revoke_family_of(token_hash)
+            return None
+        if doc["expires_at"] < datetime.utcnow():
+            return None
+        new_token = await self.issue(doc["sub"], doc["role"], family=doc["family"])
+        return doc["sub"], doc["role"], new_token
+
+    def _within_grace(self, doc, now):
+        """True if `doc` was consumed within the reuse grace window and has not been revoked."""
+        if doc is None or doc["revoked"] or doc.get("used_at") is None:
+            return False
+        return now - doc["used_at"] <= timedelta(seconds=self.reuse_grace_seconds)
+
+    async def revoke(self, token: str):
+        """Revokes the token's whole family (logout)."""
+        await self._revoke_family_of(hash_refresh_token(token))
+
+    async def revoke_subject(self, subject: str):
+        """Revokes every refresh token of a user, e.g. after a password change."""
+        with timed("mongo"):
+            await asyncio.to_thread(self.collection.update_many, {"sub": subject}, {"$set": {"revoked": True}})
+
+    async def _revoke_family_of(self, token_hash):
+        with timed("mongo"):
+            doc = await asyncio.to_thread(self.collection.find_one, {"_id": token_hash}, {"family": 1})
+            if doc is not None:
+                await asyncio.to_thread(
+                    self.collection.update_many, {"family": doc["family"]}, {"$set": {"revoked": True}}
+                )
+
+    async def ensure_indexes(self):
+        await asyncio.to_thread(self.collection.create_index, "expires_at", expireAfterSeconds=0)
+        await asyncio.to_thread(self.collection.create_index, "family")
+        await asyncio.to_thread(self.collection.create_index, "sub")
+
+
+refresh_tokens = RefreshTokenStore(get_collection("refresh_tokens"))
@@ -0,0 +1,77 @@
+import os
+import hashlib
+import asyncio
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from metrics import timed, record_cache
+
+load_dotenv()
+
+RESUME_CACHE_MAX_ENTRIES = int(os.getenv("RESUME_CACHE_MAX_ENTRIES", "2048"))
+RESUME_CACHE_TTL_DAYS = int(os.getenv("RESUME_CACHE_TTL_DAYS", "30"))
+
+
+class ResumeCache:
+    """Content-addressed store of extracted resume text.
+
+    The resume_id is the SHA-256 of the uploaded PDF bytes, so re-uploading the
+    same file skips parsing. Entries are immutable, which makes the in-process
+    LRU safe to use in front of the shared Mongo collection. Mongo documents
+    expire `ttl_days` after the resume was last uploaded, through a TTL index.
+    """
+
+    def __init__(self, collection=None, max_entries=RESUME_CACHE_MAX_ENTRIES, ttl_days=RESUME_CACHE_TTL_DAYS):
+        self.collection = collection
+        self.max_entries = max_entries
+        self.ttl_days = ttl_days
+        self._texts = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def resume_id(file_bytes: bytes) -> str:
+        return hashlib.sha256(file_bytes).hexdigest()
+
+    def get(self, resume_id):
+        """Returns the cached text for a resume_id, or None if it is unknown."""
+        with self._lock:
+            text = self._texts.get(resume_id)
+            if text is not None:
+                self._texts.move_to_end(resume_id)
+                record_cache("resume_text", True)
+                return text
+
+        if self.collection is not None:
+            with timed("mongo"):
+                doc = self.collection.find_one({"_id": resume_id}, {"text": 1})
+            if doc:
+                record_cache("resume_text", True)
+                self._remember(resume_id, doc["text"])
+                return doc["text"]
+        record_cache("resume_text", False)
+        return None
+
+    def put(self, resume_id, text):
+        if self.collection is not None:
+            with timed("mongo"):
+                self.collection.update_one(
+                    {"_id": resume_id},
+                    {
+                        "$setOnInsert": {"text": text},
+                        "$set": {"expires_at": datetime.utcnow() + timedelta(days=self.ttl_days)},
+                    },
+                    upsert=True,
+                )
+        self._remember(resume_id, text)
+
+    async def ensure_indexes(self):
+        if self.collection is not None:
+            await asyncio.to_thread(self.collection.create_index, "expires_at", expireAfterSeconds=0)
+
+    def _remember(self, resume_id, text):
+        with self._lock:
+            self._texts[resume_id] = text
+            self._texts.move_to_end(resume_id)
+            while len(self._texts) > self.max_entries:
+                self._texts.popitem(last=False)
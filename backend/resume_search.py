@@ -0,0 +1,225 @@
+import os
+import re
+import math
+import heapq
+import threading
+from collections import Counter, defaultdict
+from dotenv import load_dotenv
+from metrics import timed
+
+load_dotenv()
+
+SEARCH_VECTOR_CANDIDATES = int(os.getenv("SEARCH_VECTOR_CANDIDATES", "100"))
+SEARCH_SYNC_PAGE_SIZE = int(os.getenv("SEARCH_SYNC_PAGE_SIZE", "1000"))
+RRF_K = 60
+
+FILTER_OPERATORS = {
+    "$eq": lambda value, target: value == target,
+    "$ne": lambda value, target: value != target,
+    "$gt": lambda value, target: value is not None and value > target,
+    "$gte": lambda value, target: value is not None and value >= target,
+    "$lt": lambda value, target: value is not None and value < target,
+    "$lte": lambda value, target: value is not None and value <= target,
+    "$in": lambda value, target: value in target,
+    "$nin": lambda value, target: value not in target,
+}
+
+
+def search_tokens(text: str) -> list:
+    """Lower-cased word list; keeps tokens like c++ and c# intact."""
+    return re.findall(r"[a-z0-9+#]+", text.lower())
+
+
+def matches_filters(metadata: dict, filters: dict) -> bool:
+    """Evaluates Chroma-style metadata filters ({"field": value}, {"field": {"$op": value}}, $and/$or lists)."""
+    for field, condition in (filters or {}).items():
+        if field == "$and":
+            if not all(matches_filters(metadata, clause) for clause in condition):
+                return False
+            continue
+        if field == "$or":
+            if not any(matches_filters(metadata, clause) for clause in condition):
+                return False
+            continue
+        value = (metadata or {}).get(field)
+        if isinstance(condition, dict):
+            for operator, target in condition.items():
+                if operator not in FILTER_OPERATORS or not FILTER_OPERATORS[operator](value, target):
+                    return False
+        elif value != condition:
+            return False
+    return True
+
+
+def to_chroma_where(filters: dict):
+    """Chroma accepts a single field per where clause; several fields are combined with $and."""
+    if not filters:
+        return None
+    clauses = [{field: condition} for field, condition in filters.items()]
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+class BM25Index:
+    """In-memory inverted index with Okapi BM25 scoring.
+
+    Postings map each term to {doc_id: term frequency}, so a query only touches
+    documents containing at least one of its terms. Adding a document that is
+    already indexed is a no-op, which makes incremental ingestion idempotent.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings = defaultdict(dict)
+        self._doc_terms = {}
+        self._metadata = {}
+        self._total_length = 0
+        self._lock = threading.RLock()
+
+    def add(self, doc_id, text, metadata=None):
+        with self._lock:
+            if doc_id in self._doc_terms:
+                return
+            counts = Counter(search_tokens(text or ""))
+            for term, frequency in counts.items():
+                self._postings[term][doc_id] = frequency
+            self._doc_terms[doc_id] = (sum(counts.values()), tuple(counts))
+            self._metadata[doc_id] = metadata or {}
+            self._total_length += self._doc_terms[doc_id][0]
+
+    def remove(self, doc_id):
+        with self._lock:
+            entry = self._doc_terms.pop(doc_id, None)
+            if entry is None:
+                return
+            length, terms = entry
+            for term in terms:
+                postings = self._postings[term]
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+            self._metadata.pop(doc_id, None)
+            self._total_length -= length
+
+    def search(self, query, filters=None, limit=None):
+        """Returns [(doc_id, score)] best first for documents matching any query term."""
+        with self._lock:
+            total_docs = len(self._doc_terms)
+            if not total_docs:
+                return []
+            average_length = self._total_length / total_docs
+            scores = defaultdict(float)
+            for term in set(search_tokens(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (total_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, frequency in postings.items():
+                    length = self._doc_terms[doc_id][0]
+                    norm = self.k1 * (1 - self.b + self.b * length / average_length)
+                    scores[doc_id] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+            if filters:
+                scores = {doc_id: score for doc_id, score in scores.items()
+                          if matches_filters(self._metadata.get(doc_id), filters)}
+        if limit:
+            return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+    def ids(self):
+        with self._lock:
+            return set(self._doc_terms)
+
+    def __len__(self):
+        return len(self._doc_terms)
+
+
+class HybridResumeSearch:
+    """Keyword + semantic search over the processor's resume collection.
+
+    BM25 catches exact skills and titles ("Kubernetes"), the vector query
+    catches paraphrases; the two rankings are merged with weighted reciprocal
+    rank fusion, which needs no score normalization. The lexical index is fed
+    by ResumeProcessor.store_in_vector_db and re-synced from Chroma whenever
+    the collection size differs (restart, or uploads handled by another worker).
+    """
+
+    def __init__(self, processor, vector_candidates=SEARCH_VECTOR_CANDIDATES):
+        self.processor = processor
+        self.vector_candidates = vector_candidates
+        self._sync_lock = threading.Lock()
+
+    @property
+    def index(self):
+        return self.processor.lexical_index
+
+    def sync(self):
+        """Indexes resumes missing from the lexical index and drops ones no longer stored."""
+        collection = self.processor.collection
+        if collection.count() == len(self.index):
+            return
+        with self._sync_lock, timed("lexical_sync"):
+            stored_ids = set(collection.get(include=[])["ids"])
+            indexed = self.index.ids()
+            for doc_id in indexed - stored_ids:
+                self.index.remove(doc_id)
+            missing = list(stored_ids - indexed)
+            for start in range(0, len(missing), SEARCH_SYNC_PAGE_SIZE):
+                page = collection.get(ids=missing[start:start + SEARCH_SYNC_PAGE_SIZE], include=["documents", "metadatas"])
+                for doc_id, text, metadata in zip(page["ids"], page["documents"], page["metadatas"]):
+                    self.index.add(doc_id, text, metadata)
+
+    def search(self, query, limit=10, offset=0, filters=None, lexical_weight=0.5):
+        """Returns {"candidates", "results"} for one page of fused keyword/vector matches.
+
+        `candidates` is the size of the fused candidate set (at most the top
+        `depth` of each ranking), not the number of stored resumes that match;
+        pages beyond it are empty.
+        """
+        self.sync()
+        depth = max(self.vector_candidates, offset + limit)
+
+        with timed("lexical_search"):
+            lexical = self.index.search(query, filters=filters, limit=depth)
+
+        vector = []
+        collection = self.processor.collection
+        available = collection.count()
+        if available:
+            with timed("vector_search"):
+                result = collection.query(
+                    query_texts=[query],
+                    n_results=min(depth, available),
+                    where=to_chroma_where(filters),
+                    include=["distances"],
+                )
+            vector = list(zip(result["ids"][0], result["distances"][0]))
+
+        fused = defaultdict(float)
+        for rank, (doc_id, _) in enumerate(lexical):
+            fused[doc_id] += lexical_weight / (RRF_K + rank + 1)
+        for rank, (doc_id, _) in enumerate(vector):
+            fused[doc_id] += (1 - lexical_weight) / (RRF_K + rank + 1)
+        ranked = sorted(fused.items(), key=lambda item: item[1], reverse=True)
+        page = ranked[offset:offset + limit]
+        if not page:
+            return {"candidates": len(ranked), "results": []}
+
+        lexical_scores = dict(lexical)
+        vector_distances = dict(vector)
+        stored = collection.get(ids=[doc_id for doc_id, _ in page], include=["documents", "metadatas"])
+        documents = {doc_id: (text, metadata) for doc_id, text, metadata
+                     in zip(stored["ids"], stored["documents"], stored["metadatas"])}
+
+        results = []
+        for doc_id, score in page:
+            text, metadata = documents.get(doc_id, ("", {}))
+            results.append({
+                "id": doc_id,
+                "filename": (metadata or {}).get("filename"),
+                "metadata": metadata,
+                "score": round(score, 6),
+                "lexical_score": round(lexical_scores[doc_id], 4) if doc_id in lexical_scores else None,
+                "vector_distance": round(float(vector_distances[doc_id]), 4) if doc_id in vector_distances else None,
+                "snippet": (text or "")[:300],
+            })
+        return {"candidates": len(ranked), "results": results}
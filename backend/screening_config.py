@@ -0,0 +1,15 @@
+"""Resume screening settings shared by main.py and process.py.
+
+Kept apart from process.py so the API can check uploads against them without
+importing Chroma and the embedding stack.
+"""
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Resumes the LLM ranks per upload, after the embedding pre-rank
+SCREENING_SHORTLIST_SIZE = int(os.getenv("SCREENING_SHORTLIST_SIZE", "20"))
+# Prompt budget for the shortlisted resumes
+SCREENING_TOKEN_BUDGET = int(os.getenv("SCREENING_TOKEN_BUDGET", "24000"))
+CHARS_PER_TOKEN = 4
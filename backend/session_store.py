@@ -0,0 +1,142 @@
+import os
+import time
+import uuid
+import asyncio
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from query_engine import AdaptiveDifficultyEngine
+from metrics import timed
+
+load_dotenv()
+
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "10000"))
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", "3600"))
+SESSION_PERSISTENCE = os.getenv("SESSION_PERSISTENCE", "memory")
+
+
+class SessionStore:
+    """Keeps one AdaptiveDifficultyEngine state per adaptive test session.
+
+    Sessions live in an in-process LRU with a sliding TTL. When a Mongo
+    collection is given it becomes the source of truth, so any uvicorn
+    worker can serve any session; expired documents are dropped by a TTL index.
+    Mongo calls run in a worker thread so they do not block the event loop.
+    """
+
+    def __init__(self, max_entries=SESSION_MAX_ENTRIES, ttl_seconds=SESSION_TTL_SECONDS, collection=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.collection = collection
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._indexes_ready = False
+
+    async def create(self):
+        """Creates a new session and returns (session_id, engine)."""
+        session_id = uuid.uuid4().hex
+        engine = AdaptiveDifficultyEngine()
+        await self.save(session_id, engine)
+        return session_id, engine
+
+    async def get(self, session_id):
+        """Returns the engine for a session, or None if it is unknown or expired."""
+        if not session_id:
+            return None
+
+        if self.collection is not None:
+            with timed("mongo"):
+                doc = await asyncio.to_thread(self.collection.find_one, {"_id": session_id})
+            if not doc or doc["expires_at"] < datetime.utcnow():
+                return None
+            return AdaptiveDifficultyEngine.from_state(doc["state"])
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            expires_at, state = entry
+            if expires_at < now:
+                del self._sessions[session_id]
+                return None
+            # Sliding expiry: the LRU tail must stay the latest expiry for _evict to stop at the first live entry
+            self._sessions[session_id] = (now + self.ttl_seconds, state)
+            self._sessions.move_to_end(session_id)
+        return AdaptiveDifficultyEngine.from_state(state)
+
+    async def get_or_create(self, session_id=None):
+        """Returns (session_id, engine), starting a fresh session when needed."""
+        engine = await self.get(session_id)
+        if engine is None:
+            return await self.create()
+        return session_id, engine
+
+    async def save(self, session_id, engine):
+        """Persists the engine state and refreshes the session TTL."""
+        state = engine.to_state()
+
+        if self.collection is not None:
+            with timed("mongo"):
+                if not self._indexes_ready:
+                    await asyncio.to_thread(self._ensure_indexes)
+                await asyncio.to_thread(
+                    self.collection.replace_one,
+                    {"_id": session_id},
+                    {
+                        "_id": session_id,
+                        "state": state,
+                        "expires_at": datetime.utcnow() + timedelta(seconds=self.ttl_seconds),
+                    },
+                    upsert=True,
+                )
+            return
+
+        with self._lock:
+            self._sessions[session_id] = (time.monotonic() + self.ttl_seconds, state)
+            self._sessions.move_to_end(session_id)
+            self._evict()
+
+    async def delete(self, session_id):
+        """Removes a session if it exists."""
+        if self.collection is not None:
+            with timed("mongo"):
+                await asyncio.to_thread(self.collection.delete_one, {"_id": session_id})
+            return
+
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self):
+        if self.collection is not None:
+            return self.collection.count_documents({})
+        with self._lock:
+            return len(self._sessions)
+
+    def _evict(self):
+        """Drops expired sessions from the LRU head, then trims to max_entries."""
+        now = time.monotonic()
+        while self._sessions:
+            session_id, (expires_at, _) = next(iter(self._sessions.items()))
+            if expires_at >= now and len(self._sessions) <= self.max_entries:
+                break
+            del self._sessions[session_id]
+
+    async def ensure_indexes(self):
+        """Creates the TTL index that expires Mongo sessions; nothing to do for in-memory sessions."""
+        if self.collection is not None:
+            await asyncio.to_thread(self._ensure_indexes)
+
+    def _ensure_indexes(self):
+        if not self._indexes_ready:
+            self.collection.create_index("expires_at", expireAfterSeconds=0)
+            self._indexes_ready = True
+
+
+def create_session_store():
+    """Builds the session store selected by SESSION_PERSISTENCE."""
+    if SESSION_PERSISTENCE == "mongo":
+        from db import get_collection
+        return SessionStore(collection=get_collection("test_sessions"))
+    return SessionStore()
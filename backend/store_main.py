@@ -1,29 +1,92 @@
 import os
-import nomic
+import json
+import time
+import queue
+import argparse
+import threading
 import hashlib
-import chromadb
 from dotenv import load_dotenv
+from cache import LRUCache
+from metrics import timed
 from langchain_community.document_loaders import PyPDFLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_nomic import NomicEmbeddings
+from embeddings import create_embeddings, ChromaEmbeddingAdapter, EMBEDDING_BACKEND
+from vector_store import create_chroma_client
 from langchain_chroma import Chroma  
 
 load_dotenv()
 
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "4096"))
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "4096"))
+RETRIEVAL_CACHE_TTL_SECONDS = int(os.getenv("RETRIEVAL_CACHE_TTL_SECONDS", "600"))
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "256"))
+INGEST_QUEUE_DEPTH = int(os.getenv("INGEST_QUEUE_DEPTH", "4"))
+CHROMA_PERSIST_DIR = os.getenv("CHROMA_PERSIST_DIR", "/Users/sridharm/Desktop/proj/chromadb_store")
+# langchain_chroma's default collection name, which existing feedback stores were created under
+FEEDBACK_COLLECTION_NAME = "langchain"
+INGEST_MANIFEST_PATH = os.getenv("INGEST_MANIFEST_PATH", os.path.join(CHROMA_PERSIST_DIR, "ingest_manifest.json"))
+
 class EmbeddingModel:
-    def __init__(self):
-        """Initializes the Nomic embedding model."""
-        nomic_api_key = os.getenv("NOMIC_API_KEY")
-        if not nomic_api_key:
-            raise ValueError("NOMIC_API_KEY is missing! Ensure it's set in the .env file.")
-        
-        nomic.login(nomic_api_key)
-        self.embeddings = NomicEmbeddings(model="nomic-embed-text-v1.5")  
+    def __init__(self, backend=None):
+        """Initializes the embedding model selected by EMBEDDING_BACKEND (nomic, local or hash)."""
+        self.embeddings = create_embeddings(backend)
 
     def get_embeddings(self, text):
         """Generates embeddings for a given text."""
         return self.embeddings.embed_query(text)
 
+class IngestManifest:
+    """Tracks ingested PDFs (size, mtime, content hash, chunk ids) between runs."""
+
+    def __init__(self, path=INGEST_MANIFEST_PATH):
+        self.path = path
+        self.stale_chunk_ids = set()
+        self.files = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.files = json.load(f)
+
+    def is_unchanged(self, pdf_path):
+        """True when size and mtime match the last run; only then is hashing skipped."""
+        entry = self.files.get(pdf_path)
+        if not entry:
+            return False
+        stat = os.stat(pdf_path)
+        return entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime
+
+    def content_unchanged(self, pdf_path, content_hash):
+        """True when the file was touched but its bytes are the same; refreshes size/mtime."""
+        entry = self.files.get(pdf_path)
+        if not entry or entry["hash"] != content_hash:
+            return False
+        stat = os.stat(pdf_path)
+        entry["size"], entry["mtime"] = stat.st_size, stat.st_mtime
+        return True
+
+    def record(self, pdf_path, content_hash, chunk_ids):
+        """Stores the new state of a file; its chunks that no longer exist become stale."""
+        old_ids = set(self.files.get(pdf_path, {}).get("chunk_ids", []))
+        self.stale_chunk_ids |= old_ids - set(chunk_ids)
+        stat = os.stat(pdf_path)
+        self.files[pdf_path] = {
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "hash": content_hash,
+            "chunk_ids": sorted(chunk_ids),
+        }
+
+    def forget_missing(self, seen_paths):
+        """Drops files that are no longer on disk and marks their chunks stale."""
+        for pdf_path in set(self.files) - set(seen_paths):
+            self.stale_chunk_ids |= set(self.files.pop(pdf_path)["chunk_ids"])
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.files, f)
+        os.replace(tmp_path, self.path)
+
 class DocumentProcessor:
     def __init__(self, pdf_folders=None):
         """Initializes document processor with paths for resumes and feedback forms."""
@@ -37,47 +100,100 @@ class DocumentProcessor:
         """Generates a SHA-256 hash for a document to prevent duplicates."""
         return hashlib.sha256(content.encode()).hexdigest()
 
-    def process_documents(self):
+    def generate_chunk_id(self, source: str, content: str) -> str:
+        """Deterministic chunk id, so re-ingesting a file upserts instead of duplicating."""
+        return hashlib.sha256(f"{source}\0{content}".encode()).hexdigest()
+
+    def file_hash(self, pdf_path: str) -> str:
+        with open(pdf_path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+    def process_documents(self, manifest=None):
         """Extracts, structures, and processes text from PDFs in different folders."""
-        final_documents = []
+        chunks = list(self.iter_documents(manifest))
+        print(f"Processed {self.stats['pages']} documents.")
+        return chunks
+
+    def iter_documents(self, manifest=None):
+        """Yields chunks file by file, so only one PDF is held in memory at a time.
+
+        With a manifest, files unchanged since the last run are skipped and the
+        manifest is updated with the chunk ids of every file that was processed.
+        """
+        self.stats = {"files": 0, "pages": 0, "chunks": 0, "seconds": 0.0}
         unique_hashes = set()  
+        seen_paths = []
 
         for doc_type, folder in self.pdf_folders.items():
-            if os.path.exists(folder):
-                for file in os.listdir(folder):
-                    if file.endswith(".pdf"):
-                        pdf_path = os.path.join(folder, file)
-                        loader = PyPDFLoader(pdf_path)
-                        try:
-                            docs = loader.load()
-                        except Exception as e:
-                            print(f" Error loading {file}: {str(e)}")
-                            continue
-
-                        for doc in docs:
-                            doc_hash = self.generate_doc_hash(doc.page_content)
-                            if doc_hash in unique_hashes:
-                                continue  
-                            unique_hashes.add(doc_hash)
-
-                            doc.metadata = {
-                                "hash": doc_hash,
-                                "type": doc_type,  
-                                "source": pdf_path
-                            }
-                            
-                            # Structure feedback separately if it's a feedback form
-                            if doc_type == "feedbacks":
-                                feedback_chunks = self.split_feedbacks(doc.page_content)
-                                for feedback in feedback_chunks:
-                                    feedback_doc = doc.model_copy()  
-                                    feedback_doc.page_content = feedback
-                                    final_documents.append(feedback_doc)
-                            else:
-                                final_documents.append(doc)
-
-        print(f"Processed {len(final_documents)} documents.")
-        return self.text_splitter.split_documents(final_documents)
+            if not os.path.exists(folder):
+                continue
+            for file in os.listdir(folder):
+                if not file.endswith(".pdf"):
+                    continue
+                pdf_path = os.path.join(folder, file)
+                seen_paths.append(pdf_path)
+
+                started = time.perf_counter()
+                content_hash = None
+                if manifest is not None:
+                    if manifest.is_unchanged(pdf_path):
+                        continue
+                    content_hash = self.file_hash(pdf_path)
+                    if manifest.content_unchanged(pdf_path, content_hash):
+                        continue
+
+                chunks = self.load_file(pdf_path, doc_type, unique_hashes)
+                self.stats["seconds"] += time.perf_counter() - started
+                if chunks is None:
+                    # Leave it out of the manifest so the next run retries it
+                    continue
+
+                self.stats["files"] += 1
+                self.stats["chunks"] += len(chunks)
+                if manifest is not None:
+                    manifest.record(pdf_path, content_hash, [chunk.metadata["chunk_id"] for chunk in chunks])
+                yield from chunks
+
+        if manifest is not None:
+            manifest.forget_missing(seen_paths)
+
+    def load_file(self, pdf_path, doc_type, unique_hashes):
+        """Loads, de-duplicates and chunks one PDF; returns None if it cannot be read."""
+        loader = PyPDFLoader(pdf_path)
+        try:
+            docs = loader.load()
+        except Exception as e:
+            print(f" Error loading {os.path.basename(pdf_path)}: {str(e)}")
+            return None
+
+        file_documents = []
+        for doc in docs:
+            doc_hash = self.generate_doc_hash(doc.page_content)
+            if doc_hash in unique_hashes:
+                continue  
+            unique_hashes.add(doc_hash)
+            self.stats["pages"] += 1
+
+            doc.metadata = {
+                "hash": doc_hash,
+                "type": doc_type,  
+                "source": pdf_path
+            }
+            
+            # Structure feedback separately if it's a feedback form
+            if doc_type == "feedbacks":
+                feedback_chunks = self.split_feedbacks(doc.page_content)
+                for feedback in feedback_chunks:
+                    feedback_doc = doc.model_copy()  
+                    feedback_doc.page_content = feedback
+                    file_documents.append(feedback_doc)
+            else:
+                file_documents.append(doc)
+
+        chunks = self.text_splitter.split_documents(file_documents)
+        for chunk in chunks:
+            chunk.metadata["chunk_id"] = self.generate_chunk_id(pdf_path, chunk.page_content)
+        return chunks
 
     def split_feedbacks(self, text):
         """Extracts and structures individual feedback from feedback forms."""
@@ -87,44 +203,71 @@ class DocumentProcessor:
 class ChromaDBManager:
     def __init__(self):
         """Initialize ChromaDB client and ensure the collection exists."""
-        self.client = chromadb.PersistentClient(path="/Users/sridharm/Desktop/proj/chromadb_store")  
+        # Shared per process; a single Chroma server for all workers when CHROMA_MODE=http
+        self.client = create_chroma_client(CHROMA_PERSIST_DIR)
         self.collection_name = "feedback_data"
         
-        # Use Nomic embeddings explicitly
-        self.embedding_model = NomicEmbeddings(model="nomic-embed-text-v1.5")
+        # Nomic embeddings by default; EMBEDDING_BACKEND=local runs the model on this machine, hash is for offline runs
+        self.embedding_model = create_embeddings()
 
         # Create or retrieve collection with correct embedding function
+        self.check_embedder(FEEDBACK_COLLECTION_NAME)
         self.collection = Chroma(
-            persist_directory="/Users/sridharm/Desktop/proj/chromadb_store",
+            client=self.client,
+            collection_name=FEEDBACK_COLLECTION_NAME,
             embedding_function=self.embedding_model  
         )
 
-    def get_existing_document_ids(self):
-        """Retrieve existing document hashes from ChromaDB."""
-        try:
-            stored_documents = self.collection.get(include=["metadatas"])  
-            stored_hashes = {doc["hash"] for doc in stored_documents["metadatas"] if "hash" in doc}  # Extract stored hashes
-            return stored_hashes
-        except Exception as e:
-            print(f"Error retrieving existing documents: {e}")
-            return set()
+        # Query embeddings keyed by normalized text, results keyed by (embedding, k, filters).
+        # Results also carry the collection version, so any write in this process
+        # invalidates them; the TTL bounds staleness from writes by other processes.
+        self.collection_version = 0
+        self.embedding_cache = LRUCache(max_entries=EMBEDDING_CACHE_SIZE, name="query_embedding")
+        self.result_cache = LRUCache(max_entries=RETRIEVAL_CACHE_SIZE, ttl_seconds=RETRIEVAL_CACHE_TTL_SECONDS, name="retrieval")
+
+    def check_embedder(self, collection_name):
+        """Refuses to open the feedback collection with another embedder than the one that built it.
+
+        The backend and model are recorded in the collection metadata the first
+        time it is opened. Mixing vectors from two models would silently break
+        retrieval, so a mismatch raises instead; re-ingest the feedback PDFs
+        into an empty store (deleting the ingest manifest) or restore the old
+        EMBEDDING_BACKEND.
+        """
+        config = ChromaEmbeddingAdapter(self.embedding_model, EMBEDDING_BACKEND).get_config()
+        stamp = {"embedding_backend": config["backend"], "embedding_model": config["model"]}
+        collection = self.client.get_or_create_collection(name=collection_name)
+        metadata = collection.metadata or {}
+        recorded = {key: metadata.get(key) for key in stamp}
+        if recorded == stamp:
+            return
+        if any(recorded.values()):
+            raise RuntimeError(
+                f"Feedback collection {collection_name} was embedded with {recorded}, "
+                f"but the configured embedder is {stamp}."
+            )
+        if collection.count():
+            print(f"Feedback collection {collection_name} has no embedder record; assuming {stamp}.")
+        # Distance settings cannot be modified after creation, so they are not sent back
+        kept = {key: value for key, value in metadata.items() if not key.startswith("hnsw:")}
+        collection.modify(metadata={**kept, **stamp})
 
     def store_documents(self, documents):
-        """Stores documents in ChromaDB, avoiding duplicates."""
+        """Upserts documents into ChromaDB under their deterministic chunk ids."""
         if not documents:
             print("No documents to store.")
             return
 
-        existing_hashes = self.get_existing_document_ids()
         texts, metadatas, ids = [], [], []
+        seen_ids = set()
         
-        for i, doc in enumerate(documents):
-            if doc.metadata["hash"] in existing_hashes:
-                continue  
-            
+        for doc in documents:
+            if doc.metadata["chunk_id"] in seen_ids:
+                continue  # identical chunk repeated within the same file
+            seen_ids.add(doc.metadata["chunk_id"])
             texts.append(doc.page_content)
             metadatas.append(doc.metadata)
-            ids.append(f"doc_{i}")
+            ids.append(doc.metadata["chunk_id"])
 
         if texts:
             batch_size = 5000  
@@ -136,32 +279,174 @@ class ChromaDBManager:
                 self.collection.add_texts(texts=batch_texts, metadatas=batch_metadatas, ids=batch_ids)
                 print(f"Stored {len(batch_texts)} documents in ChromaDB (Batch {i // batch_size + 1}).")
 
+            self.invalidate_cache()
+
         else:
             print("No new documents to store.")
 
-    def retrieve_documents(self, query_text):
+    def delete_documents(self, ids):
+        """Removes chunks (e.g. from deleted or changed files) by id."""
+        ids = list(ids)
+        if not ids:
+            return
+        self.collection.delete(ids=ids)
+        print(f"Removed {len(ids)} stale documents from ChromaDB.")
+        self.invalidate_cache()
+
+    def invalidate_cache(self):
+        """Bumps the collection version so cached retrieval results are no longer used."""
+        self.collection_version += 1
+        self.result_cache.clear()
+
+    def embed_query(self, query_text):
+        """Returns the query embedding, reusing it for repeated (normalized) queries."""
+        key = hashlib.sha256(" ".join(query_text.lower().split()).encode()).hexdigest()
+        embedding = self.embedding_cache.get(key)
+        if embedding is None:
+            with timed("embedding"):
+                embedding = self.embedding_model.embed_query(query_text)
+            self.embedding_cache.put(key, embedding)
+        return embedding
+
+    def cache_stats(self):
+        """Hit/miss counters for the embedding and retrieval caches."""
+        return {
+            "collection_version": self.collection_version,
+            "embeddings": self.embedding_cache.stats(),
+            "results": self.result_cache.stats(),
+        }
+
+    def retrieve_documents(self, query_text, k=5, filters=None):
         """Retrieve relevant feedback from ChromaDB based on query."""
         if not hasattr(self, "collection"):
             return "Error: Collection not initialized."
 
-        results = self.collection.similarity_search(query_text, k=5)   
+        embedding = self.embed_query(query_text)
+        embedding_key = hashlib.sha256(json.dumps(embedding).encode()).hexdigest()
+        result_key = (self.collection_version, embedding_key, k, json.dumps(filters, sort_keys=True))
+
+        cached = self.result_cache.get(result_key)
+        if cached is not None:
+            return cached
+
+        with timed("retrieval"):
+            results = self.collection.similarity_search_by_vector(embedding, k=k, filter=filters)
 
         if results:
-            return "\n\n".join([doc.page_content for doc in results])
+            response = "\n\n".join([doc.page_content for doc in results])
+        else:
+            response = "No relevant feedback found."
+
+        self.result_cache.put(result_key, response)
+        return response
 
-        return "No relevant feedback found."
+class IngestionPipeline:
+    """Streams chunks from DocumentProcessor into ChromaDB in fixed-size batches.
 
-def store_documents():
+    Parsing runs on the calling thread while a writer thread embeds and stores
+    the previous batches. The bounded queue between them provides backpressure:
+    at most `queue_depth` batches are waiting at any time, so memory stays flat
+    regardless of corpus size.
+    """
+
+    def __init__(self, processor, db_manager, batch_size=INGEST_BATCH_SIZE, queue_depth=INGEST_QUEUE_DEPTH):
+        self.processor = processor
+        self.db_manager = db_manager
+        self.batch_size = batch_size
+        self.batch_queue = queue.Queue(maxsize=queue_depth)
+        self.stats = {"batches": 0, "stored": 0, "store_seconds": 0.0}
+        self._error = None
+
+    def run(self, manifest=None):
+        """Runs the pipeline to completion and returns per-stage stats."""
+        started = time.perf_counter()
+        writer = threading.Thread(target=self._write_batches, name="ingest-writer", daemon=True)
+        writer.start()
+
+        try:
+            batch = []
+            for chunk in self.processor.iter_documents(manifest):
+                batch.append(chunk)
+                if len(batch) >= self.batch_size:
+                    self._put(batch)
+                    batch = []
+            if batch:
+                self._put(batch)
+        finally:
+            self.batch_queue.put(None)
+            writer.join()
+
+        if self._error:
+            raise self._error
+
+        if manifest is not None:
+            self.db_manager.delete_documents(manifest.stale_chunk_ids)
+
+        return {
+            "parse": self.processor.stats,
+            "store": self.stats,
+            "total_seconds": time.perf_counter() - started,
+        }
+
+    def _put(self, batch):
+        if self._error:
+            raise self._error
+        self.batch_queue.put(batch)
+
+    def _write_batches(self):
+        while True:
+            batch = self.batch_queue.get()
+            if batch is None:
+                return
+            if self._error:
+                continue  # drain so the producer never blocks on a dead writer
+            try:
+                started = time.perf_counter()
+                self.db_manager.store_documents(batch)
+                self.stats["store_seconds"] += time.perf_counter() - started
+                self.stats["batches"] += 1
+                self.stats["stored"] += len(batch)
+            except Exception as e:
+                self._error = e
+
+def print_throughput(stats):
+    """Prints per-stage throughput for an ingestion run."""
+    parse, store = stats["parse"], stats["store"]
+    parse_seconds = parse["seconds"] or 1e-9
+    store_seconds = store["store_seconds"] or 1e-9
+    print(f" Parse: {parse['files']} files, {parse['pages']} pages, {parse['chunks']} chunks in {parse['seconds']:.2f}s "
+          f"({parse['files'] / parse_seconds:.1f} files/s, {parse['chunks'] / parse_seconds:.1f} chunks/s)")
+    print(f" Embed + store: {store['stored']} chunks in {store['batches']} batches, {store['store_seconds']:.2f}s "
+          f"({store['stored'] / store_seconds:.1f} chunks/s)")
+    print(f" Total: {stats['total_seconds']:.2f}s (embedding backend: {EMBEDDING_BACKEND})")
+
+def store_documents(batch_size=INGEST_BATCH_SIZE, queue_depth=INGEST_QUEUE_DEPTH, pdf_folders=None):
     """Process and store resumes & feedbacks into ChromaDB."""
-    print(" Processing documents...")
-    processor = DocumentProcessor()
-    documents = processor.process_documents()
+    print(" Processing and storing documents...")
+    manifest = IngestManifest()
+    pipeline = IngestionPipeline(DocumentProcessor(pdf_folders), ChromaDBManager(), batch_size, queue_depth)
+    stats = pipeline.run(manifest)
 
-    print(" Storing new documents in ChromaDB...")
-    db_manager = ChromaDBManager()
-    db_manager.store_documents(documents)
+    # Only record progress once the vector store is up to date
+    manifest.save()
 
     print("Resumes and feedback have been successfully processed and stored.")
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest resume and feedback PDFs into ChromaDB.")
+    parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE, help="chunks embedded per batch")
+    parser.add_argument("--queue-depth", type=int, default=INGEST_QUEUE_DEPTH, help="batches buffered between parsing and embedding")
+    parser.add_argument("--resumes", help="folder of resume PDFs")
+    parser.add_argument("--feedbacks", help="folder of feedback PDFs")
+    args = parser.parse_args()
+
+    pdf_folders = None
+    if args.resumes or args.feedbacks:
+        pdf_folders = {name: folder for name, folder in (("resumes", args.resumes), ("feedbacks", args.feedbacks)) if folder}
+
+    stats = store_documents(args.batch_size, args.queue_depth, pdf_folders)
+    print_throughput(stats)
 
 if __name__ == "__main__":
-    store_documents()  
+    main()
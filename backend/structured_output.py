@@ -0,0 +1,266 @@
+import os
+import re
+import json
+import logging
+from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field, ValidationError, model_validator
+from dotenv import load_dotenv
+from metrics import parse_failures, structured_outputs
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+STRUCTURED_OUTPUT_MAX_REASKS = int(os.getenv("STRUCTURED_OUTPUT_MAX_REASKS", "1"))
+
+# Curly double quotes models sometimes use as JSON delimiters; inside a "..." value they are content
+SMART_QUOTES = "“”"
+
+
+class QuestionOutput(BaseModel):
+    question: str = Field(..., min_length=1)
+    options: List[str] = Field(..., min_length=4, max_length=4)
+    answer: str
+    skills: List[str] = []
+    difficulty_level: Optional[int] = None
+
+    @model_validator(mode="after")
+    def answer_in_options(self):
+        if self.answer not in self.options:
+            raise ValueError("answer must be one of the options")
+        return self
+
+
+class SkillLevel(BaseModel):
+    skill: str
+    level: str
+    evidence: Optional[str] = None
+
+
+class FeedbackOutput(BaseModel):
+    feedback_summary: str
+    skill_levels: List[SkillLevel]
+    strengths: List[str]
+    areas_for_improvement: List[str]
+    suggested_improvements: List[str]
+
+
+class StructuredOutputError(Exception):
+    """Raised when a response cannot be turned into the expected shape, even after repair and re-ask."""
+
+
+def extract_json_object(text: str) -> Optional[str]:
+    """Returns the first balanced {...} in `text`, or everything from the first "{" if it never closes.
+
+    Braces inside JSON strings are ignored, so prose before or after the object
+    and braces in values do not confuse the match.
+    """
+    start = text.find("{")
+    if start < 0:
+        return None
+    depth, in_string, escaped, smart = 0, False, False, False
+    for index in range(start, len(text)):
+        char = text[index]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"' or (smart and char in SMART_QUOTES):
+                in_string = False
+        elif char == '"' or char in SMART_QUOTES:
+            in_string, smart = True, char != '"'
+        elif char in "{[":
+            depth += 1
+        elif char in "}]":
+            depth -= 1
+            if depth == 0:
+                return text[start:index + 1]
+    return text[start:]
+
+
+def repair_json(candidate: str) -> str:
+    """Fixes the usual model slips: smart quotes, trailing commas and output cut off mid-object.
+
+    A single string-aware scan turns curly quotes used as delimiters into
+    plain ones (leaving those inside values alone), drops trailing commas
+    before a closing bracket (never inside string values), then closes
+    whatever a truncated response left open. A key the response was cut off in or right after, before its
+    value started, is dropped so the field reads as missing.
+    """
+    out, stack = [], []
+    in_string, escaped, smart = False, False, False
+    expect_key = False  # inside an object, before the next key
+    key_cut = None  # where to cut if the text ends before the current key gets its value
+    for char in candidate:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"' or (smart and char in SMART_QUOTES):
+                char, in_string = '"', False
+            out.append(char)
+            continue
+        if char == '"' or char in SMART_QUOTES:
+            smart, char = char != '"', '"'
+            key_cut = _before_separator(out) if expect_key else None
+            expect_key = False
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+            expect_key = char == "{"
+            key_cut = None
+        elif char in "}]":
+            _drop_trailing_comma(out)
+            if stack:
+                stack.pop()
+            expect_key, key_cut = False, None
+        elif char == ",":
+            expect_key = bool(stack) and stack[-1] == "}"
+        elif char != ":" and not char.isspace():
+            key_cut = None
+        out.append(char)
+
+    if key_cut is not None:
+        del out[key_cut:]
+    elif in_string:
+        if escaped:
+            out.pop()
+        out.append('"')
+    if stack:
+        _drop_trailing_comma(out)
+        out.extend(reversed(stack))
+    return "".join(out)
+
+
+def _before_separator(out: list) -> int:
+    """Index in `out` just before the whitespace and comma preceding the current position."""
+    index = len(out)
+    while index and out[index - 1].isspace():
+        index -= 1
+    if index and out[index - 1] == ",":
+        index -= 1
+    return index
+
+
+def _drop_trailing_comma(out: list):
+    """Removes a comma (and whitespace after it) at the end of `out`; only called outside strings."""
+    index = len(out)
+    while index and out[index - 1].isspace():
+        index -= 1
+    if index and out[index - 1] == ",":
+        del out[index - 1:]
+
+
+def load_json_object(raw_text: str):
+    """Parses the first JSON object in a model response. Returns (data, repaired) or (None, False)."""
+    if not raw_text:
+        return None, False
+    candidate = extract_json_object(re.sub(r"```(?:json)?", "", raw_text))
+    if candidate is None:
+        return None, False
+    try:
+        data = json.loads(candidate)
+        return (data, False) if isinstance(data, dict) else (None, False)
+    except json.JSONDecodeError:
+        pass
+    try:
+        data = json.loads(repair_json(candidate))
+        return (data, True) if isinstance(data, dict) else (None, False)
+    except json.JSONDecodeError:
+        return None, False
+
+
+def invalid_fields(model, data: Dict[str, Any]) -> List[str]:
+    """Top-level fields of `model` that are missing or fail validation in `data`."""
+    try:
+        model.model_validate(data)
+        return []
+    except ValidationError as e:
+        fields = {str(error["loc"][0]) for error in e.errors() if error["loc"]}
+        # Model-level checks (e.g. answer not among options) carry no field name
+        if any(not error["loc"] for error in e.errors()):
+            fields.update(name for name in ("answer", "options") if name in model.model_fields)
+        return sorted(fields)
+
+
+def build_reask_prompt(model, data: Dict[str, Any], fields: List[str]) -> str:
+    """Asks only for the fields that are missing or invalid, showing their JSON schema."""
+    schema = model.model_json_schema()
+    expected = {"properties": {name: schema["properties"][name] for name in fields}}
+    if "$defs" in schema:
+        expected["$defs"] = schema["$defs"]
+    return f"""
+        Your previous answer was incomplete. Here is the JSON you returned:
+        {json.dumps(data, ensure_ascii=False)}
+
+        The following fields are missing or invalid: {", ".join(fields)}
+        Expected schema: {json.dumps(expected)}
+
+        Return ONLY a JSON object containing these fields, consistent with the JSON above. No explanations.
+        """
+
+
+async def parse_structured(raw_text: str, model, kind: str, llm=None, max_reasks: int = STRUCTURED_OUTPUT_MAX_REASKS) -> dict:
+    """Turns a model response into a validated `model` dict.
+
+    Extracts the first balanced JSON object, repairs it if needed, and when
+    fields are missing or invalid asks `llm` for just those fields (at most
+    `max_reasks` times) instead of repeating the whole call. Outcomes are
+    counted in llm_structured_outputs_total{kind, result}.
+    """
+    data, repaired = load_json_object(raw_text)
+    if data is None:
+        structured_outputs.inc(kind=kind, result="failed")
+        parse_failures.inc(kind=kind)
+        raise StructuredOutputError("AI response is not in valid JSON format.")
+
+    fields = invalid_fields(model, data)
+    reasked = False
+    for _ in range(max_reasks if llm is not None else 0):
+        if not fields:
+            break
+        logger.info(f"Re-asking the model for {kind} fields: {fields}")
+        patch, _ = load_json_object(await llm.generate(build_reask_prompt(model, data, fields)))
+        reasked = True
+        if patch:
+            data.update({name: patch[name] for name in fields if name in patch})
+        fields = invalid_fields(model, data)
+
+    if fields:
+        structured_outputs.inc(kind=kind, result="failed")
+        parse_failures.inc(kind=kind)
+        raise StructuredOutputError(f"JSON missing required fields: {', '.join(fields)}")
+
+    structured_outputs.inc(kind=kind, result="reasked" if reasked else "repaired" if repaired else "clean")
+    return model.model_validate(data).model_dump()
+
+
+def parse_structured_items(raw_text: str, model, kind: str, key: str) -> list:
+    """Validates each object in the `key` list of a model response on its own.
+
+    Used for batched generation: invalid items (including one cut off by a
+    truncated response) are dropped and counted as "dropped", so one bad item
+    does not cost the whole batch. Raises StructuredOutputError when no item is valid.
+    """
+    data, repaired = load_json_object(raw_text)
+    items = data.get(key) if data else None
+    if not isinstance(items, list):
+        structured_outputs.inc(kind=kind, result="failed")
+        parse_failures.inc(kind=kind)
+        raise StructuredOutputError(f"AI response has no '{key}' list.")
+
+    valid = []
+    for item in items:
+        try:
+            valid.append(model.model_validate(item).model_dump())
+        except ValidationError:
+            structured_outputs.inc(kind=kind, result="dropped")
+    if not valid:
+        structured_outputs.inc(kind=kind, result="failed")
+        parse_failures.inc(kind=kind)
+        raise StructuredOutputError(f"AI response has no valid items in '{key}'.")
+
+    structured_outputs.inc(kind=kind, result="repaired" if repaired else "clean")
+    return valid
@@ -0,0 +1,51 @@
+import answer_cache
+from answer_cache import SemanticAnswerCache
+
+
+def test_similar_query_hits_and_dissimilar_misses():
+    cache = SemanticAnswerCache(threshold=0.9)
+    cache.store("resume", [1.0, 0.0, 0.0], "five years of Python")
+    assert cache.lookup("resume", [0.99, 0.1, 0.0]) == "five years of Python"
+    assert cache.lookup("resume", [0.7, 0.7, 0.0]) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_answers_are_scoped_to_their_resume():
+    cache = SemanticAnswerCache(threshold=0.9)
+    cache.store("resume-a", [1.0, 0.0], "answer about A")
+    assert cache.lookup("resume-b", [1.0, 0.0]) is None
+
+
+def test_best_match_wins():
+    cache = SemanticAnswerCache(threshold=0.5)
+    cache.store("resume", [1.0, 0.0], "first")
+    cache.store("resume", [0.0, 1.0], "second")
+    assert cache.lookup("resume", [0.2, 0.9]) == "second"
+
+
+def test_entries_expire(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(answer_cache.time, "monotonic", lambda: now[0])
+    cache = SemanticAnswerCache(threshold=0.9, ttl_seconds=60)
+    cache.store("resume", [1.0, 0.0], "answer")
+    now[0] += 61
+    assert cache.lookup("resume", [1.0, 0.0]) is None
+    assert len(cache) == 0
+
+
+def test_clear_invalidates_everything():
+    cache = SemanticAnswerCache(threshold=0.9)
+    cache.store("resume", [1.0, 0.0], "answer")
+    cache.clear()
+    assert cache.lookup("resume", [1.0, 0.0]) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_resume_is_evicted():
+    cache = SemanticAnswerCache(threshold=0.9, max_entries=2, max_per_resume=2)
+    cache.store("old", [1.0, 0.0], "old answer")
+    cache.store("new", [1.0, 0.0], "new answer")
+    cache.store("new", [0.0, 1.0], "another new answer")
+    assert cache.lookup("old", [1.0, 0.0]) is None
+    assert cache.lookup("new", [1.0, 0.0]) == "new answer"
+    assert len(cache) == 2
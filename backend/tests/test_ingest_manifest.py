@@ -0,0 +1,82 @@
+import os
+import pytest
+from langchain_core.documents import Document
+from store_main import DocumentProcessor, IngestManifest
+
+
+@pytest.fixture
+def folder(tmp_path):
+    path = tmp_path / "resumes"
+    path.mkdir()
+    for name in ("a.pdf", "b.pdf"):
+        (path / name).write_bytes(f"%PDF {name}".encode())
+    return path
+
+
+@pytest.fixture
+def processor(folder):
+    processor = DocumentProcessor({"resumes": str(folder)})
+    processor.loaded = []
+
+    def load_file(pdf_path, doc_type, unique_hashes):
+        processor.loaded.append(os.path.basename(pdf_path))
+        content = open(pdf_path, "rb").read().decode()
+        return [Document(page_content=content, metadata={"chunk_id": f"{os.path.basename(pdf_path)}:{content}"})]
+
+    processor.load_file = load_file
+    return processor
+
+
+def run(processor, manifest):
+    processor.loaded.clear()
+    chunks = list(processor.iter_documents(manifest))
+    return sorted(processor.loaded), chunks
+
+
+def test_second_run_skips_unchanged_files(processor, tmp_path):
+    manifest = IngestManifest(str(tmp_path / "manifest.json"))
+    loaded, chunks = run(processor, manifest)
+    assert loaded == ["a.pdf", "b.pdf"] and len(chunks) == 2
+    manifest.save()
+
+    reloaded = IngestManifest(str(tmp_path / "manifest.json"))
+    assert run(processor, reloaded) == ([], [])
+
+
+def test_touched_file_with_same_bytes_is_skipped(processor, folder, tmp_path):
+    manifest = IngestManifest(str(tmp_path / "manifest.json"))
+    run(processor, manifest)
+    path = str(folder / "a.pdf")
+    os.utime(path, (1, 1))
+
+    assert not manifest.is_unchanged(path)
+    assert run(processor, manifest) == ([], [])
+    # content_unchanged refreshed the stat, so the next run skips without hashing
+    assert manifest.is_unchanged(path)
+
+
+def test_changed_file_is_reloaded_and_old_chunks_go_stale(processor, folder, tmp_path):
+    manifest = IngestManifest(str(tmp_path / "manifest.json"))
+    run(processor, manifest)
+    (folder / "a.pdf").write_bytes(b"%PDF a.pdf, edited")
+
+    loaded, _ = run(processor, manifest)
+    assert loaded == ["a.pdf"]
+    assert manifest.stale_chunk_ids == {"a.pdf:%PDF a.pdf"}
+
+
+def test_deleted_file_is_forgotten(processor, folder, tmp_path):
+    manifest = IngestManifest(str(tmp_path / "manifest.json"))
+    run(processor, manifest)
+    (folder / "b.pdf").unlink()
+
+    assert run(processor, manifest) == ([], [])
+    assert str(folder / "b.pdf") not in manifest.files
+    assert manifest.stale_chunk_ids == {"b.pdf:%PDF b.pdf"}
+
+
+def test_unreadable_file_is_retried(processor, tmp_path):
+    manifest = IngestManifest(str(tmp_path / "manifest.json"))
+    processor.load_file = lambda pdf_path, doc_type, unique_hashes: None
+    list(processor.iter_documents(manifest))
+    assert manifest.files == {}
@@ -0,0 +1,35 @@
+import asyncio
+import pytest
+from llm_backend import LLMBackend
+from metrics import llm_calls
+
+
+class FailingStream(LLMBackend):
+    async def _stream(self, prompt):
+        yield "partial"
+        raise ConnectionError("stream dropped")
+
+
+class SlowStream(LLMBackend):
+    async def _stream(self, prompt):
+        await asyncio.sleep(1)
+        yield "late"
+
+
+async def consume(backend):
+    return [chunk async for chunk in backend.stream("prompt")]
+
+
+def test_stream_counts_backend_errors():
+    before = llm_calls.value(status="error")
+    with pytest.raises(ConnectionError):
+        asyncio.run(consume(FailingStream()))
+    assert llm_calls.value(status="error") == before + 1
+
+
+def test_stream_counts_timeouts_separately():
+    errors, timeouts = llm_calls.value(status="error"), llm_calls.value(status="timeout")
+    with pytest.raises(TimeoutError):
+        asyncio.run(consume(SlowStream(timeout=0.05)))
+    assert llm_calls.value(status="timeout") == timeouts + 1
+    assert llm_calls.value(status="error") == errors
@@ -0,0 +1,108 @@
+import asyncio
+from prefetch import QuestionPrefetcher
+from query_engine import AdaptiveDifficultyEngine
+
+
+def question(level, number=0):
+    return {"question": f"level {level} #{number}", "question_hash": f"{level}-{number}", "difficulty_level": level}
+
+
+class FakeQueryEngine:
+    questions_per_level = 2
+
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = []
+        self.ladder_ready = None
+
+    async def generate_next_question(self, resume_text, difficulty_engine, refill=True):
+        level = difficulty_engine.get_current_difficulty()
+        self.calls.append((level, refill))
+        await asyncio.sleep(0)
+        if self.error:
+            return None, self.error
+        difficulty_engine.add_to_pool(level, [question(level, 1)])
+        return question(level), None
+
+    def batch_counts(self, difficulty_engine, level):
+        return {level: self.questions_per_level}
+
+    async def generate_question_batch(self, resume_text, counts, seen=()):
+        await self.ladder_ready.wait()
+        return {level: [question(level, n) for n in range(count)] for level, count in counts.items()}, None
+
+
+def test_taken_branch_is_a_hit_and_merges_its_pool():
+    async def scenario():
+        prefetcher = QuestionPrefetcher(FakeQueryEngine(), enabled=True)
+        engine = AdaptiveDifficultyEngine()
+        prefetcher.schedule("s", "resume", engine)
+        result = await prefetcher.take("s", 4, engine)
+        return prefetcher, engine, result
+
+    prefetcher, engine, (question_data, error) = asyncio.run(scenario())
+    assert error is None and question_data == question(4)
+    assert engine.pooled(4) == 1
+    assert prefetcher.stats["hits"] == 1 and prefetcher.stats["misses"] == 0
+    assert prefetcher.stats["scheduled"] == 2 and prefetcher.stats["cancelled"] == 1
+
+
+def test_failed_prefetch_is_a_miss():
+    async def scenario():
+        prefetcher = QuestionPrefetcher(FakeQueryEngine(error="model down"), enabled=True)
+        engine = AdaptiveDifficultyEngine()
+        prefetcher.schedule("s", "resume", engine)
+        return prefetcher, await prefetcher.take("s", 2, engine)
+
+    prefetcher, result = asyncio.run(scenario())
+    assert result is None
+    assert prefetcher.stats["misses"] == 1 and prefetcher.stats["hits"] == 0
+
+
+def test_unscheduled_level_is_not_counted():
+    async def scenario():
+        prefetcher = QuestionPrefetcher(FakeQueryEngine(), enabled=True)
+        engine = AdaptiveDifficultyEngine()
+        engine.add_to_pool(4, [question(4)])
+        prefetcher.schedule("s", "resume", engine)
+        return prefetcher, await prefetcher.take("s", 4, engine)
+
+    prefetcher, result = asyncio.run(scenario())
+    assert result is None
+    assert prefetcher.stats["hits"] == 0 and prefetcher.stats["misses"] == 0
+
+
+def test_ladder_is_merged_only_once_finished():
+    async def scenario():
+        query_engine = FakeQueryEngine()
+        query_engine.ladder_ready = asyncio.Event()
+        prefetcher = QuestionPrefetcher(query_engine, enabled=True)
+        engine = AdaptiveDifficultyEngine()
+
+        prefetcher.schedule_ladder("s", "resume", engine)
+        assert engine.pool_filled and prefetcher.ladder_pending("s")
+        prefetcher.merge_ladder("s", engine)
+        assert engine.pooled(3) == 0
+
+        # Prefetches scheduled while the ladder runs make single-question calls
+        prefetcher.schedule("s", "resume", engine)
+        await prefetcher.take("s", 4, engine)
+        assert all(refill is False for _, refill in query_engine.calls)
+
+        query_engine.ladder_ready.set()
+        await asyncio.sleep(0.01)
+        assert not prefetcher.ladder_pending("s")
+        prefetcher.merge_ladder("s", engine)
+        return engine
+
+    engine = asyncio.run(scenario())
+    assert engine.pooled(3) == 2
+
+
+def test_disabled_prefetcher_schedules_nothing():
+    async def scenario():
+        prefetcher = QuestionPrefetcher(FakeQueryEngine(), enabled=False)
+        prefetcher.schedule("s", "resume", AdaptiveDifficultyEngine())
+        return prefetcher
+
+    assert asyncio.run(scenario()).stats["scheduled"] == 0
@@ -0,0 +1,64 @@
+import mongomock
+import pytest
+from question_bank import QuestionBank, question_hash, resume_fingerprint
+
+RESUME = resume_fingerprint("Python developer, five years of Django")
+
+
+def mcq(question, answer="B"):
+    return {"question": question, "options": ["A", "B", "C", "D"], "answer": answer, "skills": ["python"]}
+
+
+@pytest.fixture
+def collection():
+    return mongomock.MongoClient().db.question_bank
+
+
+def test_fingerprint_ignores_whitespace_and_case():
+    assert resume_fingerprint("Python  developer\n") == resume_fingerprint("python developer")
+
+
+def test_draw_skips_seen_questions(collection):
+    bank = QuestionBank(collection, freshness=0)
+    bank.add(RESUME, 3, mcq("What does the GIL protect in CPython?"))
+    bank.add(RESUME, 3, mcq("How does Django resolve URL patterns?"))
+
+    first = bank.draw(RESUME, 3)
+    assert first["difficulty_level"] == 3
+    second = bank.draw(RESUME, 3, seen=[first["question_hash"]])
+    assert second["question_hash"] != first["question_hash"]
+    assert bank.draw(RESUME, 3, seen=[first["question_hash"], second["question_hash"]]) is None
+    assert bank.draw(RESUME, 4) is None
+
+
+def test_freshness_sends_calls_to_the_model(collection):
+    bank = QuestionBank(collection, freshness=1)
+    bank.add(RESUME, 3, mcq("What does the GIL protect in CPython?"))
+    assert all(bank.draw(RESUME, 3) is None for _ in range(20))
+
+
+def test_near_duplicates_are_not_banked(collection):
+    bank = QuestionBank(collection, freshness=0)
+    assert bank.add(RESUME, 3, mcq("What does the GIL protect in CPython?"))
+    assert not bank.add(RESUME, 3, mcq("what does the GIL protect in CPython"))
+    assert not bank.add(RESUME, 3, mcq("What exactly does the GIL protect in CPython?"))
+    assert bank.add(RESUME, 4, mcq("What does the GIL protect in CPython?"))
+    assert collection.count_documents({}) == 2
+
+
+def test_invalid_questions_are_rejected(collection):
+    bank = QuestionBank(collection)
+    assert not bank.add(RESUME, 3, mcq("Which option?", answer="E"))
+    assert not bank.add(RESUME, 3, {"question": "Which option?", "options": ["A", "A", "B", "C"], "answer": "A"})
+    assert not bank.add(RESUME, 3, "not a question")
+    assert collection.count_documents({}) == 0
+
+
+def test_level_is_capped(collection):
+    bank = QuestionBank(collection, max_per_level=2)
+    topics = ["generators", "decorators", "metaclasses"]
+    added = [bank.add(RESUME, 3, mcq(f"Explain Python {topic} with an example")) for topic in topics]
+    assert added == [True, True, False]
+    assert question_hash("Explain Python generators with an example") in {
+        doc["question_hash"] for doc in collection.find()
+    }
@@ -0,0 +1,129 @@
+import time
+import pytest
+import process
+import store_main
+from embeddings import ChromaEmbeddingAdapter, HashEmbeddings
+from vector_store import create_chroma_client
+
+NAME = "resume_collection"
+STAGING = f"{NAME}_reembed"
+IDS = [str(i) for i in range(300)]
+DOCS = [f"resume {i} python sql" for i in IDS]
+
+
+def adapter(dimensions):
+    return ChromaEmbeddingAdapter(HashEmbeddings(dimensions), "hash")
+
+
+@pytest.fixture
+def processor(tmp_path):
+    instance = process.ResumeProcessor.__new__(process.ResumeProcessor)
+    instance.chroma_client = create_chroma_client(str(tmp_path))
+    return instance
+
+
+def names(client):
+    return sorted(collection.name for collection in client.list_collections())
+
+
+def seed(processor, dimensions=256):
+    collection = processor._open_collection(NAME, adapter(dimensions))
+    collection.upsert(ids=IDS, documents=DOCS)
+    return collection
+
+
+def stored_model(collection):
+    return collection.configuration_json["embedding_function"]["config"]["model"]
+
+
+def test_same_embedder_opens_without_copy(processor):
+    seed(processor)
+    collection = processor._open_collection(NAME, adapter(256))
+    assert collection.count() == len(IDS)
+    assert names(processor.chroma_client) == [NAME]
+
+
+def test_model_change_reembeds_everything(processor):
+    seed(processor, 256)
+    collection = processor._open_collection(NAME, adapter(128))
+    assert collection.count() == len(IDS)
+    assert stored_model(collection) == "hash-128"
+    assert names(processor.chroma_client) == [NAME]
+
+
+def test_interrupted_swap_is_finished(processor):
+    seed(processor, 256)
+    client = processor.chroma_client
+    staging = client.create_collection(STAGING, embedding_function=adapter(64),
+                                       metadata={"reembed_heartbeat": 0.0, "reembed_complete": True})
+    staging.upsert(ids=IDS, documents=DOCS)
+    client.delete_collection(NAME)  # crashed between delete and rename
+
+    collection = processor._open_collection(NAME, adapter(64))
+    assert collection.count() == len(IDS)
+    assert names(client) == [NAME]
+
+
+def test_abandoned_copy_is_taken_over(processor):
+    seed(processor, 256)
+    staging = processor.chroma_client.create_collection(STAGING, embedding_function=adapter(32),
+                                                        metadata={"reembed_heartbeat": 0.0})
+    staging.upsert(ids=IDS[:1], documents=DOCS[:1])
+
+    collection = processor._open_collection(NAME, adapter(32))
+    assert collection.count() == len(IDS)
+    assert stored_model(collection) == "hash-32"
+    assert names(processor.chroma_client) == [NAME]
+
+
+def test_waits_while_another_worker_copies(processor, monkeypatch):
+    seed(processor, 256)
+    client = processor.chroma_client
+    staging = client.create_collection(STAGING, embedding_function=adapter(16),
+                                       metadata={"reembed_heartbeat": time.time()})
+    staging.upsert(ids=IDS, documents=DOCS)
+    waits = []
+
+    def other_worker_finishes(seconds):
+        waits.append(seconds)
+        client.delete_collection(NAME)
+        staging.modify(name=NAME)
+
+    monkeypatch.setattr(process.time, "sleep", other_worker_finishes)
+    collection = processor._open_collection(NAME, adapter(16))
+    assert waits == [process.REEMBED_POLL_SECONDS]
+    assert collection.count() == len(IDS)
+    assert names(client) == [NAME]
+
+
+def test_short_copy_keeps_the_original(processor, monkeypatch):
+    collection_type = type(seed(processor, 256))
+    real_upsert = collection_type.upsert
+
+    def drop_last_page(collection, ids, **kwargs):
+        if len(ids) == process.RESUME_UPSERT_BATCH_SIZE:
+            real_upsert(collection, ids=ids, **kwargs)
+
+    monkeypatch.setattr(collection_type, "upsert", drop_last_page)
+    with pytest.raises(RuntimeError):
+        processor._open_collection(NAME, adapter(8))
+    original = processor.chroma_client.get_collection(NAME)
+    assert original.count() == len(IDS)
+    assert stored_model(original) == "hash-256"
+
+
+class FeedbackStore(store_main.ChromaDBManager):
+    def __init__(self, client, embeddings):
+        self.client = client
+        self.embedding_model = embeddings
+
+
+def test_feedback_store_records_and_enforces_embedder(tmp_path, monkeypatch):
+    monkeypatch.setattr(store_main, "EMBEDDING_BACKEND", "hash")
+    client = create_chroma_client(str(tmp_path))
+    FeedbackStore(client, HashEmbeddings(256)).check_embedder("langchain")
+    assert client.get_collection("langchain").metadata["embedding_model"] == "hash-256"
+
+    FeedbackStore(client, HashEmbeddings(256)).check_embedder("langchain")
+    with pytest.raises(RuntimeError):
+        FeedbackStore(client, HashEmbeddings(128)).check_embedder("langchain")
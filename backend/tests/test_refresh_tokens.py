@@ -0,0 +1,67 @@
+import asyncio
+from datetime import datetime, timedelta
+import mongomock
+import pytest
+from refresh_tokens import RefreshTokenStore, hash_refresh_token
+
+
+@pytest.fixture
+def store():
+    return RefreshTokenStore(mongomock.MongoClient().db.refresh_tokens, reuse_grace_seconds=10)
+
+
+def backdate_use(store, token, seconds):
+    store.collection.update_one(
+        {"_id": hash_refresh_token(token)}, {"$set": {"used_at": datetime.utcnow() - timedelta(seconds=seconds)}}
+    )
+
+
+def test_rotation_issues_a_new_token_in_the_same_family(store):
+    token = asyncio.run(store.issue("alice", "user"))
+    subject, role, new_token = asyncio.run(store.rotate(token))
+    assert (subject, role) == ("alice", "user") and new_token != token
+    old, new = (store.collection.find_one({"_id": hash_refresh_token(t)}) for t in (token, new_token))
+    assert old["used"] and old["family"] == new["family"]
+    # Only the hash is stored
+    assert store.collection.find_one({"_id": token}) is None
+
+
+def test_reuse_after_grace_revokes_the_family(store):
+    token = asyncio.run(store.issue("alice", "user"))
+    _, _, new_token = asyncio.run(store.rotate(token))
+    backdate_use(store, token, 60)
+
+    assert asyncio.run(store.rotate(token)) is None
+    assert asyncio.run(store.rotate(new_token)) is None
+    assert store.collection.count_documents({"revoked": False}) == 0
+
+
+def test_concurrent_refresh_within_grace_is_allowed(store):
+    token = asyncio.run(store.issue("alice", "user"))
+    _, _, first = asyncio.run(store.rotate(token))
+    _, _, second = asyncio.run(store.rotate(token))
+    assert first != second
+    assert asyncio.run(store.rotate(first)) is not None
+    assert asyncio.run(store.rotate(second)) is not None
+
+
+def test_logout_and_password_change_revoke_tokens(store):
+    token = asyncio.run(store.issue("alice", "user"))
+    other = asyncio.run(store.issue("alice", "user"))
+    bob = asyncio.run(store.issue("bob", "user"))
+
+    asyncio.run(store.revoke(token))
+    assert asyncio.run(store.rotate(token)) is None
+    assert asyncio.run(store.rotate(other)) is not None
+
+    asyncio.run(store.revoke_subject("alice"))
+    assert store.collection.count_documents({"sub": "alice", "revoked": False}) == 0
+    assert asyncio.run(store.rotate(bob)) is not None
+
+
+def test_expired_and_unknown_tokens_are_rejected(store):
+    token = asyncio.run(store.issue("alice", "user"))
+    store.collection.update_one({"_id": hash_refresh_token(token)},
+                                {"$set": {"expires_at": datetime.utcnow() - timedelta(seconds=1)}})
+    assert asyncio.run(store.rotate(token)) is None
+    assert asyncio.run(store.rotate("not-a-token")) is None
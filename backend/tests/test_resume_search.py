@@ -0,0 +1,83 @@
+import pytest
+from embeddings import ChromaEmbeddingAdapter, HashEmbeddings
+from resume_search import BM25Index, HybridResumeSearch, matches_filters, to_chroma_where
+from vector_store import create_chroma_client
+
+METADATA = {"filename": "a.pdf", "uploaded_at": 100}
+
+
+def test_field_and_operator_filters():
+    assert matches_filters(METADATA, {"filename": "a.pdf", "uploaded_at": {"$gte": 100}})
+    assert not matches_filters(METADATA, {"uploaded_at": {"$lt": 100}})
+    assert not matches_filters(METADATA, {"uploaded_at": {"$regex": "1"}})
+
+
+def test_logical_operators_match_like_chroma():
+    assert matches_filters(METADATA, {"$and": [{"filename": "a.pdf"}, {"uploaded_at": {"$gt": 50}}]})
+    assert not matches_filters(METADATA, {"$and": [{"filename": "a.pdf"}, {"uploaded_at": {"$gt": 150}}]})
+    assert matches_filters(METADATA, {"$or": [{"filename": "b.pdf"}, {"uploaded_at": 100}]})
+    assert not matches_filters(METADATA, {"$or": [{"filename": "b.pdf"}, {"uploaded_at": 1}]})
+    assert matches_filters(METADATA, {"$or": [{"$and": [{"filename": "a.pdf"}, {"uploaded_at": 100}]}]})
+
+
+def test_to_chroma_where_combines_fields():
+    assert to_chroma_where({}) is None
+    assert to_chroma_where({"filename": "a.pdf"}) == {"filename": "a.pdf"}
+    assert to_chroma_where({"filename": "a.pdf", "uploaded_at": {"$gt": 1}}) == {
+        "$and": [{"filename": "a.pdf"}, {"uploaded_at": {"$gt": 1}}]
+    }
+
+
+def test_bm25_applies_logical_filters():
+    index = BM25Index()
+    index.add("1", "python kubernetes", {"team": "infra", "uploaded_at": 1})
+    index.add("2", "python react", {"team": "web", "uploaded_at": 2})
+    index.add("3", "python sql", {"team": "data", "uploaded_at": 3})
+    either = {"$or": [{"team": "infra"}, {"team": "data"}]}
+    assert {doc_id for doc_id, _ in index.search("python", filters=either)} == {"1", "3"}
+    both = {"$and": [{"team": {"$ne": "web"}}, {"uploaded_at": {"$gte": 3}}]}
+    assert [doc_id for doc_id, _ in index.search("python", filters=both)] == ["3"]
+
+
+class Processor:
+    def __init__(self, collection):
+        self.collection = collection
+        self.lexical_index = BM25Index()
+
+
+@pytest.fixture
+def search(tmp_path):
+    client = create_chroma_client(str(tmp_path))
+    collection = client.create_collection("resumes", embedding_function=ChromaEmbeddingAdapter(HashEmbeddings(64), "hash"))
+    collection.add(
+        ids=["infra", "web", "data"],
+        documents=["kubernetes terraform python", "react typescript css", "python sql airflow"],
+        metadatas=[{"filename": "infra.pdf", "team": "infra"}, {"filename": "web.pdf", "team": "web"},
+                   {"filename": "data.pdf", "team": "data"}],
+    )
+    return HybridResumeSearch(Processor(collection), vector_candidates=10)
+
+
+def test_hybrid_search_syncs_the_index_and_fuses_rankings(search):
+    response = search.search("kubernetes")
+    assert len(search.index) == 3
+    top = response["results"][0]
+    assert top["id"] == "infra" and top["filename"] == "infra.pdf"
+    assert top["lexical_score"] is not None and top["vector_distance"] is not None
+    # Only the keyword match scores on both rankings; the rest are vector-only neighbours
+    assert all(result["lexical_score"] is None for result in response["results"][1:])
+
+
+def test_hybrid_search_filters_both_rankings(search):
+    either = {"$or": [{"team": "infra"}, {"team": "data"}]}
+    response = search.search("python", filters=either)
+    assert {result["id"] for result in response["results"]} == {"infra", "data"}
+    assert all(result["lexical_score"] is not None for result in response["results"])
+
+    response = search.search("python", filters={"team": "web"})
+    assert [result["id"] for result in response["results"]] == ["web"]
+    assert response["results"][0]["lexical_score"] is None
+
+
+def test_hybrid_search_pages_past_the_candidates(search):
+    assert search.search("python", limit=2, offset=10) == {"candidates": 3, "results": []}
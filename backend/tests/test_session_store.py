@@ -0,0 +1,77 @@
+import asyncio
+from datetime import datetime, timedelta
+import mongomock
+import pytest
+import session_store
+from session_store import SessionStore
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(session_store.time, "monotonic", clock)
+    return clock
+
+
+def test_session_expires_after_ttl(clock):
+    store = SessionStore(ttl_seconds=60)
+    session_id, _ = asyncio.run(store.create())
+    clock.now += 61
+    assert asyncio.run(store.get(session_id)) is None
+    assert len(store) == 0
+
+
+def test_reads_slide_the_expiry(clock):
+    store = SessionStore(ttl_seconds=60)
+    session_id, _ = asyncio.run(store.create())
+    for _ in range(3):
+        clock.now += 45
+        assert asyncio.run(store.get(session_id)) is not None
+
+
+def test_state_round_trips(clock):
+    store = SessionStore()
+    session_id, engine = asyncio.run(store.create())
+    engine.record_response(True)
+    asyncio.run(store.save(session_id, engine))
+    restored = asyncio.run(store.get(session_id))
+    assert restored.get_current_difficulty() == engine.get_current_difficulty()
+    assert restored.response_history == engine.response_history
+
+
+def test_lru_evicts_least_recently_used(clock):
+    store = SessionStore(max_entries=2)
+    first, _ = asyncio.run(store.create())
+    second, _ = asyncio.run(store.create())
+    asyncio.run(store.get(first))
+    third, _ = asyncio.run(store.create())
+    assert asyncio.run(store.get(second)) is None
+    assert asyncio.run(store.get(first)) is not None
+    assert asyncio.run(store.get(third)) is not None
+
+
+def test_eviction_drops_expired_sessions_first(clock):
+    store = SessionStore(max_entries=10, ttl_seconds=60)
+    stale, _ = asyncio.run(store.create())
+    clock.now += 61
+    asyncio.run(store.create())
+    assert stale not in store._sessions
+
+
+def test_mongo_sessions_expire_and_get_a_ttl_index():
+    collection = mongomock.MongoClient().db.test_sessions
+    store = SessionStore(ttl_seconds=60, collection=collection)
+    session_id, _ = asyncio.run(store.create())
+    assert asyncio.run(store.get(session_id)) is not None
+    assert any(index.get("expireAfterSeconds") == 0 for index in collection.index_information().values())
+
+    collection.update_one({"_id": session_id}, {"$set": {"expires_at": datetime.utcnow() - timedelta(seconds=1)}})
+    assert asyncio.run(store.get(session_id)) is None
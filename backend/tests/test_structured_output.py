@@ -0,0 +1,88 @@
+import json
+import asyncio
+import pytest
+from structured_output import (
+    QuestionOutput, StructuredOutputError, extract_json_object, repair_json, load_json_object,
+    parse_structured, parse_structured_items,
+)
+
+QUESTION = {"question": "Q?", "options": ["a", "b", "c", "d"], "answer": "a"}
+
+
+class ScriptedLLM:
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.prompts = []
+
+    async def generate(self, prompt):
+        self.prompts.append(prompt)
+        return self.responses.pop(0)
+
+
+def test_extract_ignores_prose_and_braces_in_strings():
+    text = 'Sure! {"question": "What does {} mean?", "answer": "a"} Hope this helps {.'
+    assert json.loads(extract_json_object(text)) == {"question": "What does {} mean?", "answer": "a"}
+
+
+def test_extract_returns_rest_of_unclosed_object():
+    assert extract_json_object('x {"a": [1, 2') == '{"a": [1, 2'
+
+
+def test_repair_drops_trailing_commas_outside_strings_only():
+    repaired = repair_json('{"hint": "Use [a, ] list", "items": [1, 2,], }')
+    assert json.loads(repaired) == {"hint": "Use [a, ] list", "items": [1, 2]}
+
+
+def test_repair_closes_truncated_string_value():
+    assert json.loads(repair_json('{"question": "Q?", "answer": "hel')) == {"question": "Q?", "answer": "hel"}
+
+
+@pytest.mark.parametrize("tail", [', "skil', ', "skills"', ', "skills":', ', "skills": ', ','])
+def test_repair_drops_dangling_key(tail):
+    body = json.dumps(QUESTION)[:-1]
+    assert json.loads(repair_json(body + tail)) == QUESTION
+
+
+def test_repair_keeps_complete_trailing_values():
+    assert json.loads(repair_json('{"options": ["a", "b"')) == {"options": ["a", "b"]}
+    assert json.loads(repair_json('{"a": {"b": "c"')) == {"a": {"b": "c"}}
+
+
+def test_repair_handles_smart_quotes_and_escapes():
+    assert json.loads(repair_json('{“a”: "say \\"hi\\", ok",}')) == {"a": 'say "hi", ok'}
+
+
+def test_repair_keeps_smart_quotes_inside_values():
+    text = '{"a": "the “best” answer", “b”: “it’s fine”,}'
+    assert json.loads(repair_json(text)) == {"a": "the “best” answer", "b": "it’s fine"}
+
+
+def test_extract_treats_smart_quotes_as_delimiters_outside_strings():
+    assert extract_json_object('{“a”: “x}”} trailing') == '{“a”: “x}”}'
+
+
+def test_load_json_object_reports_repair():
+    assert load_json_object("```json\n" + json.dumps(QUESTION) + "\n```") == (QUESTION, False)
+    data, repaired = load_json_object(json.dumps(QUESTION)[:-1] + ', "skil')
+    assert data == QUESTION and repaired
+
+
+def test_reask_merges_only_requested_fields():
+    llm = ScriptedLLM('{"answer": "b", "question": "ignored"}')
+    raw = json.dumps({"question": "Q?", "options": ["a", "b", "c", "d"], "answer": "z"})
+    result = asyncio.run(parse_structured(raw, QuestionOutput, "question", llm=llm, max_reasks=1))
+    assert result["question"] == "Q?" and result["answer"] == "b"
+    assert "answer" in llm.prompts[0]
+
+
+def test_reask_gives_up_after_max_reasks():
+    llm = ScriptedLLM("{}", "{}")
+    with pytest.raises(StructuredOutputError):
+        asyncio.run(parse_structured('{"question": "Q?"}', QuestionOutput, "question", llm=llm, max_reasks=2))
+    assert len(llm.prompts) == 2
+
+
+def test_parse_items_drops_invalid_and_truncated_items():
+    raw = json.dumps({"questions": [QUESTION, {"question": "bad"}, QUESTION]})[:-30]
+    items = parse_structured_items(raw, QuestionOutput, "question_batch", "questions")
+    assert [item["question"] for item in items] == ["Q?"]
@@ -0,0 +1,55 @@
+import asyncio
+import logging
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from db import get_collection
+from metrics import timed
+
+logger = logging.getLogger(__name__)
+
+
+class DuplicateEmailError(Exception):
+    """Raised when signing up with an email that is already registered."""
+
+
+class UserRepository:
+    """Async access to a users/admins collection on the shared pooled client.
+
+    Like motor, each call runs the blocking pymongo operation on a worker
+    thread, so the event loop never waits on Mongo.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def find_by_email(self, email):
+        with timed("mongo"):
+            return await asyncio.to_thread(self.collection.find_one, {"email": email})
+
+    async def create(self, user_dict):
+        """Inserts a user in one round trip; the unique email index rejects duplicates."""
+        try:
+            with timed("mongo"):
+                result = await asyncio.to_thread(self.collection.insert_one, user_dict)
+        except DuplicateKeyError:
+            raise DuplicateEmailError(user_dict.get("email"))
+        return result.inserted_id
+
+    async def update_fields(self, email, fields):
+        with timed("mongo"):
+            await asyncio.to_thread(self.collection.update_one, {"email": email}, {"$set": fields})
+
+    async def ensure_indexes(self):
+        """Creates the unique email index that signup relies on to reject duplicate emails."""
+        try:
+            await asyncio.to_thread(self.collection.create_index, "email", unique=True)
+        except OperationFailure as e:
+            logger.error(f"Could not create unique email index on {self.collection.name} (duplicate emails already stored?): {e}")
+            raise
+
+
+users = UserRepository(get_collection("users"))
+admins = UserRepository(get_collection("admins"))
+
+
+async def ensure_indexes():
+    await asyncio.gather(users.ensure_indexes(), admins.ensure_indexes())
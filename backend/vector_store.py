@@ -0,0 +1,49 @@
+"""Chroma client factory shared by the feedback store and the resume store.
+
+CHROMA_MODE=embedded (default) opens a PersistentClient per directory inside
+each process, as before. CHROMA_MODE=http connects every worker to one local
+Chroma server that owns the indexes, so index memory does not grow with the
+number of uvicorn workers and all writes go through a single process:
+
+    chroma run --path ./chroma_server_data --host 127.0.0.1 --port 8001
+    CHROMA_MODE=http uvicorn main:app --workers 4
+
+In http mode both stores live on that server and the *_DIR settings are ignored.
+"""
+import os
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CHROMA_MODE = os.getenv("CHROMA_MODE", "embedded")
+CHROMA_HOST = os.getenv("CHROMA_HOST", "127.0.0.1")
+CHROMA_PORT = int(os.getenv("CHROMA_PORT", "8001"))
+CHROMA_SSL = os.getenv("CHROMA_SSL", "false").lower() == "true"
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def create_chroma_client(persist_dir: str):
+    """Returns the process-wide Chroma client for `persist_dir` (embedded) or for the server (http).
+
+    Clients are cached, so every store in a worker shares one connection pool
+    (http) or one set of open SQLite/HNSW files per directory (embedded).
+    """
+    import chromadb
+    from chromadb.config import Settings
+
+    key = ("http", CHROMA_HOST, CHROMA_PORT) if CHROMA_MODE == "http" else ("embedded", os.path.abspath(persist_dir))
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            settings = Settings(anonymized_telemetry=False)
+            if CHROMA_MODE == "http":
+                client = chromadb.HttpClient(host=CHROMA_HOST, port=CHROMA_PORT, ssl=CHROMA_SSL, settings=settings)
+            elif CHROMA_MODE == "embedded":
+                client = chromadb.PersistentClient(path=persist_dir, settings=settings)
+            else:
+                raise ValueError(f"Unknown CHROMA_MODE {CHROMA_MODE!r}; expected 'embedded' or 'http'.")
+            _clients[key] = client
+    return client
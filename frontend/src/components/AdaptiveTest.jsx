@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from "react";
+import React, { useState, useEffect, useRef } from "react";
 import axios from "axios";
 import { useNavigate } from "react-router-dom";
 import { useAuth } from "./AuthContext";
@@ -16,6 +16,8 @@ const AdaptiveTest = () => {
   const [testResults, setTestResults] = useState(null);
   const [questionNumber, setQuestionNumber] = useState(1);
   const [isFetchingFeedback, setIsFetchingFeedback] = useState(false);
+  const sessionIdRef = useRef(null);
+  const resumeId = localStorage.getItem("resume_id");
 
   const MAX_QUESTIONS = 10;
 
@@ -76,9 +78,12 @@ const AdaptiveTest = () => {
       setFeedback("");
 
       const response = await axios.post("http://localhost:8000/adaptive_test/start", {
-        resume_text: resumeText,
+        resume_id: resumeId,
+        resume_text: resumeId ? null : resumeText,
+        session_id: sessionIdRef.current,
       });
 
+      sessionIdRef.current = response.data.session_id;
       setQuestionData(response.data);
     } catch (error) {
       console.error("Failed to fetch question:", error);
@@ -98,6 +103,7 @@ const AdaptiveTest = () => {
       const response = await axios.post("http://localhost:8000/adaptive_test/answer", {
         selected_answer: selectedAnswer,
         current_question: questionData,
+        session_id: sessionIdRef.current,
       });
 
       const correctAnswerObj = questionData.options.find(option => option.isCorrect);
@@ -147,7 +153,9 @@ const AdaptiveTest = () => {
       setIsFetchingFeedback(true);
       const response = await axios.post("http://localhost:8000/adaptive_test/results", {
         questions: questionHistory,
-        resume_text: resumeText
+        resume_id: resumeId,
+        resume_text: resumeId ? null : resumeText,
+        session_id: sessionIdRef.current
       });
 
       setTestResults(response.data.feedback);
@@ -161,7 +169,10 @@ const AdaptiveTest = () => {
 
   const startNewTest = async () => {
     try {
-      await axios.post("http://localhost:8000/adaptive_test/reset");
+      await axios.post("http://localhost:8000/adaptive_test/reset", {
+        session_id: sessionIdRef.current,
+      });
+      sessionIdRef.current = null;
       setQuestionHistory([]);
       setQuestionData(null);
       setTestComplete(false);
@@ -189,7 +200,9 @@ const AdaptiveTest = () => {
     fetchQuestion();
 
     return () => {
-      axios.post("http://localhost:8000/adaptive_test/reset").catch(err =>
+      axios.post("http://localhost:8000/adaptive_test/reset", {
+        session_id: sessionIdRef.current,
+      }).catch(err =>
         console.error("Failed to reset test on unmount:", err)
       );
     };
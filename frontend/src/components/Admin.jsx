@@ -1,4 +1,4 @@
-import React, { useState } from "react";
+import React, { useState, useEffect } from "react";
 import { Routes, Route, useNavigate } from "react-router-dom";
 import "../app.css";
 
@@ -6,6 +6,18 @@ function MainAdmin() {
     const navigate = useNavigate();
     const [topResult, setTopResult] = useState([]);
     const [uploading, setUploading] = useState(false);
+    const [jobDescription, setJobDescription] = useState("");
+    const [cacheStats, setCacheStats] = useState(null);
+
+    useEffect(() => {
+      const token = localStorage.getItem("access_token");
+      fetch("http://localhost:8000/admin/answer-cache", {
+        headers: { Authorization: `Bearer ${token}` },
+      })
+        .then((response) => (response.ok ? response.json() : null))
+        .then(setCacheStats)
+        .catch(() => setCacheStats(null));
+    }, []);
   
     const handleLogout = () => {
       localStorage.clear();
@@ -19,6 +31,9 @@ function MainAdmin() {
       for (let i = 0; i < files.length; i++) {
         formData.append("files", files[i]);
       }
+      if (jobDescription.trim()) {
+        formData.append("job_description", jobDescription);
+      }
   
       setUploading(true);
   
@@ -29,6 +44,10 @@ function MainAdmin() {
         });
   
         const data = await response.json();
+        if (!response.ok) {
+          alert(data.detail || "Something went wrong during the upload.");
+          return;
+        }
         setTopResult(data.top_result); // Top result should be an array of names
       } catch (error) {
         console.error("Upload failed:", error);
@@ -54,6 +73,23 @@ function MainAdmin() {
           </button>
         </div><br/><br/>
   
+        {cacheStats && cacheStats.enabled && (
+          <p className="text-sm text-gray-600" style={{textAlign:'center'}}>
+            Answer cache: {(cacheStats.hit_ratio * 100).toFixed(1)}% hit ratio
+            ({cacheStats.hits} hits, {cacheStats.misses} misses, {cacheStats.entries} cached answers)
+          </p>
+        )}
+
+        <div className="mb-4" style={{textAlign:'center'}}>
+          <textarea
+            value={jobDescription}
+            onChange={(e) => setJobDescription(e.target.value)}
+            placeholder="Paste the job description (optional) before uploading resumes"
+            rows={4}
+            style={{width:'60%'}}
+          />
+        </div>
+
         <div className="mb-4" >
           <input
             type="file"
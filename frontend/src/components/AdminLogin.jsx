@@ -33,7 +33,7 @@ function AdminLogin({ toggleForm }) {
             }
 
             const data = await response.json();
-            login(data.access_token);
+            login(data.access_token, data.refresh_token);
             navigate("/institute-dashboard");
         } catch (error) {
             console.error("Login error:", error);
@@ -2,6 +2,9 @@ import React, { createContext, useContext, useState, useEffect } from "react";
 
 const AuthContext = createContext();
 
+// Access tokens live 5 minutes; renew them a bit earlier with the refresh token
+const REFRESH_INTERVAL_MS = 4 * 60 * 1000;
+
 export const AuthProvider = ({ children }) => {
     const [token, setToken] = useState(null);
     const [resumeText, setResumeText] = useState("");
@@ -19,6 +22,57 @@ export const AuthProvider = ({ children }) => {
         }
     }, []);
 
+    // Periodically swap the refresh token for a new access/refresh pair
+    useEffect(() => {
+        if (!token) return;
+        const refresh = async () => {
+            // Tabs share one refresh token; if another tab just renewed it, adopt its tokens instead
+            const refreshedAt = Number(localStorage.getItem("token_refreshed_at") || 0);
+            if (Date.now() - refreshedAt < REFRESH_INTERVAL_MS / 2) {
+                setToken(localStorage.getItem("access_token"));
+                return;
+            }
+            const refreshToken = localStorage.getItem("refresh_token");
+            if (!refreshToken) return;
+            try {
+                const response = await fetch("http://127.0.0.1:8000/token/refresh", {
+                    method: "POST",
+                    headers: { "Content-Type": "application/json" },
+                    body: JSON.stringify({ refresh_token: refreshToken }),
+                });
+                if (!response.ok) {
+                    logout();
+                    return;
+                }
+                const data = await response.json();
+                localStorage.setItem("token_refreshed_at", String(Date.now()));
+                login(data.access_token, data.refresh_token);
+            } catch (error) {
+                console.error("Token refresh failed:", error);
+            }
+        };
+        const timer = setInterval(() => {
+            // One tab refreshes at a time where the Web Locks API is available
+            if (navigator.locks) {
+                navigator.locks.request("token_refresh", refresh);
+            } else {
+                refresh();
+            }
+        }, REFRESH_INTERVAL_MS);
+        return () => clearInterval(timer);
+    }, [token]);
+
+    // Follow logins, refreshes and logouts made in other tabs
+    useEffect(() => {
+        const onStorage = (event) => {
+            if (event.key === "access_token") {
+                setToken(event.newValue);
+            }
+        };
+        window.addEventListener("storage", onStorage);
+        return () => window.removeEventListener("storage", onStorage);
+    }, []);
+
     // Save resumeText to localStorage whenever it changes
     useEffect(() => {
         if (resumeText) {
@@ -32,15 +86,29 @@ export const AuthProvider = ({ children }) => {
     };
 
     // Login function to set token
-    const login = (newToken) => {
+    const login = (newToken, refreshToken) => {
         localStorage.setItem("access_token", newToken);
+        if (refreshToken) {
+            localStorage.setItem("refresh_token", refreshToken);
+        }
         setToken(newToken);
     };
 
     // Logout function to clear token and resumeText
     const logout = () => {
+        const refreshToken = localStorage.getItem("refresh_token");
+        if (refreshToken) {
+            fetch("http://127.0.0.1:8000/token/revoke", {
+                method: "POST",
+                headers: { "Content-Type": "application/json" },
+                body: JSON.stringify({ refresh_token: refreshToken }),
+            }).catch(() => {});
+        }
         localStorage.removeItem("access_token");
+        localStorage.removeItem("refresh_token");
+        localStorage.removeItem("token_refreshed_at");
         localStorage.removeItem("resume_text");
+        localStorage.removeItem("resume_id");
         setToken(null);
         setResumeText("");
     };
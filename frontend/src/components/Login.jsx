@@ -33,7 +33,7 @@ function Login({ toggleForm }) {
             }
 
             const data = await response.json();
-            login(data.access_token);
+            login(data.access_token, data.refresh_token);
             navigate("/dashboard");
         } catch (error) {
             console.error("Login error:", error);
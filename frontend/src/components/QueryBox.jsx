@@ -16,28 +16,54 @@ const QueryBox = ({ resumeData }) => {
 
     try {
       const token = localStorage.getItem("token");
+      const resumeId = localStorage.getItem("resume_id");
 
-      const res = await fetch("http://localhost:8000/ask-query", {
+      const res = await fetch("http://localhost:8000/ask-query/stream", {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
           "Authorization": `Bearer ${token}`,
         },
+        // Send the server-side resume handle instead of the full text when we have one
         body: JSON.stringify({
           user_query: userQuery,
-          resume_text: resumeData,
+          resume_id: resumeId,
+          resume_text: resumeId ? null : resumeData,
         }),
       });
 
-      if (!res.ok) {
+      if (!res.ok || !res.body) {
         throw new Error("Backend error occurred");
       }
 
-      const data = await res.json();
-      if (data.response) {
-        setResponse(data.response);
-      } else {
-        setResponse("Error: " + (data.error || "Unknown error"));
+      // Render the answer as Server-Sent Events arrive
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      let streamed = "";
+      setResponse("");
+
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        const events = buffer.split("\n\n");
+        buffer = events.pop();
+        for (const event of events) {
+          if (event.startsWith("event: done")) continue;
+          const dataLine = event.split("\n").find(line => line.startsWith("data: "));
+          if (!dataLine) continue;
+          const { chunk } = JSON.parse(dataLine.slice(6));
+          if (chunk) {
+            streamed += chunk;
+            setResponse(streamed);
+          }
+        }
+      }
+
+      if (!streamed) {
+        setResponse("Error: No response generated.");
       }
     } catch (err) {
       setError("Request failed. Is the backend running?");
@@ -22,6 +22,7 @@ const ResumeUploader = ({ onResumeData }) => {
   
       if (response.ok) {
         localStorage.setItem("resume_text", data.resume_text);
+        localStorage.setItem("resume_id", data.resume_id);
         onResumeData(data.resume_text);  // Pass to parent
         setUploadStatus("Upload successful!");
         await uploadResume(data.resume_text);